@@ -1,4 +1,5 @@
 import os
+from typing import Optional
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
 
@@ -14,10 +15,112 @@ class Settings(BaseSettings):
     SECRET_KEY: str = os.getenv("SECRET_KEY", "supersecretkey")
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+
+    # Revoked refresh token families, cached in front of the revoked_token_families collection
+    REVOKED_FAMILY_CACHE_MAX_SIZE: int = 10000
+    REVOKED_FAMILY_CACHE_TTL_SECONDS: float = 60
+
+    # Verified access token cache, entries also expire with their token
+    TOKEN_CACHE_MAX_SIZE: int = 10000
+
+    # Admission control: an adaptive (AIMD) concurrency limit per route class,
+    # requests over it wait up to the queue timeout and are then shed with 503
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_MIN_LIMIT: int = 1
+    ADMISSION_MAX_QUEUE: int = 256
+    ADMISSION_BACKOFF: float = 0.9
+    ADMISSION_RETRY_AFTER_SECONDS: int = 1
+    ADMISSION_AUTH_LIMIT: int = 8
+    ADMISSION_AUTH_MAX_LIMIT: int = 64
+    ADMISSION_AUTH_QUEUE_TIMEOUT_SECONDS: float = 1.0
+    ADMISSION_AUTH_LATENCY_TARGET_SECONDS: float = 1.0
+    ADMISSION_TASK_READ_LIMIT: int = 64
+    ADMISSION_TASK_READ_MAX_LIMIT: int = 512
+    ADMISSION_TASK_READ_QUEUE_TIMEOUT_SECONDS: float = 0.5
+    ADMISSION_TASK_READ_LATENCY_TARGET_SECONDS: float = 0.1
+    ADMISSION_TASK_WRITE_LIMIT: int = 32
+    ADMISSION_TASK_WRITE_MAX_LIMIT: int = 256
+    ADMISSION_TASK_WRITE_QUEUE_TIMEOUT_SECONDS: float = 0.5
+    ADMISSION_TASK_WRITE_LATENCY_TARGET_SECONDS: float = 0.25
+    # NDJSON exports hold a slot for the whole stream: fixed limit, no latency target
+    ADMISSION_TASK_STREAM_LIMIT: int = 16
+    ADMISSION_TASK_STREAM_QUEUE_TIMEOUT_SECONDS: float = 0
+
+    # Password hashing: comma separated passlib schemes, the first one hashes new
+    # passwords and hashes in the others (or with other costs) are upgraded on login.
+    # argon2 needs the argon2-cffi package. Pick costs with app.utils.calibrate_hashing.
+    PASSWORD_HASH_SCHEMES: str = "bcrypt"
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    PASSWORD_ARGON2_TIME_COST: int = 2
+    PASSWORD_ARGON2_MEMORY_COST: int = 102400  # KiB
+    PASSWORD_ARGON2_PARALLELISM: int = 8
+
+    # Password hashing pool
+    PASSWORD_HASH_WORKERS: int = min(4, os.cpu_count() or 1)
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+
+    # Authenticated user cache
+    USER_CACHE_MAX_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: float = 60
+
+    # Storage: "mongo" or "memory" (in-process and not persisted, for benchmarks and tests)
+    STORAGE_BACKEND: str = "mongo"
 
     # MongoDB Configuration
     MONGODB_URL: str = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
     DATABASE_NAME: str = os.getenv("DATABASE_NAME", "task_management_db")
+    MONGODB_MAX_POOL_SIZE: int = 100
+    MONGODB_MIN_POOL_SIZE: int = 0
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: Optional[int] = None
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 30000
+    MONGODB_COMPRESSORS: str = ""  # Comma separated, e.g. "zstd,snappy,zlib"
+    MONGODB_SLOW_QUERY_MS: float = 100
+
+    # With several workers (PROMETHEUS_MULTIPROC_DIR), how long a worker may hold
+    # HTTP request metrics before writing them out for the scraping worker
+    METRICS_FLUSH_INTERVAL_SECONDS: float = 1.0
+
+    # /readyz fails when the database does not answer a ping within this time
+    READINESS_TIMEOUT_SECONDS: float = 1.0
+
+    # Task listing
+    TASKS_DEFAULT_PAGE_SIZE: int = 50
+    TASKS_MAX_PAGE_SIZE: int = 200
+    TASKS_STREAM_BATCH_SIZE: int = 500
+    TASKS_MAX_BULK_SIZE: int = 500
+
+    # Write coalescing: single task creates arriving within the window are
+    # written with one insert_many of up to TASKS_INSERT_BATCH_MAX_SIZE documents
+    TASKS_INSERT_BATCHING_ENABLED: bool = False
+    TASKS_INSERT_BATCH_MAX_SIZE: int = 100
+    TASKS_INSERT_BATCH_WINDOW_SECONDS: float = 0.002
+
+    # Cache of serialized GET /tasks and GET /tasks/{id} responses per user,
+    # invalidated by every write to the user's tasks. "memory" is per process,
+    # "redis" is shared by all workers through RESPONSE_CACHE_REDIS_URL
+    RESPONSE_CACHE_ENABLED: bool = False
+    RESPONSE_CACHE_BACKEND: str = "memory"
+    RESPONSE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    RESPONSE_CACHE_MAX_ENTRY_BYTES: int = 1024 * 1024
+    RESPONSE_CACHE_MAX_USERS: int = 100000
+    RESPONSE_CACHE_TTL_SECONDS: float = 300
+    RESPONSE_CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+
+    # Task search: "auto" uses the MongoDB text index and falls back to the
+    # in-process index when it is missing, "mongo" and "memory" force one of them
+    SEARCH_BACKEND: str = "auto"
+    SEARCH_FALLBACK_MAX_USERS: int = 1000
+    SEARCH_FALLBACK_TTL_SECONDS: float = 300
+    SEARCH_TEXT_INDEX_RETRY_SECONDS: float = 60
+
+    # Live task events: "local" publishes from this process's writes,
+    # "change_stream" from a MongoDB change stream (for multiple workers)
+    EVENTS_SOURCE: str = "local"
+    EVENTS_QUEUE_SIZE: int = 100
+    EVENTS_REPLAY_SIZE: int = 256
+    EVENTS_REPLAY_MAX_USERS: int = 10000
+    EVENTS_HEARTBEAT_SECONDS: float = 15
 
     class Config:
         env_file = ".env"
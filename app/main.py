@@ -1,8 +1,19 @@
-from fastapi import FastAPI, APIRouter
+import asyncio
+from fastapi import FastAPI, APIRouter, status
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from .routes import auth, tasks
 from .config import settings
 from .utils.database import Database
+from .repositories.storage import storage
+from .utils.hashing import password_hasher
+from .utils.metrics import MetricsMiddleware, metrics_response
+from .utils.admission import AdmissionMiddleware
+from .utils.events import check_change_stream, watch_task_changes
+from .utils.warmup import warm_up
+from .utils.response_cache import response_cache
+from .models.task_model import Task
+from .services.task_service import TaskService
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -10,6 +21,9 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Innermost, so shed responses still get CORS headers and are counted in the metrics
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -17,6 +31,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 api_router = APIRouter(prefix=settings.API_V1_PREFIX)
 
@@ -27,14 +42,41 @@ api_router.include_router(tasks.router, prefix="/tasks")
 app.include_router(api_router)
 
 
+background_tasks = set()
+# Set once startup has connected to the database and warmed up, cleared on shutdown
+app.state.ready = False
+
+
 @app.on_event("startup")
 async def startup_db_client():
-    await Database.connect()
+    await storage.connect()
+    # Fail the startup rather than the first request if the database does not answer
+    await storage.ping()
+
+    if settings.EVENTS_SOURCE == "change_stream":
+        if settings.STORAGE_BACKEND != "mongo":
+            raise RuntimeError("EVENTS_SOURCE=change_stream requires STORAGE_BACKEND=mongo")
+        collection = await Database.get_collection(Task.collection_name)
+        await check_change_stream(collection)
+        background_tasks.add(asyncio.create_task(watch_task_changes(collection)))
+
+    await warm_up()
+    app.state.ready = True
 
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    await Database.close()
+    app.state.ready = False
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+
+    # Creates still waiting for their batch must reach the database before it closes
+    await TaskService.insert_batcher.close()
+    await storage.close()
+    await response_cache.close()
+    password_hasher.shutdown()
 
 
 @app.get("/")
@@ -42,3 +84,26 @@ async def root():
     return {
         "message": "Welcome to the Task Management API",
     }
+
+
+@app.get("/healthz", include_in_schema=False)
+async def healthz():
+    """Liveness: the process is serving requests"""
+    return {"status": "ok"}
+
+
+@app.get("/readyz", include_in_schema=False)
+async def readyz():
+    """Readiness: warmed up and the database answers"""
+    if not app.state.ready:
+        return JSONResponse({"status": "starting"}, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    try:
+        await asyncio.wait_for(storage.ping(), settings.READINESS_TIMEOUT_SECONDS)
+    except Exception:
+        return JSONResponse({"status": "unavailable"}, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return {"status": "ready"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return metrics_response()
@@ -0,0 +1,22 @@
+from bson import ObjectId
+
+
+class PyObjectId(ObjectId):
+    """Custom ObjectId class for Pydantic models"""
+    @classmethod
+    def __get_pydantic_core_schema__(cls, _source_type, _handler):
+        from pydantic_core import core_schema
+        return core_schema.union_schema([
+            core_schema.is_instance_schema(ObjectId),
+            core_schema.chain_schema([
+                core_schema.string_schema(),
+                core_schema.no_info_plain_validator_function(PyObjectId.validate),
+                core_schema.is_instance_schema(ObjectId),
+            ]),
+        ])
+
+    @classmethod
+    def validate(cls, v):
+        if not ObjectId.is_valid(v):
+            raise ValueError("Invalid ObjectId")
+        return ObjectId(v)
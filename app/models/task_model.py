@@ -1,29 +1,11 @@
 from datetime import datetime, timezone
 from pydantic import BaseModel, Field, field_serializer
-from typing import Optional
+from typing import Dict, List, Optional
 from bson import ObjectId
+from pymongo import ASCENDING, TEXT, IndexModel
 from enum import Enum
-
-
-class PyObjectId(ObjectId):
-    """Custom ObjectId class for Pydantic models"""
-    @classmethod
-    def __get_pydantic_core_schema__(cls, _source_type, _handler):
-        from pydantic_core import core_schema
-        return core_schema.union_schema([
-            core_schema.is_instance_schema(ObjectId),
-            core_schema.chain_schema([
-                core_schema.string_schema(),
-                core_schema.no_info_plain_validator_function(PyObjectId.validate),
-                core_schema.is_instance_schema(ObjectId),
-            ]),
-        ])
-
-    @classmethod
-    def validate(cls, v):
-        if not ObjectId.is_valid(v):
-            raise ValueError("Invalid ObjectId")
-        return ObjectId(v)
+from ..config import settings
+from .object_id import PyObjectId
 
 
 class TaskStatus(str, Enum):
@@ -34,13 +16,30 @@ class TaskStatus(str, Enum):
 
 class Task:
     collection_name = "tasks"
+    indexes = [
+        # Keyset pagination of a user's tasks
+        IndexModel([("user_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)],
+                   name="user_id_created_at_id"),
+        # Listing filtered by status
+        IndexModel([("user_id", ASCENDING), ("status", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)],
+                   name="user_id_status_created_at_id"),
+        # Listing of recently updated tasks (updated_since + sort=updated_at)
+        IndexModel([("user_id", ASCENDING), ("updated_at", ASCENDING), ("_id", ASCENDING)],
+                   name="user_id_updated_at_id"),
+        # Full-text search, prefixed by user_id so every search stays within one user's tasks
+        IndexModel([("user_id", ASCENDING), ("title", TEXT), ("description", TEXT)],
+                   name="user_id_title_description_text"),
+    ]
+    # No per-instance __dict__, bulk operations hold thousands of these
+    __slots__ = ("task_id", "title", "description", "status", "user_id", "created_at", "updated_at", "version")
 
     def __init__(self, title: str, user_id: PyObjectId, 
                  description: Optional[str] = None,
                  status: str = TaskStatus.PENDING,
                  task_id: Optional[PyObjectId] = None,
                  created_at: Optional[datetime] = None,
-                 updated_at: Optional[datetime] = None):
+                 updated_at: Optional[datetime] = None,
+                 version: int = 1):
         self.task_id = task_id or ObjectId()
         self.title = title
         self.description = description
@@ -48,6 +47,7 @@ class Task:
         self.user_id = user_id
         self.created_at = created_at or datetime.now(timezone.utc)
         self.updated_at = updated_at  # No default value, will be None for new tasks
+        self.version = version  # Incremented on every update, used for optimistic concurrency
 
     def to_dict(self):
         """Convert Task object to dictionary for database storage"""
@@ -58,7 +58,8 @@ class Task:
             "status": self.status,
             "user_id": self.user_id,
             "created_at": self.created_at,
-            "updated_at": self.updated_at
+            "updated_at": self.updated_at,
+            "version": self.version
         }
 
     @classmethod
@@ -73,10 +74,17 @@ class Task:
             status=data.get("status"),
             user_id=data.get("user_id"),
             created_at=data.get("created_at"),
-            updated_at=data.get("updated_at")
+            updated_at=data.get("updated_at"),
+            version=data.get("version", 0)  # Tasks stored before versioning have no version
         )
 
 
+class TaskStats:
+    """Per-user bookkeeping document, keyed by the user's id"""
+    collection_name = "task_stats"
+    indexes = []
+
+
 class TaskBase(BaseModel):
     title: str
     description: Optional[str] = None
@@ -116,6 +124,7 @@ class TaskInDB(TaskBase):
     user_id: str
     created_at: datetime
     updated_at: Optional[datetime] = None
+    version: int = 0
 
     model_config = {
         "populate_by_name": True,
@@ -128,7 +137,8 @@ class TaskInDB(TaskBase):
                 "status": "pending",
                 "user_id": "60d5ec9af3f36a9ac0cb22aa",
                 "created_at": "2023-01-01T00:00:00",
-                "updated_at": None
+                "updated_at": None,
+                "version": 1
             }
         }
     }
@@ -136,3 +146,87 @@ class TaskInDB(TaskBase):
     @field_serializer('created_at', 'updated_at')
     def serialize_dt(self, dt: datetime):
         return dt.isoformat() if dt else None
+
+
+class TaskListQuery(BaseModel):
+    status: Optional[TaskStatus] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    updated_since: Optional[datetime] = None
+    sort: str = "created_at"
+    fields: Optional[List[str]] = None  # None selects the default fields of the view
+
+
+class TaskBulkCreate(BaseModel):
+    tasks: List[TaskCreate] = Field(min_length=1, max_length=settings.TASKS_MAX_BULK_SIZE)
+
+
+class TaskBulkUpdateItem(TaskUpdate):
+    id: str
+
+
+class TaskBulkUpdate(BaseModel):
+    tasks: List[TaskBulkUpdateItem] = Field(min_length=1, max_length=settings.TASKS_MAX_BULK_SIZE)
+
+
+class TaskBulkDelete(BaseModel):
+    ids: List[str] = Field(min_length=1, max_length=settings.TASKS_MAX_BULK_SIZE)
+
+
+class TaskBulkItemResult(BaseModel):
+    index: int
+    id: Optional[str] = None
+    task: Optional[TaskInDB] = None
+    error: Optional[str] = None
+
+
+class TaskBulkResult(BaseModel):
+    succeeded: int
+    failed: int
+    items: List[TaskBulkItemResult]
+
+
+class TaskStatsResponse(BaseModel):
+    counts: Dict[TaskStatus, int]
+    total: int
+
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "counts": {"pending": 3, "in-progress": 1, "completed": 8},
+                "total": 12
+            }
+        }
+    }
+
+
+class TaskSearchHit(BaseModel):
+    id: str = Field(alias="_id")
+    title: str
+    status: TaskStatus
+    user_id: str
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    version: int = 0
+    score: float
+
+    model_config = {"populate_by_name": True}
+
+
+class TaskSearchPage(BaseModel):
+    items: List[TaskSearchHit]
+    next_cursor: Optional[str] = None
+
+
+class TaskPage(BaseModel):
+    items: List[TaskInDB]
+    next_cursor: Optional[str] = None
+
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "items": [TaskInDB.model_config["json_schema_extra"]["example"]],
+                "next_cursor": "MTY3MjUzMTIwMDAwMDo2MGQ1ZWM5YWYzZjM2YTlhYzBjYjIyYmI"
+            }
+        }
+    }
@@ -2,40 +2,24 @@ from datetime import datetime, timezone
 from pydantic import BaseModel, EmailStr, Field, field_serializer
 from typing import Optional
 from bson import ObjectId
-from ..utils.security import get_password_hash
-
-
-class PyObjectId(ObjectId):
-    """Custom ObjectId class for Pydantic models"""
-    @classmethod
-    def __get_pydantic_core_schema__(cls, _source_type, _handler):
-        from pydantic_core import core_schema
-        return core_schema.union_schema([
-            core_schema.is_instance_schema(ObjectId),
-            core_schema.chain_schema([
-                core_schema.string_schema(),
-                core_schema.no_info_plain_validator_function(PyObjectId.validate),
-                core_schema.is_instance_schema(ObjectId),
-            ]),
-        ])
-
-    @classmethod
-    def validate(cls, v):
-        if not ObjectId.is_valid(v):
-            raise ValueError("Invalid ObjectId")
-        return ObjectId(v)
+from pymongo import ASCENDING, IndexModel
+from .object_id import PyObjectId
 
 
 class User:
     collection_name = "users"
+    indexes = [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ]
 
-    def __init__(self, email: str, username: str, password: str, 
+    def __init__(self, email: str, username: str,
+                 hashed_password: Optional[str] = None,
                  user_id: Optional[PyObjectId] = None,
                  created_at: Optional[datetime] = None):
         self.user_id = user_id or ObjectId()
         self.email = email
         self.username = username
-        self.hashed_password = get_password_hash(password) if password else None
+        self.hashed_password = hashed_password  # Hash with utils.hashing.password_hasher beforehand
         self.created_at = created_at or datetime.now(timezone.utc)
 
     def to_dict(self):
@@ -55,11 +39,27 @@ class User:
             user_id=data.get("_id"),
             email=data.get("email"),
             username=data.get("username"),
-            password=None,  # Don't set password from dict
+            hashed_password=None,  # Don't keep the password hash around
             created_at=data.get("created_at")
         )
 
 
+class RefreshTokenFamily:
+    """Refresh tokens issued by one login, only the latest `generation` may be redeemed"""
+    collection_name = "refresh_token_families"
+    indexes = [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ]
+
+
+class RevokedTokenFamily:
+    """Families revoked after a rotated refresh token was reused, kept until their tokens expire"""
+    collection_name = "revoked_token_families"
+    indexes = [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ]
+
+
 # Pydantic models for request/response validation
 class UserBase(BaseModel):
     email: EmailStr
@@ -119,16 +119,22 @@ class UserLogin(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
 
     model_config = {
         "json_schema_extra": {
             "example": {
                 "access_token": "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9...",
-                "token_type": "bearer"
+                "token_type": "bearer",
+                "refresh_token": "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9..."
             }
         }
     }
 
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
 class TokenData(BaseModel):
     user_id: Optional[str] = None
@@ -0,0 +1,170 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional, Set, Tuple
+from bson import ObjectId
+from ..models.task_model import TaskListQuery
+
+# (sort value, _id) of the last document of the previous page, as decoded from a cursor
+Position = Tuple[Any, ObjectId]
+
+# (field, pymongo.ASCENDING or pymongo.DESCENDING), _id breaks ties in the same direction
+Sort = Tuple[str, int]
+
+
+class TextSearchUnavailable(Exception):
+    """The backend has no full-text index to serve a search from"""
+
+
+class UserRepository(ABC):
+    @abstractmethod
+    async def insert(self, document: dict) -> bool:
+        """Store a new user, returns False if the email is already taken"""
+
+    @abstractmethod
+    async def find_by_email(self, email: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def find_by_id(self, user_id: ObjectId) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def update_password_hash(self, user_id: ObjectId, hashed_password: str) -> None:
+        ...
+
+
+class RefreshTokenRepository(ABC):
+    """Refresh token families and the revocations of families whose rotated tokens were reused"""
+
+    @abstractmethod
+    async def create_family(self, family_id: ObjectId, user_id: ObjectId, expires_at: datetime) -> None:
+        ...
+
+    @abstractmethod
+    async def advance_family(self, family_id: ObjectId, generation: int, expires_at: datetime) -> bool:
+        """Atomically move a family from `generation` to the next one.
+
+        Returns False if the family is gone or at another generation.
+        """
+
+    @abstractmethod
+    async def revoke_family(self, family_id: ObjectId, user_id: ObjectId, expires_at: datetime) -> None:
+        """Delete the family and remember it as revoked until `expires_at`"""
+
+    @abstractmethod
+    async def is_revoked(self, family_id: ObjectId) -> bool:
+        ...
+
+
+class TaskRepository(ABC):
+    """Storage of task documents. Every operation is scoped to the owning user's id."""
+
+    @abstractmethod
+    async def insert(self, document: dict) -> None:
+        ...
+
+    @abstractmethod
+    async def insert_many(self, documents: List[dict]) -> Dict[int, str]:
+        """Unordered insert, returns an error message by input index for the documents that failed"""
+
+    @abstractmethod
+    async def find_one(self, owner_id: ObjectId, task_id: ObjectId) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def find_many(self, owner_id: ObjectId, task_ids: Optional[List[ObjectId]] = None,
+                        fields: Optional[tuple] = None) -> List[dict]:
+        """The user's tasks with the given ids (all of them when `task_ids` is None), in no particular order.
+
+        `fields` limits the returned fields, _id is always included.
+        """
+
+    @abstractmethod
+    async def find_page(self, owner_id: ObjectId, list_query: TaskListQuery, sort: Sort,
+                        fields: Optional[tuple], limit: int, after: Optional[Position] = None) -> List[Mapping]:
+        """Up to `limit` tasks matching the filters of `list_query`, in `sort` order, after `after`.
+
+        The documents are only meant for utils.serializers and may be undecoded
+        (RawBSONDocument) rather than dicts.
+        """
+
+    @abstractmethod
+    def iterate(self, owner_id: ObjectId, list_query: TaskListQuery, sort: Sort,
+                fields: Optional[tuple]) -> AsyncIterator[Mapping]:
+        """Every task matching `list_query`, fetched in batches of TASKS_STREAM_BATCH_SIZE, documents as in find_page"""
+
+    @abstractmethod
+    async def update(self, owner_id: ObjectId, task_id: ObjectId, fields: dict,
+                     expected_version: Optional[int] = None) -> Optional[dict]:
+        """Set `fields`, increment the version and return the document as it was before.
+
+        Returns None if there is no such task or its version is not `expected_version`.
+        """
+
+    @abstractmethod
+    async def update_many(self, owner_id: ObjectId, updates: List[Tuple[ObjectId, dict]],
+                          expected_status: Optional[str] = None) -> Tuple[int, Set[ObjectId]]:
+        """Unordered version of update without pre-images.
+
+        With `expected_status` only tasks still in that status are updated.
+        Returns the number of tasks matched and the ids whose update failed.
+        """
+
+    @abstractmethod
+    async def delete(self, owner_id: ObjectId, task_id: ObjectId) -> Optional[dict]:
+        """Delete a task and return its _id and status, None if there is no such task"""
+
+    @abstractmethod
+    async def delete_many(self, owner_id: ObjectId, task_ids: List[ObjectId], task_status: str) -> int:
+        """Delete those of the tasks that are in `task_status`, returns how many were deleted"""
+
+    @abstractmethod
+    async def count_by_status(self, owner_id: Optional[ObjectId] = None) -> Dict[ObjectId, Dict[str, int]]:
+        """Task counts by status, by user (only `owner_id` when given)"""
+
+    @abstractmethod
+    async def text_search(self, owner_id: ObjectId, query: str, fields: tuple, limit: int,
+                          after: Optional[Position] = None) -> List[dict]:
+        """Tasks matching `query` with a relevance `score`, best first.
+
+        Raises TextSearchUnavailable when the backend cannot search.
+        """
+
+
+class TaskStatsRepository(ABC):
+    """Per-user bookkeeping documents: a `list_version` counter and `counts` by status"""
+
+    @abstractmethod
+    async def find(self, owner_id: ObjectId) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def find_counts(self, owner_id: Optional[ObjectId] = None) -> Dict[ObjectId, Dict[str, int]]:
+        """Stored counts by user (only `owner_id` when given)"""
+
+    @abstractmethod
+    async def increment(self, owner_id: ObjectId, increments: Dict[str, int]) -> None:
+        """Atomically add to top-level or dotted (e.g. "counts.pending") fields, creating the document if needed"""
+
+    @abstractmethod
+    async def set_counts(self, owner_id: ObjectId, counts: Dict[str, int]) -> None:
+        ...
+
+
+class Storage(ABC):
+    users: UserRepository
+    refresh_tokens: RefreshTokenRepository
+    tasks: TaskRepository
+    task_stats: TaskStatsRepository
+
+    @abstractmethod
+    async def connect(self) -> None:
+        ...
+
+    @abstractmethod
+    async def close(self) -> None:
+        ...
+
+    @abstractmethod
+    async def ping(self) -> None:
+        """Round trip to the backend, raises if it cannot be reached"""
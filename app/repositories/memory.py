@@ -0,0 +1,350 @@
+import asyncio
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timezone
+from enum import Enum
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+from bson import ObjectId
+from pymongo import ASCENDING
+from ..config import settings
+from ..models.task_model import TaskListQuery
+from .base import (
+    Position, RefreshTokenRepository, Sort, Storage, TaskRepository, TaskStatsRepository, TextSearchUnavailable,
+    UserRepository
+)
+
+# Sorts after every real ObjectId, used to bisect past all keys sharing a sort value
+_MAX_OBJECT_ID = ObjectId("f" * 24)
+
+
+def _to_stored(value):
+    """Mimic a BSON round trip: enums become their value, datetimes naive UTC with millisecond precision"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    return value
+
+
+def _stored(document: dict) -> dict:
+    return {key: _to_stored(value) for key, value in document.items()}
+
+
+def _project(document: dict, fields: Optional[tuple]) -> dict:
+    if fields is None:
+        return dict(document)
+    return {key: value for key, value in document.items() if key == "_id" or key in fields}
+
+
+def _remove_key(keys: List[tuple], key: tuple) -> None:
+    position = bisect_left(keys, key)
+    if position < len(keys) and keys[position] == key:
+        del keys[position]
+
+
+class _UserTasks:
+    """One user's tasks plus sorted (sort value, _id) keys mirroring the declared Task.indexes"""
+
+    def __init__(self):
+        self.documents: Dict[ObjectId, dict] = {}
+        self.by_created: List[tuple] = []
+        self.by_status_created: Dict[str, List[tuple]] = {}
+        # Never-updated tasks are left out, listings sorted by updated_at always filter on updated_since
+        self.by_updated: List[tuple] = []
+
+    def add(self, document: dict) -> None:
+        self.documents[document["_id"]] = document
+        created_key = (document.get("created_at"), document["_id"])
+        insort(self.by_created, created_key)
+        insort(self.by_status_created.setdefault(document.get("status"), []), created_key)
+        if document.get("updated_at") is not None:
+            insort(self.by_updated, (document["updated_at"], document["_id"]))
+
+    def remove(self, document: dict) -> None:
+        del self.documents[document["_id"]]
+        created_key = (document.get("created_at"), document["_id"])
+        _remove_key(self.by_created, created_key)
+        _remove_key(self.by_status_created.get(document.get("status"), []), created_key)
+        if document.get("updated_at") is not None:
+            _remove_key(self.by_updated, (document["updated_at"], document["_id"]))
+
+
+def _matches(document: dict, list_query: TaskListQuery, created_after, created_before, updated_since) -> bool:
+    if list_query.status is not None and document.get("status") != list_query.status.value:
+        return False
+    created_at = document.get("created_at")
+    if created_after is not None and (created_at is None or created_at <= created_after):
+        return False
+    if created_before is not None and (created_at is None or created_at >= created_before):
+        return False
+    updated_at = document.get("updated_at")
+    if updated_since is not None and (updated_at is None or updated_at < updated_since):
+        return False
+    return True
+
+
+class MemoryUserRepository(UserRepository):
+    def __init__(self):
+        self._documents: Dict[ObjectId, dict] = {}
+        self._ids_by_email: Dict[str, ObjectId] = {}
+
+    async def insert(self, document: dict) -> bool:
+        if document["email"] in self._ids_by_email:
+            return False
+        self._documents[document["_id"]] = _stored(document)
+        self._ids_by_email[document["email"]] = document["_id"]
+        return True
+
+    async def find_by_email(self, email: str) -> Optional[dict]:
+        user_id = self._ids_by_email.get(email)
+        return await self.find_by_id(user_id) if user_id is not None else None
+
+    async def find_by_id(self, user_id: ObjectId) -> Optional[dict]:
+        document = self._documents.get(user_id)
+        return dict(document) if document is not None else None
+
+    async def update_password_hash(self, user_id: ObjectId, hashed_password: str) -> None:
+        if user_id in self._documents:
+            self._documents[user_id]["hashed_password"] = hashed_password
+
+
+class MemoryRefreshTokenRepository(RefreshTokenRepository):
+    def __init__(self):
+        self._families: Dict[ObjectId, dict] = {}
+        self._revoked: Dict[ObjectId, datetime] = {}
+
+    @staticmethod
+    def _expired(expires_at: datetime) -> bool:
+        # Stands in for the TTL indexes, expired documents are simply ignored
+        return expires_at <= _to_stored(datetime.now(timezone.utc))
+
+    async def create_family(self, family_id: ObjectId, user_id: ObjectId, expires_at: datetime) -> None:
+        self._families[family_id] = {"user_id": user_id, "generation": 0, "expires_at": _to_stored(expires_at)}
+
+    async def advance_family(self, family_id: ObjectId, generation: int, expires_at: datetime) -> bool:
+        family = self._families.get(family_id)
+        if family is None or self._expired(family["expires_at"]) or family["generation"] != generation:
+            return False
+        family["generation"] += 1
+        family["expires_at"] = _to_stored(expires_at)
+        return True
+
+    async def revoke_family(self, family_id: ObjectId, user_id: ObjectId, expires_at: datetime) -> None:
+        self._revoked[family_id] = _to_stored(expires_at)
+        self._families.pop(family_id, None)
+
+    async def is_revoked(self, family_id: ObjectId) -> bool:
+        expires_at = self._revoked.get(family_id)
+        return expires_at is not None and not self._expired(expires_at)
+
+
+class MemoryTaskRepository(TaskRepository):
+    def __init__(self):
+        self._users: Dict[ObjectId, _UserTasks] = {}
+
+    def _stored_task(self, owner_id: ObjectId, task_id: ObjectId) -> Optional[dict]:
+        user = self._users.get(owner_id)
+        return user.documents.get(task_id) if user is not None else None
+
+    async def insert(self, document: dict) -> None:
+        user = self._users.setdefault(document["user_id"], _UserTasks())
+        if document["_id"] in user.documents:
+            raise ValueError(f"Duplicate task id {document['_id']}")
+        user.add(_stored(document))
+
+    async def insert_many(self, documents: List[dict]) -> Dict[int, str]:
+        errors = {}
+        for index, document in enumerate(documents):
+            try:
+                await self.insert(document)
+            except ValueError as exc:
+                errors[index] = str(exc)
+        return errors
+
+    async def find_one(self, owner_id: ObjectId, task_id: ObjectId) -> Optional[dict]:
+        document = self._stored_task(owner_id, task_id)
+        return dict(document) if document is not None else None
+
+    async def find_many(self, owner_id: ObjectId, task_ids: Optional[List[ObjectId]] = None,
+                        fields: Optional[tuple] = None) -> List[dict]:
+        user = self._users.get(owner_id)
+        if user is None:
+            return []
+        if task_ids is None:
+            documents = list(user.documents.values())
+        else:
+            documents = [user.documents[task_id] for task_id in dict.fromkeys(task_ids) if task_id in user.documents]
+        return [_project(document, fields) for document in documents]
+
+    def _select(self, owner_id: ObjectId, list_query: TaskListQuery, sort: Sort,
+                limit: int, after: Optional[Position]) -> List[dict]:
+        """Walk the sorted keys of the index serving the query, like an index scan, and return stored documents"""
+        user = self._users.get(owner_id)
+        if user is None:
+            return []
+
+        sort_field, direction = sort
+        created_after = _to_stored(list_query.created_after)
+        created_before = _to_stored(list_query.created_before)
+        updated_since = _to_stored(list_query.updated_since)
+
+        # Narrow the scan to the range of the sort field allowed by the filters
+        if sort_field == "updated_at":
+            keys = user.by_updated
+            low = bisect_left(keys, (updated_since,)) if updated_since is not None else 0
+            high = len(keys)
+        else:
+            if list_query.status is not None:
+                keys = user.by_status_created.get(list_query.status.value, [])
+            else:
+                keys = user.by_created
+            low = bisect_right(keys, (created_after, _MAX_OBJECT_ID)) if created_after is not None else 0
+            high = bisect_left(keys, (created_before,)) if created_before is not None else len(keys)
+
+        if after is not None:
+            after_key = (_to_stored(after[0]), after[1])
+            if direction == ASCENDING:
+                low = max(low, bisect_right(keys, after_key))
+            else:
+                high = min(high, bisect_left(keys, after_key))
+
+        positions = range(low, high) if direction == ASCENDING else range(high - 1, low - 1, -1)
+        documents = []
+        for position in positions:
+            document = user.documents[keys[position][1]]
+            if _matches(document, list_query, created_after, created_before, updated_since):
+                documents.append(document)
+                if len(documents) == limit:
+                    break
+        return documents
+
+    async def find_page(self, owner_id: ObjectId, list_query: TaskListQuery, sort: Sort,
+                        fields: Optional[tuple], limit: int, after: Optional[Position] = None) -> List[dict]:
+        return [_project(document, fields) for document in self._select(owner_id, list_query, sort, limit, after)]
+
+    async def iterate(self, owner_id: ObjectId, list_query: TaskListQuery, sort: Sort,
+                      fields: Optional[tuple]) -> AsyncIterator[dict]:
+        # Batches are re-positioned by key, so writes between batches cannot shift the scan
+        sort_field = sort[0]
+        after = None
+        while True:
+            batch = self._select(owner_id, list_query, sort, settings.TASKS_STREAM_BATCH_SIZE, after)
+            for document in batch:
+                yield _project(document, fields)
+            if len(batch) < settings.TASKS_STREAM_BATCH_SIZE:
+                return
+            after = (batch[-1][sort_field], batch[-1]["_id"])
+            await asyncio.sleep(0)
+
+    async def update(self, owner_id: ObjectId, task_id: ObjectId, fields: dict,
+                     expected_version: Optional[int] = None) -> Optional[dict]:
+        document = self._stored_task(owner_id, task_id)
+        if document is None:
+            return None
+        # Tasks stored before versioning have no version field and count as version 0
+        version = document.get("version") or 0
+        if expected_version is not None and version != expected_version:
+            return None
+
+        user = self._users[owner_id]
+        user.remove(document)
+        user.add({**document, **_stored(fields), "version": version + 1})
+        return dict(document)
+
+    async def update_many(self, owner_id: ObjectId, updates: List[Tuple[ObjectId, dict]],
+                          expected_status: Optional[str] = None) -> Tuple[int, Set[ObjectId]]:
+        matched = 0
+        for task_id, fields in updates:
+            document = self._stored_task(owner_id, task_id)
+            if document is None or (expected_status is not None and document.get("status") != expected_status):
+                continue
+            await self.update(owner_id, task_id, fields)
+            matched += 1
+        return matched, set()
+
+    async def delete(self, owner_id: ObjectId, task_id: ObjectId) -> Optional[dict]:
+        document = self._stored_task(owner_id, task_id)
+        if document is None:
+            return None
+        self._users[owner_id].remove(document)
+        return {"_id": document["_id"], "status": document.get("status")}
+
+    async def delete_many(self, owner_id: ObjectId, task_ids: List[ObjectId], task_status: str) -> int:
+        deleted = 0
+        for task_id in dict.fromkeys(task_ids):
+            document = self._stored_task(owner_id, task_id)
+            if document is not None and document.get("status") == task_status:
+                self._users[owner_id].remove(document)
+                deleted += 1
+        return deleted
+
+    async def count_by_status(self, owner_id: Optional[ObjectId] = None) -> Dict[ObjectId, Dict[str, int]]:
+        owner_ids = [owner_id] if owner_id else list(self._users)
+        counts: Dict[ObjectId, Dict[str, int]] = {}
+        for user_id in owner_ids:
+            user = self._users.get(user_id)
+            if user is None:
+                continue
+            for task_status, keys in user.by_status_created.items():
+                if keys:
+                    counts.setdefault(user_id, {})[task_status] = len(keys)
+        return counts
+
+    async def text_search(self, owner_id: ObjectId, query: str, fields: tuple, limit: int,
+                          after: Optional[Position] = None) -> List[dict]:
+        # TaskService falls back to its in-process inverted index
+        raise TextSearchUnavailable()
+
+
+class MemoryTaskStatsRepository(TaskStatsRepository):
+    def __init__(self):
+        self._documents: Dict[ObjectId, dict] = {}
+
+    async def find(self, owner_id: ObjectId) -> Optional[dict]:
+        document = self._documents.get(owner_id)
+        if document is None:
+            return None
+        return {**document, "counts": dict(document.get("counts", {}))}
+
+    async def find_counts(self, owner_id: Optional[ObjectId] = None) -> Dict[ObjectId, Dict[str, int]]:
+        owner_ids = [owner_id] if owner_id else list(self._documents)
+        return {
+            user_id: dict(self._documents[user_id].get("counts", {}))
+            for user_id in owner_ids if user_id in self._documents
+        }
+
+    async def increment(self, owner_id: ObjectId, increments: Dict[str, int]) -> None:
+        document = self._documents.setdefault(owner_id, {"_id": owner_id})
+        for key, delta in increments.items():
+            *parents, field = key.split(".")
+            target = document
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[field] = target.get(field, 0) + delta
+
+    async def set_counts(self, owner_id: ObjectId, counts: Dict[str, int]) -> None:
+        document = self._documents.setdefault(owner_id, {"_id": owner_id})
+        document.setdefault("counts", {}).update(counts)
+
+
+class MemoryStorage(Storage):
+    """Process-local storage with no persistence, for profiling the API layer and for tests"""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self) -> None:
+        self.users = MemoryUserRepository()
+        self.refresh_tokens = MemoryRefreshTokenRepository()
+        self.tasks = MemoryTaskRepository()
+        self.task_stats = MemoryTaskStatsRepository()
+
+    async def connect(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def ping(self) -> None:
+        pass
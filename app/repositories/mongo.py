@@ -0,0 +1,288 @@
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Mapping, Optional, Set, Tuple
+from bson import ObjectId
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from ..config import settings
+from ..models.task_model import Task, TaskListQuery, TaskStats
+from ..models.user_model import RefreshTokenFamily, RevokedTokenFamily, User
+from ..utils.database import Database
+from .base import (
+    Position, RefreshTokenRepository, Sort, Storage, TaskRepository, TaskStatsRepository, TextSearchUnavailable,
+    UserRepository
+)
+
+# MongoDB error code for "text index required for $text query"
+INDEX_NOT_FOUND = 27
+
+# List reads keep each document as the BSON bytes received from the server,
+# utils.serializers decodes one at a time while encoding the response
+RAW_DOCUMENTS = CodecOptions(document_class=RawBSONDocument)
+
+
+def _projection(fields: Optional[tuple]) -> Optional[dict]:
+    return {field: 1 for field in fields} if fields is not None else None
+
+
+def _version_filter(expected_version: int) -> dict:
+    # Tasks stored before versioning have no version field and count as version 0
+    if expected_version == 0:
+        return {"version": {"$in": [0, None]}}
+    return {"version": expected_version}
+
+
+def _list_filter(owner_id: ObjectId, list_query: TaskListQuery, sort: Sort,
+                 after: Optional[Position] = None) -> dict:
+    """Mongo filter for the TaskListQuery filters, plus the keyset condition when paging"""
+    query = {"user_id": owner_id}
+    if list_query.status is not None:
+        query["status"] = list_query.status
+
+    created_range = {}
+    if list_query.created_after is not None:
+        created_range["$gt"] = list_query.created_after
+    if list_query.created_before is not None:
+        created_range["$lt"] = list_query.created_before
+    if created_range:
+        query["created_at"] = created_range
+
+    if list_query.updated_since is not None:
+        query["updated_at"] = {"$gte": list_query.updated_since}
+
+    if after is None:
+        return query
+
+    sort_field, direction = sort
+    sort_value, last_id = after
+    operator = "$gt" if direction == ASCENDING else "$lt"
+    keyset = {"$or": [
+        {sort_field: {operator: sort_value}},
+        {sort_field: sort_value, "_id": {operator: last_id}},
+    ]}
+    return {"$and": [query, keyset]}
+
+
+class MongoUserRepository(UserRepository):
+    async def insert(self, document: dict) -> bool:
+        collection = await Database.get_collection(User.collection_name)
+        try:
+            # Uniqueness is enforced by the users.email index
+            await collection.insert_one(document)
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def find_by_email(self, email: str) -> Optional[dict]:
+        collection = await Database.get_collection(User.collection_name)
+        return await collection.find_one({"email": email})
+
+    async def find_by_id(self, user_id: ObjectId) -> Optional[dict]:
+        collection = await Database.get_collection(User.collection_name)
+        return await collection.find_one({"_id": user_id})
+
+    async def update_password_hash(self, user_id: ObjectId, hashed_password: str) -> None:
+        collection = await Database.get_collection(User.collection_name)
+        await collection.update_one({"_id": user_id}, {"$set": {"hashed_password": hashed_password}})
+
+
+class MongoRefreshTokenRepository(RefreshTokenRepository):
+    async def create_family(self, family_id: ObjectId, user_id: ObjectId, expires_at: datetime) -> None:
+        collection = await Database.get_collection(RefreshTokenFamily.collection_name)
+        await collection.insert_one({"_id": family_id, "user_id": user_id, "generation": 0, "expires_at": expires_at})
+
+    async def advance_family(self, family_id: ObjectId, generation: int, expires_at: datetime) -> bool:
+        collection = await Database.get_collection(RefreshTokenFamily.collection_name)
+        result = await collection.update_one(
+            {"_id": family_id, "generation": generation},
+            {"$inc": {"generation": 1}, "$set": {"expires_at": expires_at}}
+        )
+        return result.modified_count == 1
+
+    async def revoke_family(self, family_id: ObjectId, user_id: ObjectId, expires_at: datetime) -> None:
+        revoked = await Database.get_collection(RevokedTokenFamily.collection_name)
+        await revoked.update_one(
+            {"_id": family_id},
+            {"$set": {"user_id": user_id, "expires_at": expires_at}},
+            upsert=True
+        )
+        families = await Database.get_collection(RefreshTokenFamily.collection_name)
+        await families.delete_one({"_id": family_id})
+
+    async def is_revoked(self, family_id: ObjectId) -> bool:
+        collection = await Database.get_collection(RevokedTokenFamily.collection_name)
+        return await collection.find_one({"_id": family_id}, {"_id": 1}) is not None
+
+
+class MongoTaskRepository(TaskRepository):
+    async def insert(self, document: dict) -> None:
+        collection = await Database.get_collection(Task.collection_name)
+        await collection.insert_one(document)
+
+    async def insert_many(self, documents: List[dict]) -> Dict[int, str]:
+        collection = await Database.get_collection(Task.collection_name)
+        errors = {}
+        try:
+            await collection.insert_many(documents, ordered=False)
+        except BulkWriteError as exc:
+            for write_error in exc.details.get("writeErrors", []):
+                errors[write_error["index"]] = write_error.get("errmsg", "Insert failed")
+        return errors
+
+    async def find_one(self, owner_id: ObjectId, task_id: ObjectId) -> Optional[dict]:
+        collection = await Database.get_collection(Task.collection_name)
+        return await collection.find_one({"_id": task_id, "user_id": owner_id})
+
+    async def find_many(self, owner_id: ObjectId, task_ids: Optional[List[ObjectId]] = None,
+                        fields: Optional[tuple] = None) -> List[dict]:
+        collection = await Database.get_collection(Task.collection_name)
+        query = {"user_id": owner_id}
+        if task_ids is not None:
+            query["_id"] = {"$in": task_ids}
+        return await collection.find(query, _projection(fields)).to_list(length=None)
+
+    async def find_page(self, owner_id: ObjectId, list_query: TaskListQuery, sort: Sort,
+                        fields: Optional[tuple], limit: int, after: Optional[Position] = None) -> List[Mapping]:
+        collection = (await Database.get_collection(Task.collection_name)).with_options(codec_options=RAW_DOCUMENTS)
+        sort_field, direction = sort
+        tasks_cursor = collection.find(
+            _list_filter(owner_id, list_query, sort, after), _projection(fields)
+        ).sort([(sort_field, direction), ("_id", direction)]).limit(limit)
+        return await tasks_cursor.to_list(length=None)
+
+    async def _iterate(self, owner_id: ObjectId, list_query: TaskListQuery, sort: Sort,
+                       fields: Optional[tuple]) -> AsyncIterator[Mapping]:
+        collection = (await Database.get_collection(Task.collection_name)).with_options(codec_options=RAW_DOCUMENTS)
+        sort_field, direction = sort
+        tasks_cursor = collection.find(
+            _list_filter(owner_id, list_query, sort), _projection(fields)
+        ).sort([(sort_field, direction), ("_id", direction)]).batch_size(settings.TASKS_STREAM_BATCH_SIZE)
+        async for document in tasks_cursor:
+            yield document
+
+    def iterate(self, owner_id: ObjectId, list_query: TaskListQuery, sort: Sort,
+                fields: Optional[tuple]) -> AsyncIterator[Mapping]:
+        return self._iterate(owner_id, list_query, sort, fields)
+
+    async def update(self, owner_id: ObjectId, task_id: ObjectId, fields: dict,
+                     expected_version: Optional[int] = None) -> Optional[dict]:
+        collection = await Database.get_collection(Task.collection_name)
+        query = {"_id": task_id, "user_id": owner_id}
+        if expected_version is not None:
+            query.update(_version_filter(expected_version))
+
+        return await collection.find_one_and_update(
+            query,
+            {"$set": fields, "$inc": {"version": 1}},
+            return_document=ReturnDocument.BEFORE
+        )
+
+    async def update_many(self, owner_id: ObjectId, updates: List[Tuple[ObjectId, dict]],
+                          expected_status: Optional[str] = None) -> Tuple[int, Set[ObjectId]]:
+        collection = await Database.get_collection(Task.collection_name)
+        query = {"user_id": owner_id}
+        if expected_status is not None:
+            query["status"] = expected_status
+        operations = [
+            UpdateOne({**query, "_id": task_id}, {"$set": fields, "$inc": {"version": 1}})
+            for task_id, fields in updates
+        ]
+
+        try:
+            result = await collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as exc:
+            failed = {updates[write_error["index"]][0] for write_error in exc.details.get("writeErrors", [])}
+            return exc.details.get("nMatched", 0), failed
+        return result.matched_count, set()
+
+    async def delete(self, owner_id: ObjectId, task_id: ObjectId) -> Optional[dict]:
+        collection = await Database.get_collection(Task.collection_name)
+        return await collection.find_one_and_delete(
+            {"_id": task_id, "user_id": owner_id},
+            projection={"status": 1}
+        )
+
+    async def delete_many(self, owner_id: ObjectId, task_ids: List[ObjectId], task_status: str) -> int:
+        collection = await Database.get_collection(Task.collection_name)
+        result = await collection.delete_many({"user_id": owner_id, "_id": {"$in": task_ids}, "status": task_status})
+        return result.deleted_count
+
+    async def count_by_status(self, owner_id: Optional[ObjectId] = None) -> Dict[ObjectId, Dict[str, int]]:
+        collection = await Database.get_collection(Task.collection_name)
+        match = {"user_id": owner_id} if owner_id else {}
+        counts: Dict[ObjectId, Dict[str, int]] = {}
+        async for row in collection.aggregate([
+            {"$match": match},
+            {"$group": {"_id": {"user_id": "$user_id", "status": "$status"}, "count": {"$sum": 1}}},
+        ]):
+            counts.setdefault(row["_id"]["user_id"], {})[row["_id"]["status"]] = row["count"]
+        return counts
+
+    async def text_search(self, owner_id: ObjectId, query: str, fields: tuple, limit: int,
+                          after: Optional[Position] = None) -> List[dict]:
+        pipeline = [
+            {"$match": {"user_id": owner_id, "$text": {"$search": query}}},
+            {"$project": {
+                **{field: 1 for field in fields},
+                "score": {"$meta": "textScore"},
+            }},
+        ]
+        if after is not None:
+            last_score, last_id = after
+            pipeline.append({"$match": {"$or": [
+                {"score": {"$lt": last_score}},
+                {"score": last_score, "_id": {"$gt": last_id}},
+            ]}})
+        pipeline += [{"$sort": {"score": -1, "_id": 1}}, {"$limit": limit}]
+
+        collection = await Database.get_collection(Task.collection_name)
+        try:
+            return await collection.aggregate(pipeline).to_list(length=None)
+        except OperationFailure as exc:
+            if exc.code == INDEX_NOT_FOUND:
+                raise TextSearchUnavailable() from exc
+            raise
+
+
+class MongoTaskStatsRepository(TaskStatsRepository):
+    async def find(self, owner_id: ObjectId) -> Optional[dict]:
+        collection = await Database.get_collection(TaskStats.collection_name)
+        return await collection.find_one({"_id": owner_id})
+
+    async def find_counts(self, owner_id: Optional[ObjectId] = None) -> Dict[ObjectId, Dict[str, int]]:
+        collection = await Database.get_collection(TaskStats.collection_name)
+        query = {"_id": owner_id} if owner_id else {}
+        return {
+            document["_id"]: document.get("counts", {})
+            async for document in collection.find(query, {"counts": 1})
+        }
+
+    async def increment(self, owner_id: ObjectId, increments: Dict[str, int]) -> None:
+        collection = await Database.get_collection(TaskStats.collection_name)
+        await collection.update_one({"_id": owner_id}, {"$inc": increments}, upsert=True)
+
+    async def set_counts(self, owner_id: ObjectId, counts: Dict[str, int]) -> None:
+        collection = await Database.get_collection(TaskStats.collection_name)
+        await collection.update_one(
+            {"_id": owner_id},
+            {"$set": {f"counts.{key}": value for key, value in counts.items()}},
+            upsert=True
+        )
+
+
+class MongoStorage(Storage):
+    def __init__(self):
+        self.users = MongoUserRepository()
+        self.refresh_tokens = MongoRefreshTokenRepository()
+        self.tasks = MongoTaskRepository()
+        self.task_stats = MongoTaskStatsRepository()
+
+    async def connect(self) -> None:
+        await Database.connect()
+
+    async def close(self) -> None:
+        await Database.close()
+
+    async def ping(self) -> None:
+        await Database.ping()
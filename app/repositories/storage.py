@@ -0,0 +1,18 @@
+from ..config import settings
+from .base import Storage
+
+STORAGE_BACKENDS = ("mongo", "memory")
+
+
+def create_storage(backend: str) -> Storage:
+    """Build the storage backend named by Settings.STORAGE_BACKEND"""
+    if backend == "mongo":
+        from .mongo import MongoStorage
+        return MongoStorage()
+    if backend == "memory":
+        from .memory import MemoryStorage
+        return MemoryStorage()
+    raise ValueError(f"Unknown storage backend {backend!r}, expected one of: {', '.join(STORAGE_BACKENDS)}")
+
+
+storage = create_storage(settings.STORAGE_BACKEND)
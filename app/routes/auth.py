@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from ..models.user_model import UserCreate, UserInDB, Token
+from ..models.user_model import UserCreate, UserInDB, Token, RefreshRequest
 from ..services.auth_service import AuthService
 
 router = APIRouter(tags=["Authentication"])
@@ -42,4 +42,19 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    return AuthService.create_user_token(str(user.user_id))
\ No newline at end of file
+    return await AuthService.issue_tokens(str(user.user_id))
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(request: RefreshRequest):
+    """Exchange a refresh token for a new access token and a new refresh token"""
+    tokens = await AuthService.refresh_tokens(request.refresh_token)
+
+    if not tokens:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    return tokens
\ No newline at end of file
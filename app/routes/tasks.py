@@ -1,15 +1,68 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
-from typing import List
-from ..models.task_model import TaskCreate, TaskUpdate, TaskInDB
-from ..services.task_service import TaskService
+from typing import Optional
+from ..config import settings
+from ..models.task_model import (
+    TaskCreate, TaskUpdate, TaskInDB, TaskPage, TaskListQuery, TaskStatus, TaskStatsResponse, TaskSearchPage,
+    TaskBulkCreate, TaskBulkUpdate, TaskBulkDelete, TaskBulkResult
+)
+from ..services.task_service import (
+    TaskService, TaskVersionConflict, DEFAULT_LIST_FIELDS, TASK_FIELDS, TASK_SORTS
+)
+from ..utils.search import SEARCH_RESULT_FIELDS
+from ..utils.events import task_events
 from ..utils.security import decode_access_token
+from ..utils.etags import etag_matches, list_etag, not_modified, task_etag
+from ..utils.response_cache import CachedResponse, response_cache
+from ..utils.serializers import (
+    dumps, json_response, task_document_to_json_dict, task_json, task_ndjson_line, task_page_json
+)
 from ..services.auth_service import AuthService
 
 router = APIRouter(tags=["Tasks"])
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+SSE_MEDIA_TYPE = "text/event-stream"
+
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """Extract the expected task version from an If-Match header, None means unconditional.
+
+    Accepts either a bare version or the task's ETag ("<task_id>-<version>").
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+
+    value = if_match.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    value = value.strip('"').rpartition("-")[2]
+
+    if not value.isdigit():
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="If-Match must be a task version"
+        )
+    return int(value)
+
+
+def bulk_response(ids, results):
+    items = []
+    for index, (task_id, (task, error)) in enumerate(zip(ids, results)):
+        items.append({
+            "index": index,
+            "id": str(task.task_id) if task else task_id,
+            "task": task_document_to_json_dict(task.to_dict()) if task else None,
+            "error": error
+        })
+
+    failed = sum(1 for item in items if item["error"])
+    return json_response(dumps({"succeeded": len(items) - failed, "failed": failed, "items": items}))
+
 
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     payload = decode_access_token(token)
@@ -22,7 +75,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    user = await AuthService.get_user_by_id(user_id)
+    user = await AuthService.get_cached_user_by_id(user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -42,36 +95,208 @@ async def create_task(task_data: TaskCreate, current_user=Depends(get_current_us
         user_id=str(current_user.user_id)
     )
 
-    return {
-        "_id": str(task.task_id),
-        "title": task.title,
-        "description": task.description,
-        "status": task.status,
-        "user_id": str(task.user_id),
-        "created_at": task.created_at,
-        "updated_at": task.updated_at
-    }
-
-
-@router.get("/", response_model=List[TaskInDB])
-async def get_all_tasks(current_user=Depends(get_current_user)):
-    tasks = await TaskService.get_tasks_by_user(str(current_user.user_id))
-
-    return [
-        {
-            "_id": str(task.task_id),
-            "title": task.title,
-            "description": task.description,
-            "status": task.status,
-            "user_id": str(task.user_id),
-            "created_at": task.created_at,
-            "updated_at": task.updated_at
-        } for task in tasks
+    return json_response(
+        task_json(task.to_dict()),
+        status_code=status.HTTP_201_CREATED,
+        etag=task_etag(task.task_id, task.version)
+    )
+
+
+@router.post("/bulk", response_model=TaskBulkResult)
+async def create_tasks_bulk(batch: TaskBulkCreate, current_user=Depends(get_current_user)):
+    results = await TaskService.create_tasks(
+        user_id=str(current_user.user_id),
+        tasks_data=[task_data.model_dump() for task_data in batch.tasks]
+    )
+
+    return bulk_response([None] * len(results), results)
+
+
+@router.patch("/bulk", response_model=TaskBulkResult)
+async def update_tasks_bulk(batch: TaskBulkUpdate, current_user=Depends(get_current_user)):
+    updates = [
+        (item.id, item.model_dump(exclude={"id"}, exclude_unset=True))
+        for item in batch.tasks
     ]
+    results = await TaskService.update_tasks(
+        user_id=str(current_user.user_id),
+        updates=updates
+    )
+
+    return bulk_response([item.id for item in batch.tasks], results)
+
+
+@router.delete("/bulk", response_model=TaskBulkResult)
+async def delete_tasks_bulk(batch: TaskBulkDelete, current_user=Depends(get_current_user)):
+    errors = await TaskService.delete_tasks(
+        user_id=str(current_user.user_id),
+        task_ids=batch.ids
+    )
+
+    return bulk_response(batch.ids, [(None, error) for error in errors])
+
+
+@router.get("/stats", response_model=TaskStatsResponse)
+async def get_task_stats(current_user=Depends(get_current_user)):
+    counts = await TaskService.get_stats(str(current_user.user_id))
+    return json_response(dumps({"counts": counts, "total": sum(counts.values())}))
+
+
+@router.get("/search", response_model=TaskSearchPage)
+async def search_tasks(
+    q: str = Query(..., min_length=1, description="Words to look for in task titles and descriptions"),
+    limit: int = Query(settings.TASKS_DEFAULT_PAGE_SIZE, ge=1, le=settings.TASKS_MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="Opaque cursor taken from a previous page's next_cursor"),
+    current_user=Depends(get_current_user)
+):
+    try:
+        documents, next_cursor = await TaskService.search_tasks(
+            user_id=str(current_user.user_id),
+            query=q,
+            limit=limit,
+            after=after
+        )
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc)
+        )
+
+    return json_response(task_page_json(documents, next_cursor, (*SEARCH_RESULT_FIELDS, "score")))
+
+
+async def task_event_stream(subscription):
+    """Render broker events as Server-Sent Events, with comment frames as heartbeats"""
+    try:
+        yield "retry: 3000\n\n"
+        dropped = 0
+        while True:
+            event = await subscription.get(timeout=settings.EVENTS_HEARTBEAT_SECONDS)
+            if subscription.dropped > dropped:
+                # The client fell behind and lost events, it has to refetch
+                yield f"event: overflow\ndata: {{\"dropped\": {subscription.dropped - dropped}}}\n\n"
+                dropped = subscription.dropped
+            if event is None:
+                yield ": heartbeat\n\n"
+                continue
+            yield f"id: {event.id}\nevent: {event.type}\ndata: {event.data}\n\n"
+    finally:
+        task_events.unsubscribe(subscription)
+
+
+@router.get("/events", responses={200: {"content": {SSE_MEDIA_TYPE: {}}}})
+async def get_task_events(
+    last_event_id: Optional[str] = Header(None),
+    current_user=Depends(get_current_user)
+):
+    """Live feed of created, updated and deleted events for the current user's tasks"""
+    subscription = task_events.subscribe(str(current_user.user_id), last_event_id)
+    return StreamingResponse(
+        task_event_stream(subscription),
+        media_type=SSE_MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def task_list_query(
+    status: Optional[TaskStatus] = Query(None),
+    created_after: Optional[datetime] = Query(None),
+    created_before: Optional[datetime] = Query(None),
+    updated_since: Optional[datetime] = Query(None, description="Required when sorting by updated_at"),
+    sort: str = Query("created_at", description=f"One of: {', '.join(TASK_SORTS)}"),
+    fields: Optional[str] = Query(
+        None,
+        description=f"Comma separated subset of: {', '.join(TASK_FIELDS)}. "
+                    f"Pages default to every field but description, streams to every field"
+    )
+) -> TaskListQuery:
+    return TaskListQuery(
+        status=status,
+        created_after=created_after,
+        created_before=created_before,
+        updated_since=updated_since,
+        sort=sort,
+        fields=[field.strip() for field in fields.split(",") if field.strip()] if fields else None
+    )
+
+
+def cached_response(cached: CachedResponse, if_none_match: Optional[str]):
+    if etag_matches(if_none_match, cached.etag):
+        return not_modified(cached.etag)
+    return json_response(cached.body, etag=cached.etag)
+
+
+async def stream_tasks(documents, fields):
+    """Serialize tasks one per line as they come off the Motor cursor"""
+    async for document in documents:
+        yield task_ndjson_line(document, fields)
+
+
+@router.get(
+    "/",
+    response_model=TaskPage,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}, 304: {"description": "Not Modified"}}
+)
+async def get_all_tasks(
+    request: Request,
+    limit: int = Query(settings.TASKS_DEFAULT_PAGE_SIZE, ge=1, le=settings.TASKS_MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="Opaque cursor taken from a previous page's next_cursor"),
+    stream: bool = Query(False, description="Stream every matching task as NDJSON instead of returning a page"),
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    list_query: TaskListQuery = Depends(task_list_query),
+    current_user=Depends(get_current_user)
+):
+    try:
+        if stream or (accept and NDJSON_MEDIA_TYPE in accept):
+            documents = await TaskService.iter_tasks_by_user(
+                user_id=str(current_user.user_id),
+                list_query=list_query
+            )
+            return StreamingResponse(
+                stream_tasks(documents, list_query.fields),
+                media_type=NDJSON_MEDIA_TYPE
+            )
 
+        cache_key = f"list:{request.url.query}"
+        generation, cached = await response_cache.get(str(current_user.user_id), cache_key)
+        if cached is not None:
+            return cached_response(cached, if_none_match)
+
+        # Read the change counter before the list so the ETag can only be older than the content
+        list_version = await TaskService.get_list_version(str(current_user.user_id))
+        etag = list_etag(str(current_user.user_id), list_version, str(request.url.query))
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+        documents, next_cursor = await TaskService.get_tasks_by_user(
+            user_id=str(current_user.user_id),
+            limit=limit,
+            after=after,
+            list_query=list_query
+        )
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc)
+        )
+
+    body = task_page_json(documents, next_cursor, list_query.fields or DEFAULT_LIST_FIELDS)
+    await response_cache.set(str(current_user.user_id), cache_key, generation, CachedResponse(etag, body))
+    return json_response(body, etag=etag)
+
+
+@router.get("/{task_id}", response_model=TaskInDB, responses={304: {"description": "Not Modified"}})
+async def get_task(
+    task_id: str,
+    if_none_match: Optional[str] = Header(None),
+    current_user=Depends(get_current_user)
+):
+    cache_key = f"task:{task_id}"
+    generation, cached = await response_cache.get(str(current_user.user_id), cache_key)
+    if cached is not None:
+        return cached_response(cached, if_none_match)
 
-@router.get("/{task_id}", response_model=TaskInDB)
-async def get_task(task_id: str, current_user=Depends(get_current_user)):
     task = await TaskService.get_task_by_id(
         task_id=task_id,
         user_id=str(current_user.user_id)
@@ -83,42 +308,44 @@ async def get_task(task_id: str, current_user=Depends(get_current_user)):
             detail="Task not found"
         )
 
-    return {
-        "_id": str(task.task_id),
-        "title": task.title,
-        "description": task.description,
-        "status": task.status,
-        "user_id": str(task.user_id),
-        "created_at": task.created_at,
-        "updated_at": task.updated_at
-    }
+    etag = task_etag(task.task_id, task.version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    body = task_json(task.to_dict())
+    await response_cache.set(str(current_user.user_id), cache_key, generation, CachedResponse(etag, body))
+    return json_response(body, etag=etag)
 
 
 @router.put("/{task_id}", response_model=TaskInDB)
-async def update_task(task_id: str, task_data: TaskUpdate, current_user=Depends(get_current_user)):
+async def update_task(
+    task_id: str,
+    task_data: TaskUpdate,
+    if_match: Optional[str] = Header(None, description="Task version the update is conditional on"),
+    current_user=Depends(get_current_user)
+):
     update_data = task_data.model_dump(exclude_unset=True)
 
-    task = await TaskService.update_task(
-        task_id=task_id,
-        user_id=str(current_user.user_id),
-        update_data=update_data
-    )
+    try:
+        task = await TaskService.update_task(
+            task_id=task_id,
+            user_id=str(current_user.user_id),
+            update_data=update_data,
+            expected_version=parse_if_match(if_match)
+        )
+    except TaskVersionConflict:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Task has been modified by another request"
+        )
 
     if not task:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Task not found or update failed"
+            detail="Task not found"
         )
 
-    return {
-        "_id": str(task.task_id),
-        "title": task.title,
-        "description": task.description,
-        "status": task.status,
-        "user_id": str(task.user_id),
-        "created_at": task.created_at,
-        "updated_at": task.updated_at
-    }
+    return json_response(task_json(task.to_dict()), etag=task_etag(task.task_id, task.version))
 
 
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,65 @@
+import argparse
+import importlib.util
+import logging
+import os
+import shutil
+import tempfile
+import uvicorn
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API with one uvicorn worker process per core")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    parser.add_argument("--workers", type=int,
+                        default=int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1)),
+                        help="worker processes (default: WEB_CONCURRENCY, else the CPU count)")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level.upper())
+
+    if args.workers > 1:
+        if settings.STORAGE_BACKEND == "memory":
+            parser.error("STORAGE_BACKEND=memory keeps data per process, run it with --workers 1")
+        if settings.EVENTS_SOURCE == "local":
+            logger.warning("EVENTS_SOURCE=local only streams the changes made through the same worker, "
+                           "use EVENTS_SOURCE=change_stream with several workers")
+        if settings.RESPONSE_CACHE_ENABLED and settings.RESPONSE_CACHE_BACKEND == "memory":
+            logger.warning("RESPONSE_CACHE_BACKEND=memory does not see the other workers' writes and can serve "
+                           "responses up to RESPONSE_CACHE_TTL_SECONDS old, use RESPONSE_CACHE_BACKEND=redis")
+
+    # Workers aggregate their metrics through files in this directory (see utils.metrics)
+    metrics_dir = None
+    if args.workers > 1 and not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        metrics_dir = tempfile.mkdtemp(prefix="prometheus-")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+
+    loop = "uvloop" if _available("uvloop") else "asyncio"
+    http = "httptools" if _available("httptools") else "h11"
+    logger.info("Starting %d worker(s) with the %s event loop and the %s HTTP parser", args.workers, loop, http)
+
+    try:
+        # Each worker connects, pings the database and warms up before it reports ready on /readyz
+        uvicorn.run(
+            "app.main:app",
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            loop=loop,
+            http=http,
+            log_level=args.log_level,
+        )
+    finally:
+        if metrics_dir is not None:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,56 @@
+import logging
 from datetime import datetime, timedelta
 from typing import Optional
 from bson import ObjectId
 from ..models.user_model import User
-from ..utils.security import verify_password, create_access_token
-from ..utils.database import Database
+from ..utils.security import create_access_token, create_refresh_token, decode_refresh_token
+from ..utils.hashing import password_hasher
+from ..repositories.storage import storage
+from ..utils.cache import TTLCache
 from ..config import settings
 
+logger = logging.getLogger(__name__)
+
 
 class AuthService:
+    user_cache = TTLCache(
+        max_size=settings.USER_CACHE_MAX_SIZE,
+        ttl_seconds=settings.USER_CACHE_TTL_SECONDS
+    )
+    # Family id -> revoked or not. A stale "not revoked" is harmless: the family's
+    # generation check still fails once another worker has revoked it.
+    revoked_family_cache = TTLCache(
+        max_size=settings.REVOKED_FAMILY_CACHE_MAX_SIZE,
+        ttl_seconds=settings.REVOKED_FAMILY_CACHE_TTL_SECONDS
+    )
+
     @staticmethod
     async def create_user(email: str, username: str, password: str) -> Optional[User]:
-        """Create a new user in the database"""
-        collection = await Database.get_collection(User.collection_name)
-        existing_user = await collection.find_one({"email": email})
-        if existing_user:
+        """Create a new user in the database, returns None if the email is already taken"""
+        hashed_password = await password_hasher.hash(password)
+        user = User(email=email, username=username, hashed_password=hashed_password)
+        if not await storage.users.insert(user.to_dict()):
             return None
-
-        user = User(email=email, username=username, password=password)
-        await collection.insert_one(user.to_dict())
         return user
 
     @staticmethod
     async def authenticate_user(email: str, password: str) -> Optional[User]:
-        collection = await Database.get_collection(User.collection_name)
-        user_data = await collection.find_one({"email": email})
+        user_data = await storage.users.find_by_email(email)
 
         if not user_data:
             return None
 
         user = User.from_dict(user_data)
 
-        if not verify_password(password, user_data["hashed_password"]):
+        verified, new_hash = await password_hasher.verify_and_rehash(password, user_data["hashed_password"])
+        if not verified:
             return None
 
+        if new_hash is not None:
+            # Moves the stored hash to the configured scheme and cost, only possible while the password is known
+            await storage.users.update_password_hash(user.user_id, new_hash)
+            AuthService.invalidate_cached_user(user.user_id)
+
         return user
 
     @staticmethod
@@ -46,15 +64,72 @@ class AuthService:
 
         return {"access_token": access_token, "token_type": "bearer"}
 
+    @staticmethod
+    async def issue_tokens(user_id: str) -> dict:
+        """Access token plus the first refresh token of a new token family, one per login"""
+        family_id = ObjectId()
+        refresh_token, expires_at = create_refresh_token(str(user_id), str(family_id), 0)
+        await storage.refresh_tokens.create_family(family_id, ObjectId(user_id), expires_at)
+        return {**AuthService.create_user_token(user_id), "refresh_token": refresh_token}
+
+    @staticmethod
+    async def refresh_tokens(refresh_token: str) -> Optional[dict]:
+        """Exchange a refresh token for a new access token and the next refresh token of its family.
+
+        Costs an HMAC check and one indexed update, no password hashing. Each
+        refresh token can be redeemed once: presenting an already rotated one
+        means it leaked, so the whole family is revoked. Returns None if the
+        token is invalid, expired, rotated or revoked.
+        """
+        payload = decode_refresh_token(refresh_token)
+        if payload is None or not ObjectId.is_valid(payload.get("fam")) or not ObjectId.is_valid(payload.get("sub")):
+            return None
+
+        family_id = ObjectId(payload["fam"])
+        if await AuthService.is_family_revoked(family_id):
+            return None
+
+        generation = payload.get("gen", 0)
+        next_token, expires_at = create_refresh_token(payload["sub"], payload["fam"], generation + 1)
+        if not await storage.refresh_tokens.advance_family(family_id, generation, expires_at):
+            # Rotated (or unknown) token: revoke until the newest token of the family would have expired
+            logger.warning("Refresh token reuse detected, revoking token family %s", family_id)
+            await storage.refresh_tokens.revoke_family(family_id, ObjectId(payload["sub"]), expires_at)
+            AuthService.revoked_family_cache.set(family_id, True)
+            return None
+
+        return {**AuthService.create_user_token(payload["sub"]), "refresh_token": next_token}
+
+    @staticmethod
+    async def is_family_revoked(family_id: ObjectId) -> bool:
+        return await AuthService.revoked_family_cache.get_or_load(
+            family_id, lambda: storage.refresh_tokens.is_revoked(family_id)
+        )
+
     @staticmethod
     async def get_user_by_id(user_id: str) -> Optional[User]:
         if not ObjectId.is_valid(user_id):
             return None
 
-        collection = await Database.get_collection(User.collection_name)
-        user_data = await collection.find_one({"_id": ObjectId(user_id)})
+        user_data = await storage.users.find_by_id(ObjectId(user_id))
 
         if not user_data:
             return None
 
         return User.from_dict(user_data)
+
+    @staticmethod
+    async def get_cached_user_by_id(user_id: str) -> Optional[User]:
+        """Resolve a user through the in-process cache, hitting the database only on a miss"""
+        return await AuthService.user_cache.get_or_load(
+            user_id, lambda: AuthService.get_user_by_id(user_id)
+        )
+
+    @staticmethod
+    def invalidate_cached_user(user_id: str) -> None:
+        """Must be called whenever a user record is modified or deleted"""
+        AuthService.user_cache.invalidate(str(user_id))
+
+    @staticmethod
+    def clear_user_cache() -> None:
+        AuthService.user_cache.clear()
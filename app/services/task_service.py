@@ -1,45 +1,272 @@
 from datetime import datetime, timezone
-from typing import List, Optional
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from bson import ObjectId
-from ..models.task_model import Task, PyObjectId
-from ..utils.database import Database
+from pymongo import ASCENDING, DESCENDING
+from ..models.task_model import Task, TaskListQuery, TaskStatus, PyObjectId
+from ..config import settings
+from ..repositories.base import Sort, TextSearchUnavailable
+from ..repositories.storage import storage
+from ..utils.pagination import encode_cursor, decode_cursor
+from ..utils.search import InvertedIndex, SEARCH_RESULT_FIELDS
+from ..utils.events import task_events
+from ..utils.batching import InsertBatcher
+from ..utils.response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+
+def _status_value(task_status):
+    """TaskStatus members and their plain string values compare and count the same"""
+    return getattr(task_status, "value", task_status)
+
+
+class TaskVersionConflict(Exception):
+    """The task exists but its version no longer matches the one the caller expected"""
+
+
+# Fields a client may select with `fields=`, _id is always returned
+TASK_FIELDS = ("title", "description", "status", "user_id", "created_at", "updated_at", "version")
+
+# Rounds of conditional deletes a bulk delete makes before giving up on tasks
+# whose status keeps changing under it
+BULK_DELETE_ROUNDS = 3
+
+# Paged list views leave out the (potentially large) description unless asked for
+DEFAULT_LIST_FIELDS = tuple(field for field in TASK_FIELDS if field != "description")
+
+TASK_SORTS = {
+    "created_at": ("created_at", ASCENDING),
+    "-created_at": ("created_at", DESCENDING),
+    "updated_at": ("updated_at", ASCENDING),
+    "-updated_at": ("updated_at", DESCENDING),
+}
+
+
+def _index_backs(equality_fields: List[str], sort_field: str) -> bool:
+    """Whether a declared index starts with user_id, the equality fields, then (sort_field, _id)"""
+    wanted = ["user_id", *equality_fields, sort_field, "_id"]
+    for index in Task.indexes:
+        keys = list(index.document["key"].keys())
+        if keys[:len(wanted)] == wanted:
+            return True
+    return False
+
+
+def _plan_list_query(list_query: TaskListQuery, default_fields: Optional[tuple]) -> Tuple[Sort, Optional[tuple]]:
+    """Validate a TaskListQuery and resolve its sort and the fields to fetch.
+
+    Raises ValueError for unknown sorts or fields and for combinations that no
+    declared index can serve, whichever storage backend is in use.
+    """
+    if list_query.sort not in TASK_SORTS:
+        raise ValueError(f"Unsupported sort, expected one of: {', '.join(TASK_SORTS)}")
+    sort_field, direction = TASK_SORTS[list_query.sort]
+
+    equality_fields = ["status"] if list_query.status is not None else []
+
+    if list_query.updated_since is None and sort_field == "updated_at":
+        # Never-updated tasks have updated_at = None, which keyset paging cannot step over
+        raise ValueError("Sorting by updated_at requires updated_since")
+
+    if not _index_backs(equality_fields, sort_field):
+        raise ValueError(f"Sorting by {list_query.sort} is not supported with these filters")
+
+    fields = list_query.fields or default_fields
+    if fields is not None:
+        unknown = set(fields) - set(TASK_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        # The sort key is needed to build the next cursor
+        fields = tuple(dict.fromkeys((*fields, sort_field)))
+
+    return (sort_field, direction), fields
 
 
 class TaskService:
+    search_index = InvertedIndex(
+        max_users=settings.SEARCH_FALLBACK_MAX_USERS,
+        ttl_seconds=settings.SEARCH_FALLBACK_TTL_SECONDS
+    )
+    # While the text index is unavailable searches use search_index until this time
+    _text_search_retry_at = 0.0
+    # Used by create_task when TASKS_INSERT_BATCHING_ENABLED. The repository is
+    # looked up on each write because MemoryStorage.clear() replaces it.
+    insert_batcher = InsertBatcher(
+        lambda documents: storage.tasks.insert_many(documents),
+        max_size=settings.TASKS_INSERT_BATCH_MAX_SIZE,
+        window_seconds=settings.TASKS_INSERT_BATCH_WINDOW_SECONDS
+    )
+
     @staticmethod
-    async def create_task(title: str, user_id: str, description: Optional[str] = None, status: str = "pending") -> Task:
-        collection = await Database.get_collection(Task.collection_name)
+    def _publish(event_type: str, document: dict) -> None:
+        # With a change stream source every write reaches the broker through MongoDB instead
+        if settings.EVENTS_SOURCE == "local":
+            task_events.publish_task(event_type, document)
+
+    @staticmethod
+    async def get_list_version(user_id: str) -> int:
+        """Per-user change counter, bumped after every write to the user's tasks.
+
+        It lives in the database rather than in process memory so every worker
+        agrees on it, which is what makes list ETags safe to compare.
+        """
+        stats = await storage.task_stats.find(PyObjectId(user_id))
+        return stats.get("list_version", 0) if stats else 0
+
+    @staticmethod
+    async def _record_change(user_id: str, status_deltas: Optional[Dict[str, int]] = None) -> None:
+        """Bump the list version and apply per-status count deltas in one atomic $inc.
+
+        Also invalidates the user's cached responses, after the write so a
+        response built from the old data cannot be cached under the new generation.
+        """
+        increments = {"list_version": 1}
+        for task_status, delta in (status_deltas or {}).items():
+            key = f"counts.{_status_value(task_status)}"
+            increments[key] = increments.get(key, 0) + delta
+
+        await storage.task_stats.increment(PyObjectId(user_id), increments)
+        await response_cache.invalidate(user_id)
+
+    @staticmethod
+    async def get_stats(user_id: str) -> Dict[str, int]:
+        """Task counts by status, read from the user's task_stats document in O(1)"""
+        stats = await storage.task_stats.find(PyObjectId(user_id))
+        counts = (stats or {}).get("counts", {})
+        return {task_status.value: counts.get(task_status.value, 0) for task_status in TaskStatus}
+
+    @staticmethod
+    async def reconcile_stats(user_id: Optional[str] = None) -> int:
+        """Recompute task counts from the tasks and repair drifted task_stats documents.
 
+        Counters are maintained incrementally, so a crash between a task write
+        and its $inc (or tasks written before stats existed) leaves them off.
+        Returns the number of users whose counts were repaired.
+        """
+        owner_id = PyObjectId(user_id) if user_id else None
+        actual = await storage.tasks.count_by_status(owner_id)
+        stored = await storage.task_stats.find_counts(owner_id)
+
+        repaired = 0
+        for stats_owner_id in set(actual) | set(stored):
+            counts = {
+                task_status.value: actual.get(stats_owner_id, {}).get(task_status.value, 0)
+                for task_status in TaskStatus
+            }
+            current = stored.get(stats_owner_id, {})
+            if all(current.get(key, 0) == value for key, value in counts.items()):
+                continue
+
+            await storage.task_stats.set_counts(stats_owner_id, counts)
+            repaired += 1
+
+        return repaired
+
+    @staticmethod
+    async def create_task(title: str, user_id: str, description: Optional[str] = None, status: str = "pending") -> Task:
         task = Task(
             title=title,
             description=description,
             status=status,
             user_id=PyObjectId(user_id)
         )
-
-        await collection.insert_one(task.to_dict())
+        # A cancelled request must not leave an inserted task without its
+        # stats, cache invalidation, index entry and event. The other writes
+        # are shielded the same way.
+        await asyncio.shield(TaskService._store_new_task(task, user_id))
         return task
 
     @staticmethod
-    async def get_tasks_by_user(user_id: str) -> List[Task]:
-        collection = await Database.get_collection(Task.collection_name)
-        tasks_cursor = collection.find({"user_id": PyObjectId(user_id)})
+    async def _store_new_task(task: Task, user_id: str) -> None:
+        if settings.TASKS_INSERT_BATCHING_ENABLED:
+            await TaskService.insert_batcher.insert(task.to_dict())
+        else:
+            await storage.tasks.insert(task.to_dict())
+        await TaskService._record_change(user_id, {task.status: 1})
+        TaskService.search_index.add(task.to_dict())
+        TaskService._publish("created", task.to_dict())
+
+    @staticmethod
+    async def create_tasks(user_id: str, tasks_data: List[dict]) -> List[Tuple[Optional[Task], Optional[str]]]:
+        """Insert a batch of tasks with a single unordered insert.
+
+        Returns a (task, error) pair per input item, in input order.
+        """
+        return await asyncio.shield(TaskService._create_tasks(user_id, tasks_data))
+
+    @staticmethod
+    async def _create_tasks(user_id: str, tasks_data: List[dict]) -> List[Tuple[Optional[Task], Optional[str]]]:
+        owner_id = PyObjectId(user_id)
+        tasks = [Task(user_id=owner_id, **task_data) for task_data in tasks_data]
+
+        errors = await storage.tasks.insert_many([task.to_dict() for task in tasks])
+
+        if len(errors) < len(tasks):
+            created = Counter(task.status for index, task in enumerate(tasks) if index not in errors)
+            await TaskService._record_change(user_id, created)
+            for index, task in enumerate(tasks):
+                if index not in errors:
+                    TaskService.search_index.add(task.to_dict())
+                    TaskService._publish("created", task.to_dict())
+
+        return [
+            (None, errors[index]) if index in errors else (task, None)
+            for index, task in enumerate(tasks)
+        ]
+
+    @staticmethod
+    async def get_tasks_by_user(user_id: str, limit: int, after: Optional[str] = None,
+                                list_query: Optional[TaskListQuery] = None) -> Tuple[List[dict], Optional[str]]:
+        """Return one page of a user's raw task documents and the cursor of the next page.
+
+        Filtering, sorting and projection happen in the storage backend and
+        every accepted combination is served by a declared index. Documents are
+        handed to utils.serializers as-is, list views never build Task objects.
+        Raises ValueError for an invalid query or a cursor not issued by this method.
+        """
+        list_query = list_query or TaskListQuery()
+        sort, fields = _plan_list_query(list_query, DEFAULT_LIST_FIELDS)
+        sort_field = sort[0]
+
+        position = None
+        if after:
+            position = decode_cursor(after)
+            if not isinstance(position[0], datetime):
+                raise ValueError("Invalid cursor")
+
+        # Fetch one extra document to know whether another page exists
+        documents = await storage.tasks.find_page(
+            PyObjectId(user_id), list_query, sort, fields, limit + 1, position
+        )
+
+        next_cursor = None
+        if len(documents) > limit:
+            documents = documents[:limit]
+            last = documents[-1]
+            next_cursor = encode_cursor(last[sort_field], last["_id"])
+
+        return documents, next_cursor
+
+    @staticmethod
+    async def iter_tasks_by_user(user_id: str, list_query: Optional[TaskListQuery] = None) -> AsyncIterator[dict]:
+        """Return an async iterator over every matching raw task document without materialising the result set.
 
-        tasks = []
-        async for task_data in tasks_cursor:
-            tasks.append(Task.from_dict(task_data))
-        return tasks
+        The query is validated before returning, so a ValueError surfaces before streaming starts.
+        """
+        list_query = list_query or TaskListQuery()
+        sort, fields = _plan_list_query(list_query, None)
+        return storage.tasks.iterate(PyObjectId(user_id), list_query, sort, fields)
 
     @staticmethod
     async def get_task_by_id(task_id: str, user_id: str) -> Optional[Task]:
         if not ObjectId.is_valid(task_id):
             return None
 
-        collection = await Database.get_collection(Task.collection_name)
-        task_data = await collection.find_one({
-            "_id": ObjectId(task_id),
-            "user_id": PyObjectId(user_id)
-        })
+        task_data = await storage.tasks.find_one(PyObjectId(user_id), ObjectId(task_id))
 
         if not task_data:
             return None
@@ -47,43 +274,281 @@ class TaskService:
         return Task.from_dict(task_data)
 
     @staticmethod
-    async def update_task(task_id: str, user_id: str, update_data: dict) -> Optional[Task]:
+    async def update_task(task_id: str, user_id: str, update_data: dict,
+                          expected_version: Optional[int] = None) -> Optional[Task]:
+        """Atomically apply an update and return the updated task in a single round trip.
+
+        The pre-image is returned so the status counters can move from the old
+        status to the new one, and the updated task is rebuilt from it locally.
+        Returns None if the task does not exist. Raises TaskVersionConflict when
+        `expected_version` is given and the stored version differs.
+        """
+        return await asyncio.shield(TaskService._update_task(task_id, user_id, update_data, expected_version))
+
+    @staticmethod
+    async def _update_task(task_id: str, user_id: str, update_data: dict,
+                           expected_version: Optional[int] = None) -> Optional[Task]:
         if not ObjectId.is_valid(task_id):
             return None
 
-        collection = await Database.get_collection(Task.collection_name)
-
         # Only include non-None values in the update
         update_fields = {k: v for k, v in update_data.items() if v is not None}
-        
-        # Set updated_at timestamp for any actual update
-        if update_fields:
-            update_fields["updated_at"] = datetime.now(timezone.utc)
 
         # Only perform update if there are fields to update
         if not update_fields:
-            # No actual changes to make
-            return await TaskService.get_task_by_id(task_id, user_id)
+            task = await TaskService.get_task_by_id(task_id, user_id)
+            if task and expected_version is not None and task.version != expected_version:
+                raise TaskVersionConflict()
+            return task
 
-        result = await collection.update_one(
-            {"_id": ObjectId(task_id), "user_id": PyObjectId(user_id)},
-            {"$set": update_fields}
-        )
+        # Set updated_at timestamp for any actual update
+        update_fields["updated_at"] = datetime.now(timezone.utc)
 
-        if result.modified_count == 0:
+        before = await storage.tasks.update(PyObjectId(user_id), ObjectId(task_id), update_fields, expected_version)
+
+        if not before:
+            # Only a failed conditional update needs a second look to tell 404 from 412
+            if expected_version is not None and await TaskService.get_task_by_id(task_id, user_id):
+                raise TaskVersionConflict()
             return None
 
-        return await TaskService.get_task_by_id(task_id, user_id)
+        task_data = {**before, **update_fields, "version": (before.get("version") or 0) + 1}
+        status_deltas = Counter()
+        if before.get("status") != task_data["status"]:
+            status_deltas[before.get("status")] -= 1
+            status_deltas[task_data["status"]] += 1
+
+        await TaskService._record_change(user_id, status_deltas)
+        TaskService.search_index.add(task_data)
+        TaskService._publish("updated", task_data)
+        return Task.from_dict(task_data)
 
     @staticmethod
     async def delete_task(task_id: str, user_id: str) -> bool:
+        return await asyncio.shield(TaskService._delete_task(task_id, user_id))
+
+    @staticmethod
+    async def _delete_task(task_id: str, user_id: str) -> bool:
         if not ObjectId.is_valid(task_id):
             return False
 
-        collection = await Database.get_collection(Task.collection_name)
-        result = await collection.delete_one({
-            "_id": ObjectId(task_id),
-            "user_id": PyObjectId(user_id)
-        })
+        deleted = await storage.tasks.delete(PyObjectId(user_id), ObjectId(task_id))
+
+        if not deleted:
+            return False
+
+        await TaskService._record_change(user_id, {deleted["status"]: -1})
+        TaskService.search_index.remove(PyObjectId(user_id), deleted["_id"])
+        TaskService._publish("deleted", {"_id": deleted["_id"], "user_id": user_id})
+        return True
+
+    @staticmethod
+    async def update_tasks(user_id: str, updates: List[Tuple[str, dict]]) -> List[Tuple[Optional[Task], Optional[str]]]:
+        """Apply a batch of (task_id, update_data) pairs with unordered bulk writes.
+
+        Status changes are made conditional on the status read just before,
+        with one bulk write per (old, new) pair, so each write's matched count
+        is the exact counter delta. Items whose task changed status in between
+        are redone one by one from their pre-images. The tasks are then read
+        back with a single $in query. Returns a (task, error) pair per item.
+        """
+        return await asyncio.shield(TaskService._update_tasks(user_id, updates))
+
+    @staticmethod
+    async def _update_tasks(user_id: str, updates: List[Tuple[str, dict]]) -> List[Tuple[Optional[Task], Optional[str]]]:
+        owner_id = PyObjectId(user_id)
+        now = datetime.now(timezone.utc)
+
+        operations = []
+        for task_id, update_data in updates:
+            update_fields = {k: v for k, v in update_data.items() if v is not None}
+            if ObjectId.is_valid(task_id) and update_fields:
+                update_fields["updated_at"] = now
+                operations.append((ObjectId(task_id), update_fields))
+
+        status_ids = [object_id for object_id, update_fields in operations if "status" in update_fields]
+        statuses = {}
+        if status_ids:
+            for task_data in await storage.tasks.find_many(owner_id, status_ids, ("status",)):
+                statuses[task_data["_id"]] = _status_value(task_data.get("status"))
+
+        plain_operations = []
+        transitions: Dict[Tuple[str, str], List[Tuple[ObjectId, dict]]] = {}
+        for object_id, update_fields in operations:
+            if "status" not in update_fields:
+                plain_operations.append((object_id, update_fields))
+            elif object_id in statuses:
+                transition = (statuses[object_id], _status_value(update_fields["status"]))
+                transitions.setdefault(transition, []).append((object_id, update_fields))
+
+        writes = [
+            storage.tasks.update_many(owner_id, transition_operations, expected_status=old_status)
+            for (old_status, _), transition_operations in transitions.items()
+        ]
+        if plain_operations:
+            writes.append(storage.tasks.update_many(owner_id, plain_operations))
+        outcomes = await asyncio.gather(*writes)
+
+        status_deltas = Counter()
+        failed = set()
+        for (old_status, new_status), (matched, write_failed) in zip(transitions, outcomes):
+            if old_status != new_status:
+                status_deltas[old_status] -= matched
+                status_deltas[new_status] += matched
+            failed |= write_failed
+        if plain_operations:
+            failed |= outcomes[-1][1]
+
+        ids = [ObjectId(task_id) for task_id, _ in updates if ObjectId.is_valid(task_id)]
+        found = {}
+        if ids:
+            found = {task_data["_id"]: task_data for task_data in await storage.tasks.find_many(owner_id, ids)}
+
+        updated = {object_id for object_id, _ in plain_operations if object_id in found} - failed
+        redo = []
+        for (_, new_status), transition_operations in transitions.items():
+            for object_id, update_fields in transition_operations:
+                if object_id in failed or object_id not in found:
+                    continue
+                if _status_value(found[object_id].get("status")) == new_status:
+                    updated.add(object_id)
+                else:
+                    # The status precondition did not match, the task changed status in between
+                    redo.append((object_id, update_fields))
+
+        befores = await asyncio.gather(*(
+            storage.tasks.update(owner_id, object_id, update_fields) for object_id, update_fields in redo
+        ))
+        for (object_id, update_fields), before in zip(redo, befores):
+            if before is None:
+                del found[object_id]
+                continue
+            task_data = {**before, **update_fields, "version": (before.get("version") or 0) + 1}
+            found[object_id] = task_data
+            updated.add(object_id)
+            if _status_value(before.get("status")) != _status_value(task_data["status"]):
+                status_deltas[before.get("status")] -= 1
+                status_deltas[task_data["status"]] += 1
+
+        # Matched tasks that were deleted before the read-back still moved the counters
+        if updated or any(status_deltas.values()):
+            await TaskService._record_change(user_id, status_deltas)
+        for object_id in updated:
+            TaskService.search_index.add(found[object_id])
+            TaskService._publish("updated", found[object_id])
+
+        results = []
+        for task_id, _ in updates:
+            object_id = ObjectId(task_id) if ObjectId.is_valid(task_id) else None
+            if object_id in failed:
+                results.append((None, "Update failed"))
+            elif object_id not in found:
+                results.append((None, "Task not found"))
+            else:
+                results.append((Task.from_dict(found[object_id]), None))
+        return results
+
+    @staticmethod
+    async def delete_tasks(user_id: str, task_ids: List[str]) -> List[Optional[str]]:
+        """Delete a batch of tasks, returns an error (or None) per id.
+
+        The statuses are read first and the tasks deleted with one delete_many
+        per status, conditional on it, so each deleted count is the exact
+        counter delta. Tasks that changed status in between are still there
+        afterwards and go through another round.
+        """
+        return await asyncio.shield(TaskService._delete_tasks(user_id, task_ids))
+
+    @staticmethod
+    async def _delete_tasks(user_id: str, task_ids: List[str]) -> List[Optional[str]]:
+        owner_id = PyObjectId(user_id)
+        ids = list(dict.fromkeys(ObjectId(task_id) for task_id in task_ids if ObjectId.is_valid(task_id)))
+
+        status_deltas = Counter()
+        deleted_ids = set()
+        remaining = await storage.tasks.find_many(owner_id, ids, ("status",)) if ids else []
+        for _ in range(BULK_DELETE_ROUNDS):
+            if not remaining:
+                break
+            by_status: Dict[str, List[ObjectId]] = {}
+            for task_data in remaining:
+                by_status.setdefault(_status_value(task_data.get("status")), []).append(task_data["_id"])
+            counts = await asyncio.gather(*(
+                storage.tasks.delete_many(owner_id, status_ids, task_status)
+                for task_status, status_ids in by_status.items()
+            ))
+            for task_status, count in zip(by_status, counts):
+                status_deltas[task_status] -= count
+
+            attempted = [task_data["_id"] for task_data in remaining]
+            if sum(counts) == len(attempted):
+                remaining = []
+            else:
+                remaining = await storage.tasks.find_many(owner_id, attempted, ("status",))
+            deleted_ids.update(set(attempted) - {task_data["_id"] for task_data in remaining})
+
+        if deleted_ids or any(status_deltas.values()):
+            await TaskService._record_change(user_id, status_deltas)
+            for object_id in deleted_ids:
+                TaskService.search_index.remove(owner_id, object_id)
+                TaskService._publish("deleted", {"_id": object_id, "user_id": user_id})
+
+        retried = {task_data["_id"] for task_data in remaining}
+        errors = []
+        for task_id in task_ids:
+            object_id = ObjectId(task_id) if ObjectId.is_valid(task_id) else None
+            if object_id in deleted_ids:
+                errors.append(None)
+            elif object_id in retried:
+                errors.append("Delete failed")
+            else:
+                errors.append("Task not found")
+        return errors
+
+    @staticmethod
+    async def search_tasks(user_id: str, query: str, limit: int,
+                           after: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """Full-text search over a user's task titles and descriptions.
+
+        Results are ranked by relevance, paged with a (score, _id) cursor and
+        projected to SEARCH_RESULT_FIELDS plus `score`. Uses the storage
+        backend's text index and falls back to the in-process inverted index
+        when it has none.
+        Raises ValueError for a cursor not issued by this method.
+        """
+        owner_id = PyObjectId(user_id)
+        position = None
+        if after:
+            position = decode_cursor(after)
+            if not isinstance(position[0], float):
+                raise ValueError("Invalid cursor")
+
+        use_backend = settings.SEARCH_BACKEND == "mongo" or (
+            settings.SEARCH_BACKEND == "auto" and time.monotonic() >= TaskService._text_search_retry_at
+        )
+        documents = None
+        if use_backend:
+            try:
+                documents = await storage.tasks.text_search(
+                    owner_id, query, SEARCH_RESULT_FIELDS, limit + 1, position
+                )
+            except TextSearchUnavailable:
+                if settings.SEARCH_BACKEND == "mongo":
+                    raise
+                logger.warning("Text index unavailable, using the in-process search index")
+                TaskService._text_search_retry_at = time.monotonic() + settings.SEARCH_TEXT_INDEX_RETRY_SECONDS
+
+        if documents is None:
+            if not TaskService.search_index.is_loaded(owner_id):
+                await TaskService.search_index.build(
+                    owner_id, lambda: storage.tasks.find_many(owner_id, fields=(*SEARCH_RESULT_FIELDS, "description"))
+                )
+            documents = TaskService.search_index.search(owner_id, query, limit + 1, position)
+
+        next_cursor = None
+        if len(documents) > limit:
+            documents = documents[:limit]
+            last = documents[-1]
+            next_cursor = encode_cursor(last["score"], last["_id"])
 
-        return result.deleted_count > 0
+        return documents, next_cursor
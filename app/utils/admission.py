@@ -0,0 +1,237 @@
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+from urllib.parse import parse_qsl
+import orjson
+from ..config import settings
+
+
+class AdaptiveLimiter:
+    """Concurrency limit that adapts to observed latency (AIMD).
+
+    Each request completing within `latency_target` grows the limit by
+    1/limit, so about one slot per limit's worth of fast requests. A slower
+    request (or an error) multiplies it by `backoff`, at most once per
+    `latency_target` so a single slow burst does not collapse it. Requests over
+    the limit wait up to `queue_timeout` for a slot, then are shed.
+
+    Without a `latency_target` the limit stays at `initial_limit`.
+    """
+
+    def __init__(self, name: str, initial_limit: int, min_limit: int, max_limit: int,
+                 queue_timeout: float, latency_target: Optional[float], max_queue: int, backoff: float):
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.queue_timeout = queue_timeout
+        self.latency_target = latency_target
+        self.max_queue = max_queue
+        self.backoff = backoff
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.shed = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._last_decrease = 0.0
+
+    async def acquire(self) -> bool:
+        """Take a slot, waiting for one if needed. Returns False if the request is shed."""
+        if self.in_flight < int(self.limit) and not self.queued:
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+
+        if self.queued >= self.max_queue or self.queue_timeout <= 0:
+            self.shed += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.shed += 1
+            return False
+        except asyncio.CancelledError:
+            # The slot may have been handed over just before the cancellation
+            if waiter.done() and not waiter.cancelled():
+                self._release_slot()
+            raise
+        finally:
+            self.queued -= 1
+
+        self.admitted += 1
+        return True
+
+    def release(self, latency: float, failed: bool = False) -> None:
+        """Return a slot and adjust the limit from the request's latency"""
+        if self.latency_target is not None:
+            self._adapt(latency, failed)
+        self._release_slot()
+
+    def _adapt(self, latency: float, failed: bool) -> None:
+        if failed or latency > self.latency_target:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.latency_target:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = now
+        elif self.in_flight >= int(self.limit) // 2:
+            # Only grow a limit that is actually being used
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def _release_slot(self) -> None:
+        self.in_flight -= 1
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if waiter.done():  # timed out or cancelled
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "shed": self.shed,
+        }
+
+
+def _limiter(name: str, initial_limit: int, max_limit: int, queue_timeout: float,
+             latency_target: Optional[float]):
+    return AdaptiveLimiter(
+        name,
+        initial_limit=initial_limit,
+        min_limit=settings.ADMISSION_MIN_LIMIT,
+        max_limit=max_limit,
+        queue_timeout=queue_timeout,
+        latency_target=latency_target,
+        max_queue=settings.ADMISSION_MAX_QUEUE,
+        backoff=settings.ADMISSION_BACKOFF,
+    )
+
+
+limiters: Dict[str, AdaptiveLimiter] = {
+    "auth": _limiter(
+        "auth",
+        settings.ADMISSION_AUTH_LIMIT,
+        settings.ADMISSION_AUTH_MAX_LIMIT,
+        settings.ADMISSION_AUTH_QUEUE_TIMEOUT_SECONDS,
+        settings.ADMISSION_AUTH_LATENCY_TARGET_SECONDS,
+    ),
+    "task_read": _limiter(
+        "task_read",
+        settings.ADMISSION_TASK_READ_LIMIT,
+        settings.ADMISSION_TASK_READ_MAX_LIMIT,
+        settings.ADMISSION_TASK_READ_QUEUE_TIMEOUT_SECONDS,
+        settings.ADMISSION_TASK_READ_LATENCY_TARGET_SECONDS,
+    ),
+    "task_write": _limiter(
+        "task_write",
+        settings.ADMISSION_TASK_WRITE_LIMIT,
+        settings.ADMISSION_TASK_WRITE_MAX_LIMIT,
+        settings.ADMISSION_TASK_WRITE_QUEUE_TIMEOUT_SECONDS,
+        settings.ADMISSION_TASK_WRITE_LATENCY_TARGET_SECONDS,
+    ),
+    "task_stream": _limiter(
+        "task_stream",
+        settings.ADMISSION_TASK_STREAM_LIMIT,
+        settings.ADMISSION_TASK_STREAM_LIMIT,
+        settings.ADMISSION_TASK_STREAM_QUEUE_TIMEOUT_SECONDS,
+        None,
+    ),
+}
+
+_AUTH_PREFIX = f"{settings.API_V1_PREFIX}/auth/"
+_TASKS_PREFIX = f"{settings.API_V1_PREFIX}/tasks"
+# Long-lived event streams would hold a slot for their whole lifetime
+_UNLIMITED_PATHS = {f"{_TASKS_PREFIX}/events"}
+_READ_METHODS = {"GET", "HEAD"}
+_LIST_PATHS = {_TASKS_PREFIX, f"{_TASKS_PREFIX}/"}
+_NDJSON_MEDIA_TYPE = b"application/x-ndjson"
+# What FastAPI parses as true for a bool query parameter
+_TRUE_VALUES = {"1", "true", "on", "yes", "t", "y"}
+
+_SHED_BODY = orjson.dumps({"detail": "Server is busy, please retry shortly"})
+
+
+def _is_stream(query_string: bytes, accept: bytes) -> bool:
+    """Whether a task list request asks for the NDJSON export (see routes.tasks.get_all_tasks)"""
+    if _NDJSON_MEDIA_TYPE in accept:
+        return True
+    return any(
+        key == "stream" and value.lower() in _TRUE_VALUES
+        for key, value in parse_qsl(query_string.decode("latin-1"))
+    )
+
+
+def route_class(method: str, path: str, query_string: bytes = b"", accept: bytes = b"") -> Optional[str]:
+    """Admission class of a request, None for requests that are not limited"""
+    if path.startswith(_AUTH_PREFIX):
+        return "auth"
+    if path.startswith(_TASKS_PREFIX) and path not in _UNLIMITED_PATHS:
+        if method in _READ_METHODS:
+            # Exports would hold a task_read slot for the whole stream and drag its limit down
+            if path in _LIST_PATHS and _is_stream(query_string, accept):
+                return "task_stream"
+            return "task_read"
+        return "task_write"
+    return None
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware applying a separate AdaptiveLimiter per route class.
+
+    Shed requests get 503 with Retry-After without reaching the route, so a
+    login storm cannot starve task reads of the event loop or the Mongo pool.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = b""
+        for header, value in scope["headers"]:
+            if header == b"accept":
+                accept = value
+                break
+        name = route_class(scope["method"], scope["path"], scope.get("query_string", b""), accept)
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = limiters[name]
+        if not await limiter.acquire():
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(_SHED_BODY)).encode()),
+                    (b"retry-after", str(settings.ADMISSION_RETRY_AFTER_SECONDS).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": _SHED_BODY})
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            limiter.release(time.perf_counter() - started, failed=status_code >= 500)
@@ -0,0 +1,101 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+
+class BatchedInsertError(Exception):
+    """The document was rejected by the batched insert it was written with"""
+
+
+class InsertBatcher:
+    """Coalesces concurrent single-document inserts into unordered insert_many calls.
+
+    The first document of a batch starts a `window_seconds` timer, the batch is
+    written when it expires or as soon as `max_size` documents are waiting.
+    Every caller waits for its own document and gets its own error: the
+    per-index message for a rejected document, or the exception of the whole
+    insert_many.
+    """
+
+    def __init__(self, insert_many: Callable[[List[dict]], Awaitable[Dict[int, str]]],
+                 max_size: int, window_seconds: float):
+        self.insert_many = insert_many
+        self.max_size = max_size
+        self.window_seconds = window_seconds
+        self.batches = 0
+        self.documents = 0
+        self.failed = 0
+        self.wait_seconds_sum = 0.0
+        self._pending: List[Tuple[dict, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._writes: Set[asyncio.Task] = set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def insert(self, document: dict) -> None:
+        """Write `document` with the next batch, raises BatchedInsertError if it was rejected"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((document, future, time.perf_counter()))
+        if len(self._pending) >= self.max_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_seconds, self.flush)
+        await future
+
+    def flush(self) -> None:
+        """Start writing the waiting documents now"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        write = asyncio.get_running_loop().create_task(self._write(batch))
+        self._writes.add(write)
+        write.add_done_callback(self._writes.discard)
+
+    async def _write(self, batch: List[Tuple[dict, asyncio.Future, float]]) -> None:
+        started = time.perf_counter()
+        self.batches += 1
+        self.documents += len(batch)
+        self.wait_seconds_sum += sum(started - enqueued for _, _, enqueued in batch)
+
+        try:
+            errors = await self.insert_many([document for document, _, _ in batch])
+        except Exception as exc:
+            self.failed += len(batch)
+            for _, future, _ in batch:
+                # Callers cancelled meanwhile have nobody left to tell
+                if not future.done():
+                    error = BatchedInsertError(f"Batched insert failed: {exc}")
+                    error.__cause__ = exc
+                    future.set_exception(error)
+            return
+
+        self.failed += len(errors)
+        for index, (_, future, _) in enumerate(batch):
+            if future.done():
+                continue
+            if index in errors:
+                future.set_exception(BatchedInsertError(errors[index]))
+            else:
+                future.set_result(None)
+
+    async def close(self) -> None:
+        """Write whatever is still waiting and wait for the writes in progress"""
+        self.flush()
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "batches": self.batches,
+            "documents": self.documents,
+            "failed": self.failed,
+            "wait_seconds_sum": self.wait_seconds_sum,
+        }
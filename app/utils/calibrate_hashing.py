@@ -0,0 +1,81 @@
+import argparse
+import statistics
+import time
+from typing import Callable, List, Tuple
+from passlib.context import CryptContext
+from ..config import settings
+
+SAMPLE_PASSWORD = "calibration-password"
+
+
+def _measure_ms(context: CryptContext, samples: int) -> float:
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        context.hash(SAMPLE_PASSWORD)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate(make_context: Callable[[int], CryptContext], costs: range,
+              target_ms: float, samples: int) -> Tuple[int, List[Tuple[int, float]]]:
+    """Highest cost whose median hash time fits in target_ms (the lowest cost if none does)"""
+    # The first hash loads the backend, keep it out of the timings
+    make_context(costs[0]).hash(SAMPLE_PASSWORD)
+
+    chosen = costs[0]
+    timings = []
+    for cost in costs:
+        elapsed = _measure_ms(make_context(cost), samples)
+        timings.append((cost, elapsed))
+        if elapsed > target_ms:
+            break
+        chosen = cost
+    return chosen, timings
+
+
+def _bcrypt(target_ms: float, samples: int) -> List[str]:
+    rounds, timings = calibrate(
+        lambda cost: CryptContext(schemes=["bcrypt"], bcrypt__rounds=cost), range(4, 32), target_ms, samples
+    )
+    for cost, elapsed in timings:
+        print(f"bcrypt rounds={cost:<2} {elapsed:8.1f} ms")
+    return [f"PASSWORD_BCRYPT_ROUNDS={rounds}"]
+
+
+def _argon2(target_ms: float, samples: int) -> List[str]:
+    # Memory cost and parallelism are kept as configured, time cost is the knob
+    time_cost, timings = calibrate(
+        lambda cost: CryptContext(
+            schemes=["argon2"],
+            argon2__time_cost=cost,
+            argon2__memory_cost=settings.PASSWORD_ARGON2_MEMORY_COST,
+            argon2__parallelism=settings.PASSWORD_ARGON2_PARALLELISM,
+        ),
+        range(1, 64), target_ms, samples
+    )
+    for cost, elapsed in timings:
+        print(f"argon2 time_cost={cost:<2} {elapsed:8.1f} ms")
+    return [f"PASSWORD_ARGON2_TIME_COST={time_cost}"]
+
+
+CALIBRATORS = {"bcrypt": _bcrypt, "argon2": _argon2}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Pick the password hashing cost that fits a latency budget on this machine"
+    )
+    parser.add_argument("--target-ms", type=float, default=250, help="budget for one hash (default 250 ms)")
+    parser.add_argument("--scheme", choices=sorted(CALIBRATORS),
+                        default=settings.PASSWORD_HASH_SCHEMES.split(",")[0].strip())
+    parser.add_argument("--samples", type=int, default=3, help="hashes timed per cost, the median is used")
+    args = parser.parse_args()
+
+    if args.scheme not in CALIBRATORS:
+        parser.error(f"cannot calibrate {args.scheme}, expected one of: {', '.join(sorted(CALIBRATORS))}")
+
+    lines = CALIBRATORS[args.scheme](args.target_ms, args.samples)
+    print("\nAdd to .env (stored hashes are upgraded on each user's next login):")
+    for line in lines:
+        print(line)
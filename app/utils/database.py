@@ -1,5 +1,7 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from ..config import settings
+from .indexes import reconcile_indexes
+from .monitoring import CommandLatencyListener, PoolCheckoutListener
 
 
 class Database:
@@ -7,19 +9,53 @@ class Database:
     db = None
 
     @classmethod
-    async def connect(cls):
-        """Establish async connection to MongoDB using Motor"""
+    async def connect(cls, ensure_indexes: bool = True):
+        """Establish async connection to MongoDB using Motor and create the declared indexes"""
         if cls.client is None:
-            cls.client = AsyncIOMotorClient(settings.MONGODB_URL)
-            cls.db = cls.client[settings.DATABASE_NAME]
+            client = AsyncIOMotorClient(settings.MONGODB_URL, **cls.client_options())
+            db = client[settings.DATABASE_NAME]
+            if ensure_indexes:
+                # Only publish the client once the indexes are in place, a failed
+                # reconcile leaves nothing behind and the next connect retries it
+                try:
+                    await reconcile_indexes(db)
+                except BaseException:
+                    client.close()
+                    raise
+            if cls.client is not None:
+                # Another connect finished while this one reconciled
+                client.close()
+            else:
+                cls.client, cls.db = client, db
         return cls.db
 
+    @staticmethod
+    def client_options() -> dict:
+        """Pool sizing and driver instrumentation taken from Settings"""
+        options = {
+            "maxPoolSize": settings.MONGODB_MAX_POOL_SIZE,
+            "minPoolSize": settings.MONGODB_MIN_POOL_SIZE,
+            "waitQueueTimeoutMS": settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+            "serverSelectionTimeoutMS": settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+            "event_listeners": [CommandLatencyListener(), PoolCheckoutListener()],
+        }
+        if settings.MONGODB_COMPRESSORS:
+            options["compressors"] = settings.MONGODB_COMPRESSORS
+        return options
+
     @classmethod
     async def get_collection(cls, collection_name: str):
         if cls.db is None:
             await cls.connect()
         return cls.db[collection_name]
 
+    @classmethod
+    async def ping(cls):
+        """Round trip to the server, Motor itself only connects on the first operation"""
+        if cls.client is None:
+            await cls.connect()
+        await cls.client.admin.command("ping")
+
     @classmethod
     async def close(cls):
         """Close the MongoDB connection"""
@@ -0,0 +1,34 @@
+import hashlib
+from typing import Optional
+from fastapi import Response, status
+
+
+def task_etag(task_id, version: int) -> str:
+    """Strong ETag of a single task, changes whenever the task's version does"""
+    return f'"{task_id}-{version}"'
+
+
+def list_etag(user_id: str, list_version: int, query: str) -> str:
+    """Strong ETag of a task list: the user's change counter plus the exact query"""
+    digest = hashlib.blake2b(f"{user_id}:{list_version}:{query}".encode(), digest_size=12)
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison as required for If-None-Match"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
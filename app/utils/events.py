@@ -0,0 +1,177 @@
+import asyncio
+import itertools
+import logging
+import os
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional, Set
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+from ..config import settings
+from .serializers import dumps, task_document_to_json_dict
+
+logger = logging.getLogger(__name__)
+
+
+class TaskEvent:
+    __slots__ = ("id", "type", "data")
+
+    def __init__(self, event_id: str, event_type: str, data: str):
+        self.id = event_id
+        self.type = event_type
+        self.data = data
+
+
+class Subscription:
+    """A per-connection bounded queue; when full the oldest event is dropped"""
+
+    def __init__(self, user_id: str, max_size: int):
+        self.user_id = user_id
+        self.dropped = 0
+        self._events: Deque[TaskEvent] = deque()
+        self._max_size = max_size
+        self._ready = asyncio.Event()
+
+    def push(self, event: TaskEvent) -> None:
+        if len(self._events) >= self._max_size:
+            self._events.popleft()
+            self.dropped += 1
+        self._events.append(event)
+        self._ready.set()
+
+    async def get(self, timeout: float) -> Optional[TaskEvent]:
+        """Next event, or None if nothing arrived within `timeout` seconds"""
+        if not self._events:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self._events.popleft()
+
+
+class EventBroker:
+    """In-process pub/sub of task changes, fanned out per user.
+
+    Every user with recent activity keeps a small ring buffer of events so a
+    reconnecting client can resume from its Last-Event-ID.
+    """
+
+    def __init__(self, queue_size: int, replay_size: int, max_replay_users: int):
+        self.queue_size = queue_size
+        self.replay_size = replay_size
+        self.max_replay_users = max_replay_users
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._replay: "OrderedDict[str, Deque[TaskEvent]]" = OrderedDict()
+        # Process-unique prefix so ids issued by different workers never collide
+        self._prefix = f"{os.getpid():x}{ObjectId()}"
+        self._sequence = itertools.count(1)
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self._subscribers.values())
+
+    def publish(self, user_id: str, event_type: str, data: str, event_id: Optional[str] = None) -> None:
+        event = TaskEvent(event_id or f"{self._prefix}-{next(self._sequence)}", event_type, data)
+
+        buffer = self._replay.get(user_id)
+        if buffer is None:
+            buffer = self._replay[user_id] = deque(maxlen=self.replay_size)
+            while len(self._replay) > self.max_replay_users:
+                self._replay.popitem(last=False)
+        self._replay.move_to_end(user_id)
+        buffer.append(event)
+
+        for subscription in self._subscribers.get(user_id, ()):
+            subscription.push(event)
+
+    def subscribe(self, user_id: str, last_event_id: Optional[str] = None) -> Subscription:
+        subscription = Subscription(user_id, self.queue_size)
+
+        if last_event_id:
+            buffer = list(self._replay.get(user_id, ()))
+            ids = [event.id for event in buffer]
+            if last_event_id in ids:
+                for event in buffer[ids.index(last_event_id) + 1:]:
+                    subscription.push(event)
+            else:
+                # The gap cannot be replayed, the client has to refetch its tasks
+                subscription.push(TaskEvent(last_event_id, "reset", "{}"))
+
+        self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscribers.get(subscription.user_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscribers[subscription.user_id]
+
+    def publish_task(self, event_type: str, document, event_id: Optional[str] = None) -> None:
+        """Publish a task document (or, for deletes, just its _id and user_id)"""
+        if event_type == "deleted":
+            data = dumps({"_id": document["_id"]})
+        else:
+            data = dumps(task_document_to_json_dict(document))
+        self.publish(str(document["user_id"]), event_type, data.decode(), event_id)
+
+
+task_events = EventBroker(
+    queue_size=settings.EVENTS_QUEUE_SIZE,
+    replay_size=settings.EVENTS_REPLAY_SIZE,
+    max_replay_users=settings.EVENTS_REPLAY_MAX_USERS
+)
+
+_CHANGE_TYPES = {"insert": "created", "replace": "updated", "update": "updated", "delete": "deleted"}
+_WATCH_OPTIONS = {"full_document": "updateLookup", "full_document_before_change": "whenAvailable"}
+
+
+async def check_change_stream(collection) -> None:
+    """Open the change stream once so startup fails on a server that cannot serve it.
+
+    Otherwise watch_task_changes would log the same error and retry forever.
+    Change streams need a replica set, and pre-images (full_document_before_change)
+    MongoDB 6.0+.
+    """
+    try:
+        async with collection.watch(max_await_time_ms=1, **_WATCH_OPTIONS) as stream:
+            await stream.try_next()
+    except OperationFailure as exc:
+        raise RuntimeError(
+            f"EVENTS_SOURCE=change_stream requires a MongoDB 6.0+ replica set: {exc}"
+        ) from exc
+
+    options = await collection.options()
+    if not options.get("changeStreamPreAndPostImages", {}).get("enabled"):
+        logger.warning(
+            "changeStreamPreAndPostImages is not enabled on the %s collection, deletes will not be published",
+            collection.name
+        )
+
+
+async def watch_task_changes(collection, broker: EventBroker = task_events) -> None:
+    """Feed the broker from a MongoDB change stream instead of local writes.
+
+    Lets every worker see every write when several processes serve the API.
+    Deletes need the pre-image to know the owner, so the tasks collection must
+    have changeStreamPreAndPostImages enabled (MongoDB 6.0+).
+    """
+    resume_token = None
+    while True:
+        try:
+            async with collection.watch(resume_after=resume_token, **_WATCH_OPTIONS) as stream:
+                async for change in stream:
+                    resume_token = stream.resume_token
+                    event_type = _CHANGE_TYPES.get(change["operationType"])
+                    if event_type is None:
+                        continue
+
+                    document = change.get("fullDocument") or change.get("fullDocumentBeforeChange")
+                    if document is None:
+                        continue
+                    broker.publish_task(event_type, document, event_id=change["_id"]["_data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Task change stream failed, reconnecting")
+            await asyncio.sleep(1)
@@ -0,0 +1,123 @@
+import argparse
+import asyncio
+import logging
+from typing import Dict, List
+from pymongo import IndexModel
+from pymongo.errors import OperationFailure
+from ..models.task_model import Task, TaskStats
+from ..models.user_model import RefreshTokenFamily, RevokedTokenFamily, User
+
+logger = logging.getLogger(__name__)
+
+# Every model that declares an `indexes` list next to its collection_name
+INDEXED_MODELS = [User, RefreshTokenFamily, RevokedTokenFamily, Task, TaskStats]
+
+
+def _key_of(spec, weights=None) -> tuple:
+    """Comparable form of an index key.
+
+    MongoDB reports text indexes as ("_fts", "text"), ("_ftsx", 1) with the
+    indexed fields in `weights`, so both sides are folded into ("$text", fields).
+    """
+    key = []
+    text_fields = set(weights or ())
+    for field, direction in spec:
+        if field in ("_fts", "_ftsx"):
+            continue
+        if direction == "text":
+            text_fields.add(field)
+        else:
+            key.append((field, direction))
+
+    if text_fields:
+        key.append(("$text", tuple(sorted(text_fields))))
+    return tuple(key)
+
+
+def _existing_key(info: dict) -> tuple:
+    return _key_of(info["key"], info.get("weights"))
+
+
+def _declared_key(index: IndexModel) -> tuple:
+    return _key_of(index.document["key"].items())
+
+
+def declared_indexes() -> Dict[str, List[IndexModel]]:
+    return {model.collection_name: model.indexes for model in INDEXED_MODELS}
+
+
+async def reconcile_indexes(db) -> List[str]:
+    """Create every declared index that does not exist yet and return their names"""
+    created = []
+    for collection_name, indexes in declared_indexes().items():
+        collection = db[collection_name]
+        existing = {_existing_key(info) for info in (await collection.index_information()).values()}
+        missing = [index for index in indexes if _declared_key(index) not in existing]
+        if not missing:
+            continue
+
+        try:
+            created += await collection.create_indexes(missing)
+        except OperationFailure as exc:
+            # e.g. duplicate emails left over from before the unique index existed
+            logger.error("Could not create indexes on %s: %s", collection_name, exc)
+
+    return created
+
+
+async def check_indexes(db) -> Dict[str, dict]:
+    """Report declared indexes that are missing and existing ones that are undeclared or never used"""
+    report = {}
+    for collection_name, indexes in declared_indexes().items():
+        collection = db[collection_name]
+        existing = {
+            _existing_key(info): name
+            for name, info in (await collection.index_information()).items()
+        }
+        declared = {_declared_key(index): index.document["name"] for index in indexes}
+
+        usage = {}
+        try:
+            async for stats in collection.aggregate([{"$indexStats": {}}]):
+                usage[stats["name"]] = stats["accesses"]["ops"]
+        except OperationFailure as exc:
+            logger.warning("$indexStats unavailable on %s: %s", collection_name, exc)
+
+        report[collection_name] = {
+            "missing": [name for key, name in declared.items() if key not in existing],
+            "undeclared": [name for key, name in existing.items() if key not in declared and name != "_id_"],
+            "unused": [name for name, ops in usage.items() if ops == 0 and name != "_id_"],
+        }
+
+    return report
+
+
+async def _main(check: bool) -> int:
+    from .database import Database
+
+    db = await Database.connect(ensure_indexes=not check)
+    try:
+        if not check:
+            print("Indexes are up to date")
+            return 0
+
+        report = await check_indexes(db)
+        problems = 0
+        for collection_name, result in report.items():
+            for kind, names in result.items():
+                for name in names:
+                    problems += kind == "missing"
+                    print(f"{collection_name}: {kind} index {name}")
+        return 1 if problems else 0
+    finally:
+        await Database.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create the declared MongoDB indexes")
+    parser.add_argument(
+        "--check", action="store_true",
+        help="only report missing, undeclared and unused indexes (exit status 1 if any are missing)"
+    )
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(_main(args.check)))
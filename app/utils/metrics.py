@@ -0,0 +1,284 @@
+import asyncio
+import os
+import time
+from bisect import bisect_left
+from fastapi import Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+from ..services.auth_service import AuthService
+from ..services.task_service import TaskService
+from .hashing import password_hasher
+from .events import task_events
+from .security import token_cache
+from .admission import limiters
+from .response_cache import response_cache
+from ..config import settings
+
+# prometheus_client switches every metric to file-backed values when this is set,
+# so uvicorn workers can share one view of the counters (see /metrics below).
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests handled",
+    ["method", "route", "status"],
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being handled",
+    multiprocess_mode="livesum",
+)
+REQUEST_SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+RESPONSE_BYTES_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency",
+    ["method", "route", "status"],
+    buckets=REQUEST_SECONDS_BUCKETS,
+)
+HTTP_RESPONSE_BYTES = Histogram(
+    "http_response_size_bytes",
+    "HTTP response body size",
+    ["method", "route", "status"],
+    buckets=RESPONSE_BYTES_BUCKETS,
+)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class _Tally:
+    """Requests of one (method, route, status) not yet added to the prometheus metrics"""
+
+    __slots__ = ("count", "seconds_sum", "seconds_buckets", "bytes_sum", "bytes_buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds_sum = 0.0
+        # One slot per bucket bound plus +Inf, the layout of prometheus histograms
+        self.seconds_buckets = [0] * (len(REQUEST_SECONDS_BUCKETS) + 1)
+        self.bytes_sum = 0
+        self.bytes_buckets = [0] * (len(RESPONSE_BYTES_BUCKETS) + 1)
+
+
+def _add_observations(histogram, total, bucket_counts) -> None:
+    # Histogram has no bulk observe(), this is what observe() does once per observation.
+    # _sum and _buckets are private to prometheus_client, tests/test_metrics.py checks
+    # the result against observe() so an upgrade that changes them fails there.
+    histogram._sum.inc(total)
+    for bucket, count in zip(histogram._buckets, bucket_counts):
+        if count:
+            bucket.inc(count)
+
+
+def _check_histogram_internals() -> None:
+    probe = Histogram("probe", "probe", buckets=REQUEST_SECONDS_BUCKETS, registry=None)
+    if len(getattr(probe, "_buckets", ())) != len(REQUEST_SECONDS_BUCKETS) + 1 or not hasattr(probe, "_sum"):
+        raise RuntimeError("prometheus_client Histogram internals changed, see _add_observations")
+
+
+_check_histogram_internals()
+
+
+class RequestMetrics:
+    """HTTP request metrics of this process, tallied in plain Python and flushed into prometheus.
+
+    prometheus_client takes a lock on every inc() and observe(), which was most
+    of the middleware's per-request cost. Requests are only recorded from the
+    event loop, so they are counted in plain attributes and added to the
+    prometheus metrics by flush(), on every scrape. In multiprocess mode
+    workers that are not scraped also flush within METRICS_FLUSH_INTERVAL_SECONDS
+    of any change.
+    """
+
+    def __init__(self, flush_interval: float, flush_periodically: bool):
+        self.flush_interval = flush_interval
+        self.in_flight = 0
+        self._tallies = {}
+        # labels() hashes and validates on every call, so resolve each child once
+        self._children = {}
+        self.flush_periodically = flush_periodically
+        self._flush_scheduled = False
+
+    def _schedule_flush(self) -> None:
+        if self.flush_periodically and not self._flush_scheduled:
+            self._flush_scheduled = True
+            asyncio.get_running_loop().call_later(self.flush_interval, self.flush)
+
+    def started(self) -> None:
+        self.in_flight += 1
+        self._schedule_flush()
+
+    def finished(self, method: str, route: str, status_code: int, seconds: float, response_bytes: int) -> None:
+        self.in_flight -= 1
+        # A request outliving the flush interval would otherwise end with nothing scheduled
+        self._schedule_flush()
+        key = (method, route, status_code)
+        tally = self._tallies.get(key)
+        if tally is None:
+            tally = self._tallies[key] = _Tally()
+        tally.count += 1
+        tally.seconds_sum += seconds
+        tally.seconds_buckets[bisect_left(REQUEST_SECONDS_BUCKETS, seconds)] += 1
+        tally.bytes_sum += response_bytes
+        tally.bytes_buckets[bisect_left(RESPONSE_BYTES_BUCKETS, response_bytes)] += 1
+
+    def flush(self) -> None:
+        self._flush_scheduled = False
+        HTTP_REQUESTS_IN_FLIGHT.set(self.in_flight)
+
+        tallies, self._tallies = self._tallies, {}
+        for key, tally in tallies.items():
+            children = self._children.get(key)
+            if children is None:
+                labels = (key[0], key[1], str(key[2]))
+                children = self._children[key] = (
+                    HTTP_REQUESTS.labels(*labels),
+                    HTTP_REQUEST_SECONDS.labels(*labels),
+                    HTTP_RESPONSE_BYTES.labels(*labels),
+                )
+
+            requests, seconds, response_size = children
+            requests.inc(tally.count)
+            _add_observations(seconds, tally.seconds_sum, tally.seconds_buckets)
+            _add_observations(response_size, tally.bytes_sum, tally.bytes_buckets)
+
+
+request_metrics = RequestMetrics(settings.METRICS_FLUSH_INTERVAL_SECONDS, flush_periodically=MULTIPROCESS)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording request count, latency and response size.
+
+    Requests are labelled with the route template (e.g. /api/v1/tasks/{task_id})
+    rather than the raw path to keep label cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        response_bytes = 0
+
+        async def send_wrapper(message):
+            nonlocal status_code, response_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        request_metrics.started()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router stores the matched route in the (shared) scope
+            route = scope.get("route")
+            request_metrics.finished(
+                scope["method"], route.path if route else UNMATCHED_ROUTE, status_code,
+                time.perf_counter() - started, response_bytes
+            )
+
+
+class ComponentCollector:
+    """Exports the in-process counters kept by caches and pools at scrape time.
+
+    These live in plain attributes rather than prometheus metrics, so in
+    multiprocess mode they come from whichever worker serves the scrape,
+    labelled with its `pid`. The other workers' values are not reported.
+    """
+
+    def collect(self):
+        pid_labels = ["pid"] if MULTIPROCESS else []
+        pid_values = [str(os.getpid())] if MULTIPROCESS else []
+
+        def counter(name, documentation, value):
+            metric = CounterMetricFamily(name, documentation, labels=pid_labels)
+            metric.add_metric(pid_values, value)
+            return metric
+
+        def gauge(name, documentation, value):
+            metric = GaugeMetricFamily(name, documentation, labels=pid_labels)
+            metric.add_metric(pid_values, value)
+            return metric
+
+        user_cache = AuthService.user_cache.stats()
+        yield counter("user_cache_hits", "Authenticated user cache hits", user_cache["hits"])
+        yield counter("user_cache_misses", "Authenticated user cache misses", user_cache["misses"])
+        yield gauge("user_cache_size", "Entries in the authenticated user cache", user_cache["size"])
+
+        class_labels = [*pid_labels, "route_class"]
+        admission = {
+            "limit": GaugeMetricFamily("admission_limit", "Current adaptive concurrency limit", labels=class_labels),
+            "in_flight": GaugeMetricFamily("admission_in_flight", "Admitted requests in progress", labels=class_labels),
+            "queued": GaugeMetricFamily("admission_queued", "Requests waiting for a slot", labels=class_labels),
+            "admitted": CounterMetricFamily("admission_admitted", "Requests admitted", labels=class_labels),
+            "shed": CounterMetricFamily("admission_shed", "Requests shed with 503", labels=class_labels),
+        }
+        for name, limiter in limiters.items():
+            for key, value in limiter.stats().items():
+                admission[key].add_metric([*pid_values, name], value)
+        yield from admission.values()
+
+        tokens = token_cache.stats()
+        yield counter("token_cache_hits", "Access tokens served from the verified claims cache", tokens["hits"])
+        yield counter("token_cache_misses", "Access tokens decoded and verified", tokens["misses"])
+        yield gauge("token_cache_size", "Entries in the verified claims cache", tokens["size"])
+
+        hasher = password_hasher.stats()
+        yield gauge("password_hash_in_flight", "Password hashing jobs running or queued", hasher["in_flight"])
+        yield gauge("password_hash_queue_depth", "Password hashing jobs waiting for a worker", hasher["queue_depth"])
+        yield counter("password_hash_completed", "Password hashing jobs completed", hasher["completed"])
+        yield counter("password_hash_rejected", "Password hashing jobs rejected with 503", hasher["rejected"])
+        yield counter(
+            "password_hash_latency_seconds_sum",
+            "Total time spent hashing or verifying passwords, queueing included",
+            hasher["latency_seconds_sum"]
+        )
+
+        yield gauge("task_event_subscribers", "Open task event streams", task_events.subscriber_count)
+
+        responses = response_cache.stats()
+        yield counter("response_cache_hits", "Task reads served from the response cache", responses["hits"])
+        yield counter("response_cache_misses", "Task reads not found in the response cache", responses["misses"])
+        if "size_bytes" in responses:
+            yield gauge("response_cache_entries", "Responses in the in-process response cache", responses["entries"])
+            yield gauge("response_cache_size_bytes", "Bytes held by the in-process response cache", responses["size_bytes"])
+
+        batcher = TaskService.insert_batcher.stats()
+        yield gauge("task_insert_batch_pending", "Task creates waiting for their batch", batcher["pending"])
+        yield counter("task_insert_batches", "Batched task inserts written", batcher["batches"])
+        yield counter("task_insert_batched_documents", "Task creates written in batches", batcher["documents"])
+        yield counter("task_insert_batch_failed", "Batched task creates that failed", batcher["failed"])
+        yield counter(
+            "task_insert_batch_wait_seconds_sum",
+            "Total time task creates waited for their batch to be written",
+            batcher["wait_seconds_sum"]
+        )
+
+
+_component_collector = ComponentCollector()
+if not MULTIPROCESS:
+    REGISTRY.register(_component_collector)
+
+
+def metrics_response() -> Response:
+    """Render all metrics in the Prometheus text format"""
+    request_metrics.flush()
+    if MULTIPROCESS:
+        # Aggregate the files written by every worker on each scrape
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+        registry.register(_component_collector)
+    else:
+        registry = REGISTRY
+
+    return Response(content=generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
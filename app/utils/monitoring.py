@@ -0,0 +1,121 @@
+import logging
+import threading
+import time
+from pymongo import monitoring
+from prometheus_client import Counter, Gauge, Histogram
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+MONGO_COMMAND_SECONDS = Histogram(
+    "mongo_command_duration_seconds",
+    "MongoDB command latency as reported by the driver",
+    ["collection", "command"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "mongo_command_failures_total",
+    "MongoDB commands that returned an error",
+    ["collection", "command"],
+)
+MONGO_POOL_CHECKOUT_SECONDS = Histogram(
+    "mongo_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+MONGO_POOL_CHECKOUT_FAILURES = Counter(
+    "mongo_pool_checkout_failures_total",
+    "Connection checkouts that failed, e.g. waitQueueTimeoutMS expired",
+    ["reason"],
+)
+MONGO_POOL_CHECKED_OUT = Gauge(
+    "mongo_pool_connections_checked_out",
+    "Connections currently checked out of the pool",
+    multiprocess_mode="livesum",
+)
+
+
+class CommandLatencyListener(monitoring.CommandListener):
+    """Records per-command latency by collection and logs commands slower than MONGODB_SLOW_QUERY_MS"""
+
+    def __init__(self):
+        self._collections = {}
+
+    def started(self, event):
+        # The collection name only appears on the started event, e.g. {"find": "tasks", ...},
+        # except getMore, which carries the cursor id there: {"getMore": <id>, "collection": "tasks"}
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        else:
+            collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = ""
+        self._collections[(event.connection_id, event.request_id)] = collection
+
+    def succeeded(self, event):
+        self._record(event)
+
+    def failed(self, event):
+        collection = self._record(event)
+        MONGO_COMMAND_FAILURES.labels(collection, event.command_name).inc()
+
+    def _record(self, event) -> str:
+        collection = self._collections.pop((event.connection_id, event.request_id), "")
+        seconds = event.duration_micros / 1e6
+        MONGO_COMMAND_SECONDS.labels(collection, event.command_name).observe(seconds)
+
+        if seconds * 1000 >= settings.MONGODB_SLOW_QUERY_MS:
+            logger.warning(
+                "Slow MongoDB command %s on %s took %.1f ms",
+                event.command_name, collection or "-", seconds * 1000
+            )
+        return collection
+
+
+class PoolCheckoutListener(monitoring.ConnectionPoolListener):
+    """Measures how long operations wait for a pooled connection.
+
+    Check-out start and completion fire on the same driver thread, so the start
+    time is kept in a thread-local.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, "started", None)
+        if started is not None:
+            MONGO_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started)
+            self._local.started = None
+        MONGO_POOL_CHECKED_OUT.inc()
+
+    def connection_check_out_failed(self, event):
+        self._local.started = None
+        MONGO_POOL_CHECKOUT_FAILURES.labels(event.reason).inc()
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_CHECKED_OUT.dec()
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
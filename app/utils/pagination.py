@@ -0,0 +1,44 @@
+import base64
+from datetime import datetime, timedelta, timezone
+from typing import Tuple, Union
+from bson import ObjectId
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _to_millis(dt: datetime) -> int:
+    """MongoDB stores datetimes with millisecond precision"""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return (dt - _EPOCH) // timedelta(milliseconds=1)
+
+
+def encode_cursor(sort_value: Union[datetime, float], object_id: ObjectId) -> str:
+    """Build an opaque cursor pointing just after the given (sort value, _id) position.
+
+    The sort value is a datetime for listings and a relevance score for search.
+    """
+    if isinstance(sort_value, datetime):
+        value = str(_to_millis(sort_value))
+    else:
+        value = f"s{float(sort_value)!r}"
+    raw = f"{value}:{object_id}".encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[Union[datetime, float], ObjectId]:
+    """Inverse of encode_cursor, raises ValueError for malformed cursors"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, object_id = base64.urlsafe_b64decode(padded).decode().split(":")
+        if value.startswith("s"):
+            sort_value = float(value[1:])
+        else:
+            sort_value = _EPOCH + timedelta(milliseconds=int(value))
+    except Exception as exc:
+        raise ValueError("Invalid cursor") from exc
+
+    if not ObjectId.is_valid(object_id):
+        raise ValueError("Invalid cursor")
+
+    return sort_value, ObjectId(object_id)
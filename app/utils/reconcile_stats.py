@@ -0,0 +1,23 @@
+import argparse
+import asyncio
+from ..repositories.storage import storage
+from ..services.task_service import TaskService
+
+
+async def _main(user_id) -> int:
+    await storage.connect()
+    try:
+        repaired = await TaskService.reconcile_stats(user_id)
+        print(f"Repaired task counts of {repaired} user(s)")
+        return 0
+    finally:
+        await storage.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Recompute per-user task counts from the tasks collection and fix any drift"
+    )
+    parser.add_argument("--user-id", help="only reconcile this user")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(_main(args.user_id)))
@@ -0,0 +1,243 @@
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CachedResponse(NamedTuple):
+    etag: str
+    body: bytes
+
+
+class ResponseCache(ABC):
+    """Serialized JSON responses of task reads, by user and request key.
+
+    Every user has a generation counter that each write to their tasks bumps
+    (see TaskService._record_change). Responses are stored under the generation
+    read before they were built and only served while it is still current, so
+    one write makes all of the user's cached responses unreachable at once.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, user_id: str, key: str) -> Tuple[Optional[int], Optional[CachedResponse]]:
+        """The user's current generation, and the response cached under it if any.
+
+        The generation is None when it could not be read, set() then skips storing.
+        """
+        generation, response = await self._get(user_id, key)
+        if response is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return generation, response
+
+    @abstractmethod
+    async def _get(self, user_id: str, key: str) -> Tuple[Optional[int], Optional[CachedResponse]]:
+        ...
+
+    @abstractmethod
+    async def set(self, user_id: str, key: str, generation: Optional[int], response: CachedResponse) -> None:
+        ...
+
+    @abstractmethod
+    async def invalidate(self, user_id: str) -> None:
+        """Bump the user's generation"""
+
+    async def close(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class NullResponseCache(ResponseCache):
+    """Used when RESPONSE_CACHE_ENABLED is off: never stores anything"""
+
+    async def get(self, user_id: str, key: str) -> Tuple[Optional[int], Optional[CachedResponse]]:
+        return None, None
+
+    async def _get(self, user_id: str, key: str) -> Tuple[Optional[int], Optional[CachedResponse]]:
+        return None, None
+
+    async def set(self, user_id: str, key: str, generation: Optional[int], response: CachedResponse) -> None:
+        pass
+
+    async def invalidate(self, user_id: str) -> None:
+        pass
+
+
+class MemoryResponseCache(ResponseCache):
+    """In-process cache, LRU evicted to stay within `max_bytes` of cached responses.
+
+    Generations come from one process-wide clock and at most `max_users` of
+    them are kept. A user whose generation was evicted is at the highest
+    evicted generation, which no response built before their last write can
+    carry. Other processes' writes are not seen, entries expire after
+    `ttl_seconds` to bound how stale that can get.
+    """
+
+    def __init__(self, max_bytes: int, max_entry_bytes: int, max_users: int, ttl_seconds: float):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self.size_bytes = 0
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[int, CachedResponse, float, int]]" = OrderedDict()
+        self._generations: "OrderedDict[str, int]" = OrderedDict()
+        self._clock = 0
+        self._floor = 0
+
+    def _generation(self, user_id: str) -> int:
+        return self._generations.get(user_id, self._floor)
+
+    async def _get(self, user_id: str, key: str) -> Tuple[Optional[int], Optional[CachedResponse]]:
+        generation = self._generation(user_id)
+        entry = self._entries.get((user_id, key))
+        if entry is None:
+            return generation, None
+
+        entry_generation, response, expires_at, _ = entry
+        if entry_generation != generation or expires_at <= time.monotonic():
+            self._remove((user_id, key))
+            return generation, None
+
+        self._entries.move_to_end((user_id, key))
+        return generation, response
+
+    async def set(self, user_id: str, key: str, generation: Optional[int], response: CachedResponse) -> None:
+        size = len(key) + len(response.etag) + len(response.body)
+        if generation is None or size > self.max_entry_bytes:
+            return
+
+        self._remove((user_id, key))
+        self._entries[(user_id, key)] = (generation, response, time.monotonic() + self.ttl_seconds, size)
+        self.size_bytes += size
+        while self.size_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, entry_key: Tuple[str, str]) -> None:
+        entry = self._entries.pop(entry_key, None)
+        if entry is not None:
+            self.size_bytes -= entry[3]
+
+    async def invalidate(self, user_id: str) -> None:
+        self._clock += 1
+        self._generations[user_id] = self._clock
+        self._generations.move_to_end(user_id)
+        while len(self._generations) > self.max_users:
+            _, evicted = self._generations.popitem(last=False)
+            self._floor = max(self._floor, evicted)
+
+    def stats(self) -> dict:
+        return {**super().stats(), "entries": len(self._entries), "size_bytes": self.size_bytes}
+
+
+class RedisResponseCache(ResponseCache):
+    """Cache shared by every worker through a Redis-protocol server (needs the `redis` package).
+
+    Generations are Redis counters, so a write through any worker invalidates
+    the user's responses for all of them. The server bounds the size: run it
+    with `maxmemory` and `maxmemory-policy allkeys-lru`. A missing generation
+    (never written, or evicted) starts from the current time in nanoseconds,
+    past any generation an older cached response could carry. Redis errors
+    are logged and the request proceeds uncached.
+    """
+
+    def __init__(self, url: str, max_entry_bytes: int, ttl_seconds: float, prefix: str = "response_cache"):
+        super().__init__()
+        try:
+            import redis.asyncio as redis
+        except ImportError as exc:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis requires the redis package") from exc
+        from redis.exceptions import RedisError
+
+        self._client = redis.from_url(url)
+        self._errors = RedisError
+        self.max_entry_bytes = max_entry_bytes
+        self.ttl_ms = int(ttl_seconds * 1000)
+        self.prefix = prefix
+
+    def _generation_key(self, user_id: str) -> str:
+        return f"{self.prefix}:generation:{user_id}"
+
+    def _entry_key(self, user_id: str, key: str) -> str:
+        return f"{self.prefix}:entry:{user_id}:{key}"
+
+    def _seed(self, pipeline, generation_key: str) -> None:
+        pipeline.set(generation_key, time.time_ns(), nx=True)
+
+    async def _get(self, user_id: str, key: str) -> Tuple[Optional[int], Optional[CachedResponse]]:
+        generation_key = self._generation_key(user_id)
+        try:
+            generation, value = await self._client.mget(generation_key, self._entry_key(user_id, key))
+            if generation is None:
+                async with self._client.pipeline(transaction=False) as pipeline:
+                    self._seed(pipeline, generation_key)
+                    pipeline.get(generation_key)
+                    _, generation = await pipeline.execute()
+                return int(generation), None
+        except self._errors as exc:
+            logger.warning("Response cache read failed: %s", exc)
+            return None, None
+
+        generation = int(generation)
+        if value is None:
+            return generation, None
+        # <generation>\n<etag>\n<body>
+        entry_generation, etag, body = value.split(b"\n", 2)
+        if int(entry_generation) != generation:
+            return generation, None
+        return generation, CachedResponse(etag.decode(), body)
+
+    async def set(self, user_id: str, key: str, generation: Optional[int], response: CachedResponse) -> None:
+        if generation is None or len(response.body) > self.max_entry_bytes:
+            return
+        value = b"%d\n%s\n%s" % (generation, response.etag.encode(), response.body)
+        try:
+            await self._client.set(self._entry_key(user_id, key), value, px=self.ttl_ms)
+        except self._errors as exc:
+            logger.warning("Response cache write failed: %s", exc)
+
+    async def invalidate(self, user_id: str) -> None:
+        generation_key = self._generation_key(user_id)
+        try:
+            async with self._client.pipeline(transaction=False) as pipeline:
+                self._seed(pipeline, generation_key)
+                pipeline.incr(generation_key)
+                await pipeline.execute()
+        except self._errors as exc:
+            # Entries of the old generation stay reachable until they expire
+            logger.error("Response cache invalidation failed for user %s: %s", user_id, exc)
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+def create_response_cache(enabled: bool, backend: str) -> ResponseCache:
+    if not enabled:
+        return NullResponseCache()
+    if backend == "memory":
+        return MemoryResponseCache(
+            max_bytes=settings.RESPONSE_CACHE_MAX_BYTES,
+            max_entry_bytes=settings.RESPONSE_CACHE_MAX_ENTRY_BYTES,
+            max_users=settings.RESPONSE_CACHE_MAX_USERS,
+            ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+        )
+    if backend == "redis":
+        return RedisResponseCache(
+            settings.RESPONSE_CACHE_REDIS_URL,
+            max_entry_bytes=settings.RESPONSE_CACHE_MAX_ENTRY_BYTES,
+            ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+        )
+    raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND {backend!r}, expected memory or redis")
+
+
+response_cache = create_response_cache(settings.RESPONSE_CACHE_ENABLED, settings.RESPONSE_CACHE_BACKEND)
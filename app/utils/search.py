@@ -0,0 +1,151 @@
+import heapq
+import re
+import time
+from collections import Counter, OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+from bson import ObjectId
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+# Kept per task so results can be returned without going back to MongoDB
+SEARCH_RESULT_FIELDS = ("title", "status", "user_id", "created_at", "updated_at", "version")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _TOKEN.findall(text.lower()) if text else []
+
+
+class _UserIndex:
+    __slots__ = ("postings", "documents", "built_at")
+
+    def __init__(self):
+        # token -> {task_id: term frequency}
+        self.postings: Dict[str, Dict[ObjectId, int]] = {}
+        self.documents: Dict[ObjectId, dict] = {}
+        self.built_at = time.monotonic()
+
+    def add(self, document: Mapping) -> None:
+        task_id = document["_id"]
+        self.remove(task_id)
+
+        terms = Counter(tokenize(document.get("title")) + tokenize(document.get("description")))
+        for token, frequency in terms.items():
+            self.postings.setdefault(token, {})[task_id] = frequency
+
+        stored = {field: document.get(field) for field in SEARCH_RESULT_FIELDS}
+        stored["_id"] = task_id
+        stored["_terms"] = tuple(terms)
+        self.documents[task_id] = stored
+
+    def remove(self, task_id: ObjectId) -> None:
+        stored = self.documents.pop(task_id, None)
+        if stored is None:
+            return
+        for token in stored["_terms"]:
+            posting = self.postings.get(token)
+            if posting is not None:
+                posting.pop(task_id, None)
+                if not posting:
+                    del self.postings[token]
+
+
+class InvertedIndex:
+    """In-process fallback for MongoDB text search.
+
+    Per-user indexes are built lazily from the tasks collection on a user's
+    first search and then kept current by TaskService writes. They are rebuilt
+    after `ttl_seconds` so writes served by other worker processes show up,
+    and at most `max_users` of them are kept (least recently searched dropped).
+    """
+
+    def __init__(self, max_users: int, ttl_seconds: float):
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self._users: "OrderedDict[ObjectId, _UserIndex]" = OrderedDict()
+        # Writes to the tasks of users whose documents are being fetched by build(),
+        # as (document, None) for adds and (None, task_id) for removals
+        self._pending_writes: Dict[ObjectId, List[Tuple[Optional[Mapping], Optional[ObjectId]]]] = {}
+        self._builds: Counter = Counter()
+
+    def is_loaded(self, user_id: ObjectId) -> bool:
+        index = self._users.get(user_id)
+        return index is not None and time.monotonic() - index.built_at < self.ttl_seconds
+
+    def load(self, user_id: ObjectId, documents: Iterable[Mapping]) -> None:
+        index = _UserIndex()
+        for document in documents:
+            index.add(document)
+        self._users[user_id] = index
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+
+    async def build(self, user_id: ObjectId, fetch: Callable[[], Awaitable[Iterable[Mapping]]]) -> None:
+        """Load the user's index from the documents returned by `fetch`.
+
+        Writes made while `fetch` runs may be missing from what it returns, so
+        they are recorded and applied over the documents before the index is used.
+        """
+        writes = self._pending_writes.setdefault(user_id, [])
+        self._builds[user_id] += 1
+        try:
+            documents = await fetch()
+        finally:
+            self._builds[user_id] -= 1
+            if not self._builds[user_id]:
+                del self._builds[user_id]
+                del self._pending_writes[user_id]
+
+        self.load(user_id, documents)
+        index = self._users[user_id]
+        for document, task_id in writes:
+            if document is not None:
+                index.add(document)
+            else:
+                index.remove(task_id)
+
+    def add(self, document: Mapping) -> None:
+        writes = self._pending_writes.get(document["user_id"])
+        if writes is not None:
+            writes.append((document, None))
+        # Users that were never searched are left alone, they get a full build on first search
+        index = self._users.get(document["user_id"])
+        if index is not None:
+            index.add(document)
+
+    def remove(self, user_id: ObjectId, task_id: ObjectId) -> None:
+        writes = self._pending_writes.get(user_id)
+        if writes is not None:
+            writes.append((None, task_id))
+        index = self._users.get(user_id)
+        if index is not None:
+            index.remove(task_id)
+
+    def search(self, user_id: ObjectId, query: str, limit: int,
+               after: Optional[Tuple[float, ObjectId]] = None) -> List[dict]:
+        """Return up to `limit` documents ordered by (score desc, _id asc), each with a `score`"""
+        index = self._users.get(user_id)
+        if index is None:
+            return []
+        self._users.move_to_end(user_id)
+
+        scores: Dict[ObjectId, float] = {}
+        for token in set(tokenize(query)):
+            for task_id, frequency in index.postings.get(token, {}).items():
+                scores[task_id] = scores.get(task_id, 0.0) + frequency
+
+        candidates = scores.items()
+        if after is not None:
+            last_score, last_id = after
+            candidates = [
+                (task_id, score) for task_id, score in candidates
+                if score < last_score or (score == last_score and task_id > last_id)
+            ]
+
+        top = heapq.nsmallest(limit, candidates, key=lambda item: (-item[1], item[0]))
+        results = []
+        for task_id, score in top:
+            document = {k: v for k, v in index.documents[task_id].items() if k != "_terms"}
+            document["score"] = score
+            results.append(document)
+        return results
@@ -1,10 +1,55 @@
+import hashlib
+import time
 from fastapi import HTTPException, status
 from passlib.context import CryptContext
-from jose import jwt, JWTError
+from jose import jwk, jwt, JWTError
+from jose.backends.base import Key
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from ..config import settings
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from .cache import TTLCache
+
+# Verified claims by token digest, so a token reused within its lifetime is checked only once
+token_cache = TTLCache(
+    max_size=settings.TOKEN_CACHE_MAX_SIZE,
+    ttl_seconds=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+)
+
+# `type` claim of refresh tokens, which are signed with the same key as access tokens
+REFRESH_TOKEN_TYPE = "refresh"
+
+# (SECRET_KEY, ALGORITHM) that _signing_key and token_cache were built for
+_key_source = None
+_signing_key = None
+
+
+def build_password_context(schemes: str, bcrypt_rounds: int, argon2_time_cost: int,
+                           argon2_memory_cost: int, argon2_parallelism: int) -> CryptContext:
+    """CryptContext hashing with the first of `schemes` and the given costs.
+
+    Every other scheme, and any hash made with different costs, is reported by
+    needs_update so it can be replaced on the next successful login.
+    """
+    scheme_names = [scheme.strip() for scheme in schemes.split(",") if scheme.strip()]
+    options = {}
+    if "bcrypt" in scheme_names:
+        options["bcrypt__rounds"] = bcrypt_rounds
+    if "argon2" in scheme_names:
+        options.update({
+            "argon2__time_cost": argon2_time_cost,
+            "argon2__memory_cost": argon2_memory_cost,
+            "argon2__parallelism": argon2_parallelism,
+        })
+    return CryptContext(schemes=scheme_names, deprecated="auto", **options)
+
+
+pwd_context = build_password_context(
+    settings.PASSWORD_HASH_SCHEMES,
+    settings.PASSWORD_BCRYPT_ROUNDS,
+    settings.PASSWORD_ARGON2_TIME_COST,
+    settings.PASSWORD_ARGON2_MEMORY_COST,
+    settings.PASSWORD_ARGON2_PARALLELISM
+)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -15,6 +60,33 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def verify_and_rehash(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password and, if its hash uses an outdated scheme or cost, hash it again.
+
+    Returns (verified, new hash or None).
+    """
+    if not pwd_context.verify(plain_password, hashed_password):
+        return False, None
+    if pwd_context.needs_update(hashed_password):
+        return True, pwd_context.hash(plain_password)
+    return True, None
+
+
+def _current_key() -> Key:
+    """Prebuilt jose key for the configured secret.
+
+    Rebuilt when SECRET_KEY or ALGORITHM changes, which also drops every cached
+    claim verified with the old key.
+    """
+    global _key_source, _signing_key
+    source = (settings.SECRET_KEY, settings.ALGORITHM)
+    if source != _key_source:
+        _signing_key = jwk.construct(settings.SECRET_KEY, settings.ALGORITHM)
+        _key_source = source
+        token_cache.clear()
+    return _signing_key
+
+
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
 
@@ -27,24 +99,64 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
 
     encoded_jwt = jwt.encode(
         to_encode,
-        settings.SECRET_KEY,
+        _current_key(),
         algorithm=settings.ALGORITHM
     )
 
     return encoded_jwt
 
 
+def create_refresh_token(user_id: str, family_id: str, generation: int) -> Tuple[str, datetime]:
+    """Signed refresh token for one generation of a token family, and its expiry"""
+    expire = datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    token = jwt.encode(
+        {"sub": user_id, "fam": family_id, "gen": generation, "type": REFRESH_TOKEN_TYPE, "exp": expire},
+        _current_key(),
+        algorithm=settings.ALGORITHM
+    )
+    return token, expire
+
+
+def decode_refresh_token(token: str) -> Optional[Dict[str, Any]]:
+    """Claims of a validly signed, unexpired refresh token, None otherwise"""
+    try:
+        payload = jwt.decode(token, _current_key(), algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    if payload.get("type") != REFRESH_TOKEN_TYPE:
+        return None
+    return payload
+
+
 def decode_access_token(token: str) -> Dict[str, Any]:
+    """Verified claims of a token, served from token_cache after the first successful decode.
+
+    The returned dict is shared with the cache and must not be modified.
+    """
+    key = _current_key()
+    digest = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    payload = token_cache.get(digest)
+    if payload is not None:
+        token_cache.hits += 1
+        return payload
+
+    token_cache.misses += 1
     try:
         payload = jwt.decode(
             token,
-            settings.SECRET_KEY,
+            key,
             algorithms=[settings.ALGORITHM]
         )
-        return payload
+        if payload.get("type") == REFRESH_TOKEN_TYPE:
+            raise JWTError("Refresh tokens cannot be used as access tokens")
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    # Cached claims must not outlive the token
+    expires_at = payload.get("exp")
+    token_cache.set(digest, payload, expires_at - time.time() if expires_at is not None else None)
+    return payload
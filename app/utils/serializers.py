@@ -0,0 +1,86 @@
+from typing import Iterable, Mapping, Optional, Sequence
+import orjson
+from bson import ObjectId, decode
+from bson.raw_bson import RawBSONDocument
+from fastapi import Response
+
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def task_document_to_json_dict(document: Mapping, fields: Optional[Sequence[str]] = None) -> dict:
+    """Shape a raw task document like TaskInDB, leaving datetimes for orjson to encode.
+
+    orjson renders datetimes exactly like TaskInDB.serialize_dt (isoformat), so the
+    output is byte-compatible with the response_model path it replaces. With
+    `fields` only those fields (plus _id) are emitted, for sparse fieldsets.
+
+    A RawBSONDocument is decoded into a throwaway dict rather than inflated in
+    place, so the caller's list keeps holding only the undecoded bytes.
+    """
+    if isinstance(document, RawBSONDocument):
+        document = decode(document.raw)
+
+    if fields is not None:
+        content = {"_id": str(document["_id"])}
+        for field in fields:
+            if field == "user_id":
+                # Left out rather than rendered as "None"
+                if document.get("user_id") is not None:
+                    content["user_id"] = str(document["user_id"])
+            elif field == "version":
+                content["version"] = document.get("version", 0)
+            else:
+                content[field] = document.get(field)
+        return content
+
+    return {
+        "title": document.get("title"),
+        "description": document.get("description"),
+        "status": document.get("status"),
+        "_id": str(document["_id"]),
+        "user_id": str(document["user_id"]),
+        "created_at": document.get("created_at"),
+        "updated_at": document.get("updated_at"),
+        "version": document.get("version", 0),
+    }
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=_default)
+
+
+def task_json(document: Mapping) -> bytes:
+    return dumps(task_document_to_json_dict(document))
+
+
+def task_page_json(documents: Iterable[Mapping], next_cursor: Optional[str],
+                   fields: Optional[Sequence[str]] = None) -> bytes:
+    # Items are encoded one by one so only one decoded document is alive at a time
+    body = bytearray(b'{"items":[')
+    for index, document in enumerate(documents):
+        if index:
+            body += b","
+        body += dumps(task_document_to_json_dict(document, fields))
+    body += b'],"next_cursor":'
+    body += dumps(next_cursor)
+    body += b"}"
+    return bytes(body)
+
+
+def task_ndjson_line(document: Mapping, fields: Optional[Sequence[str]] = None) -> bytes:
+    return orjson.dumps(
+        task_document_to_json_dict(document, fields), default=_default, option=orjson.OPT_APPEND_NEWLINE
+    )
+
+
+def json_response(content: bytes, status_code: int = 200, etag: Optional[str] = None) -> Response:
+    """Return already-encoded JSON, bypassing response_model validation and re-encoding.
+
+    Routes keep declaring response_model so the OpenAPI schema is unchanged.
+    """
+    headers = {"ETag": etag} if etag else None
+    return Response(content=content, status_code=status_code, headers=headers, media_type="application/json")
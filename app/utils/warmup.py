@@ -0,0 +1,29 @@
+from bson import ObjectId
+from ..models.task_model import Task, TaskCreate
+from .hashing import password_hasher
+from .pagination import decode_cursor, encode_cursor
+from .security import create_access_token, create_refresh_token, decode_refresh_token
+from .serializers import task_json, task_page_json
+
+# CPython specializes a code path's bytecode after it has run a few times
+ROUNDS = 16
+
+
+async def warm_up() -> None:
+    """Pay the first-call costs of the hot paths before the worker takes traffic"""
+    # Loads the hashing backend and starts the hashing thread pool
+    await password_hasher.hash("warm-up")
+
+    user_id = str(ObjectId())
+    for _ in range(ROUNDS):
+        # Builds the signing key on the first round, then runs JWT encoding and verification
+        create_access_token({"sub": user_id})
+        token, _ = create_refresh_token(user_id, str(ObjectId()), 0)
+        decode_refresh_token(token)
+
+        task_data = TaskCreate(title="warm-up", description="warm-up")
+        document = Task(user_id=ObjectId(user_id), **task_data.model_dump()).to_dict()
+        cursor = encode_cursor(document["created_at"], document["_id"])
+        decode_cursor(cursor)
+        task_json(document)
+        task_page_json([document], cursor)
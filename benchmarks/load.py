@@ -0,0 +1,356 @@
+"""HTTP load test of the API endpoints with throughput and latency percentiles.
+
+Drives app.main:app in process through httpx's ASGI transport (default), a
+local uvicorn started for the run (--target uvicorn) or an already running
+server (--url). In process, --storage memory needs no database at all, while
+--storage mongo seeds a throwaway database next to DATABASE_NAME on
+MONGODB_URL and drops it afterwards.
+
+Each scenario runs --concurrency closed-loop clients for --duration seconds.
+Results are written as JSON (--output). With --baseline they are compared to
+an earlier run and the exit status is 1 if any scenario lost more than
+--threshold of its throughput or gained as much p95 latency.
+
+    python -m benchmarks.load --storage memory --duration 10 --output results.json
+    python -m benchmarks.load --storage memory --baseline results.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+import httpx
+
+API = "/api/v1"
+PASSWORD = "benchmark-password"
+BULK_SIZE = 500
+
+SCENARIOS = ("register", "login", "create", "get", "update", "list", "delete")
+
+
+class Context:
+    """Users, tokens and task ids seeded before the scenarios run"""
+
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+        self.run_id = f"{seed}-{int(time.time())}"
+        self.emails = itertools.count()
+        self.email = ""
+        self.headers: Dict[str, str] = {}
+        self.task_ids: List[str] = []
+        self.list_headers: Dict[int, Dict[str, str]] = {}
+        self.delete_headers: Dict[str, str] = {}
+        self.delete_pool: List[str] = []
+
+    def next_email(self) -> str:
+        return f"bench-{self.run_id}-{next(self.emails)}@example.com"
+
+
+async def register(client: httpx.AsyncClient, email: str) -> Dict[str, str]:
+    response = await client.post(f"{API}/auth/register", json={"email": email, "username": "bench", "password": PASSWORD})
+    response.raise_for_status()
+    response = await client.post(f"{API}/auth/login", data={"username": email, "password": PASSWORD})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def seed_tasks(client: httpx.AsyncClient, headers: Dict[str, str], count: int, rng: random.Random) -> List[str]:
+    ids = []
+    for start in range(0, count, BULK_SIZE):
+        tasks = [
+            {"title": f"task {rng.randrange(10 ** 6)}", "description": "seeded by benchmarks.load"}
+            for _ in range(min(BULK_SIZE, count - start))
+        ]
+        response = await client.post(f"{API}/tasks/bulk", json={"tasks": tasks}, headers=headers)
+        response.raise_for_status()
+        ids += [item["id"] for item in response.json()["items"]]
+    return ids
+
+
+async def seed(client: httpx.AsyncClient, context: Context, args) -> None:
+    context.email = context.next_email()
+    context.headers = await register(client, context.email)
+    context.task_ids = await seed_tasks(client, context.headers, args.seed_tasks, context.rng)
+
+    if "list" in args.scenarios:
+        for size in args.list_sizes:
+            context.list_headers[size] = await register(client, context.next_email())
+            await seed_tasks(client, context.list_headers[size], size, context.rng)
+
+    if "delete" in args.scenarios:
+        context.delete_headers = await register(client, context.next_email())
+        context.delete_pool = await seed_tasks(client, context.delete_headers, args.delete_pool, context.rng)
+
+
+def build_scenarios(context: Context, args) -> Dict[str, Callable[[httpx.AsyncClient], Awaitable[Optional[httpx.Response]]]]:
+    """Request functions by scenario name, each returns None once it has nothing left to do"""
+    rng = context.rng
+
+    async def register_request(client):
+        return await client.post(
+            f"{API}/auth/register",
+            json={"email": context.next_email(), "username": "bench", "password": PASSWORD}
+        )
+
+    async def login_request(client):
+        return await client.post(f"{API}/auth/login", data={"username": context.email, "password": PASSWORD})
+
+    async def create_request(client):
+        return await client.post(
+            f"{API}/tasks/", json={"title": f"task {rng.randrange(10 ** 6)}"}, headers=context.headers
+        )
+
+    async def get_request(client):
+        return await client.get(f"{API}/tasks/{rng.choice(context.task_ids)}", headers=context.headers)
+
+    async def update_request(client):
+        return await client.put(
+            f"{API}/tasks/{rng.choice(context.task_ids)}",
+            json={"title": f"updated {rng.randrange(10 ** 6)}"},
+            headers=context.headers
+        )
+
+    async def delete_request(client):
+        if not context.delete_pool:
+            return None
+        return await client.delete(f"{API}/tasks/{context.delete_pool.pop()}", headers=context.delete_headers)
+
+    def list_request(size):
+        async def request(client):
+            # Streams the whole list so the response grows with the number of tasks
+            return await client.get(f"{API}/tasks/", params={"stream": "true"}, headers=context.list_headers[size])
+        return request
+
+    scenarios = {
+        "register": register_request,
+        "login": login_request,
+        "create": create_request,
+        "get": get_request,
+        "update": update_request,
+    }
+    for size in args.list_sizes:
+        scenarios[f"list_{size}"] = list_request(size)
+    scenarios["delete"] = delete_request
+    return {
+        name: request for name, request in scenarios.items()
+        if name in args.scenarios or (name.startswith("list_") and "list" in args.scenarios)
+    }
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float, exhausted: bool) -> dict:
+    summary = {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "exhausted": exhausted,
+    }
+    if len(latencies) >= 2:
+        cut_points = statistics.quantiles(latencies, n=100, method="inclusive")
+        summary.update({
+            "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+            "p50_ms": round(cut_points[49] * 1000, 3),
+            "p95_ms": round(cut_points[94] * 1000, 3),
+            "p99_ms": round(cut_points[98] * 1000, 3),
+        })
+    return summary
+
+
+async def run_scenario(client: httpx.AsyncClient, request, concurrency: int, duration: float, warmup: float) -> dict:
+    """Closed loop: every client sends its next request as soon as the previous one completes"""
+    latencies: List[float] = []
+    errors = 0
+    exhausted = False
+    measure_from = time.perf_counter() + warmup
+    deadline = measure_from + duration
+
+    async def client_loop():
+        nonlocal errors, exhausted
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = await request(client)
+            if response is None:
+                exhausted = True
+                return
+            if started < measure_from:
+                continue
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    # Requests started before the deadline are measured to completion
+    elapsed = time.perf_counter() - measure_from
+    return summarize(latencies, errors, max(elapsed, 0.0), exhausted)
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> List[str]:
+    """Scenarios that regressed beyond threshold, as printable lines"""
+    regressions = []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        if current["throughput_rps"] < previous["throughput_rps"] * (1 - threshold):
+            regressions.append(
+                f"{name}: throughput {current['throughput_rps']} rps, baseline {previous['throughput_rps']} rps"
+            )
+        if "p95_ms" in current and "p95_ms" in previous and current["p95_ms"] > previous["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {current['p95_ms']} ms, baseline {previous['p95_ms']} ms")
+    return regressions
+
+
+def print_table(results: dict, baseline: Optional[dict]) -> None:
+    print(f"{'scenario':<12} {'requests':>9} {'errors':>7} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+          + ("  vs baseline" if baseline else ""))
+    for name, summary in results["scenarios"].items():
+        line = (f"{name:<12} {summary['requests']:>9} {summary['errors']:>7} {summary['throughput_rps']:>9.1f} "
+                f"{summary.get('p50_ms', float('nan')):>9.3f} {summary.get('p95_ms', float('nan')):>9.3f} "
+                f"{summary.get('p99_ms', float('nan')):>9.3f}")
+        previous = (baseline or {}).get("scenarios", {}).get(name)
+        if previous and previous["throughput_rps"]:
+            line += f"  {summary['throughput_rps'] / previous['throughput_rps'] - 1:+.1%} rps"
+        if summary["exhausted"]:
+            line += "  (delete pool exhausted, raise --delete-pool)"
+        print(line)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_up(base_url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while True:
+            try:
+                if (await client.get("/")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                if time.monotonic() > deadline:
+                    raise
+            await asyncio.sleep(0.2)
+
+
+async def run(args) -> dict:
+    from app.config import settings
+
+    server = None
+    app = None
+    database_name = f"{settings.DATABASE_NAME}_load_benchmark"
+    if args.url:
+        base_url, transport = args.url, None
+    elif args.target == "uvicorn":
+        port = free_port()
+        env = {**os.environ, "STORAGE_BACKEND": args.storage, "DATABASE_NAME": database_name}
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+            env=env
+        )
+        base_url, transport = f"http://127.0.0.1:{port}", None
+        await wait_until_up(base_url)
+    else:
+        # Must happen before the app (and the storage backend) is imported
+        settings.STORAGE_BACKEND = args.storage
+        settings.DATABASE_NAME = database_name
+        from app.main import app
+        await app.router.startup()
+        base_url, transport = "http://benchmark", httpx.ASGITransport(app=app)
+
+    results = {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "target": args.url or args.target,
+            "storage": None if args.url else args.storage,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "seed": args.seed,
+            "seed_tasks": args.seed_tasks,
+            "list_sizes": args.list_sizes,
+            "python": platform.python_version(),
+        },
+        "scenarios": {},
+    }
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, transport=transport, limits=limits, timeout=60) as client:
+            context = Context(args.seed)
+            await seed(client, context, args)
+            for name, request in build_scenarios(context, args).items():
+                results["scenarios"][name] = await run_scenario(
+                    client, request, args.concurrency, args.duration, args.warmup
+                )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        if app is not None:
+            await app.router.shutdown()
+        if not args.url and args.storage == "mongo":
+            from motor.motor_asyncio import AsyncIOMotorClient
+            mongo = AsyncIOMotorClient(settings.MONGODB_URL)
+            await mongo.drop_database(database_name)
+            mongo.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument("--url", help="benchmark a server that is already running, e.g. http://127.0.0.1:8000")
+    parser.add_argument("--storage", choices=("memory", "mongo"), default="memory",
+                        help="STORAGE_BACKEND of the app under test (not used with --url)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"comma separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10, help="measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=1, help="unmeasured seconds before each scenario")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for task titles and request order")
+    parser.add_argument("--seed-tasks", type=int, default=1000, help="tasks read and updated by get/update")
+    parser.add_argument("--list-sizes", default="10,100,1000", help="tasks owned by the user of each list scenario")
+    parser.add_argument("--delete-pool", type=int, default=20000, help="tasks seeded for the delete scenario")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="allowed relative throughput loss or p95 increase (default 0.10)")
+    args = parser.parse_args()
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    args.list_sizes = [int(size) for size in args.list_sizes.split(",") if size]
+
+    # Read before the run so a bad path fails fast
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+    results = asyncio.run(run(args))
+    print_table(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        raise SystemExit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
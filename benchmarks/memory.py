@@ -0,0 +1,83 @@
+"""Memory used to list tasks, measured with tracemalloc.
+
+Compares the previous read path, where the driver decodes every fetched
+document into a dict that the serializer then turns into JSON, with the raw
+path: documents stay RawBSONDocument (the bytes received from MongoDB) and
+utils.serializers decodes them one at a time while encoding.
+
+The documents are BSON-encoded up front into one reply batch, which both
+paths split like the driver does, so no database is needed and only the work
+done after the bytes arrive is measured. Timings are taken in a separate run
+without tracemalloc.
+
+    python -m benchmarks.memory --tasks 100000
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from typing import Callable, List, Mapping, Tuple
+import bson
+import orjson
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from app.utils.serializers import _default, task_document_to_json_dict, task_page_json
+from .serialization import make_documents
+
+
+def previous_page_json(documents: List[Mapping]) -> bytes:
+    return orjson.dumps({
+        "items": [task_document_to_json_dict(document) for document in documents],
+        "next_cursor": None,
+    }, default=_default)
+
+
+def previous_path(batch: bytes) -> Tuple[List[Mapping], Callable[[], bytes]]:
+    documents = bson.decode_all(batch)
+    return documents, lambda: previous_page_json(documents)
+
+
+def raw_path(batch: bytes) -> Tuple[List[Mapping], Callable[[], bytes]]:
+    documents = bson.decode_all(batch, CodecOptions(document_class=RawBSONDocument))
+    return documents, lambda: task_page_json(documents, None)
+
+
+def measure(path, batch: bytes) -> dict:
+    """Memory held by the fetched documents and peak memory until the body is encoded"""
+    gc.collect()
+    tracemalloc.start()
+    documents, serialize = path(batch)
+    fetched, _ = tracemalloc.get_traced_memory()
+    body = serialize()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del documents
+
+    gc.collect()
+    started = time.perf_counter()
+    _, serialize = path(batch)
+    serialize()
+    return {"fetched": fetched, "peak": peak, "seconds": time.perf_counter() - started, "body": body}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=100000)
+    args = parser.parse_args()
+
+    batch = b"".join(bson.encode(document) for document in make_documents(args.tasks))
+    before = measure(previous_path, batch)
+    after = measure(raw_path, batch)
+    assert json.loads(before["body"]) == json.loads(after["body"])
+
+    mib = 1024 * 1024
+    print(f"tasks: {args.tasks}, response body {len(after['body']) / mib:.1f} MiB")
+    print(f"{'':8}{'documents':>12}{'peak':>12}{'time':>10}")
+    for name, result in (("before", before), ("after", after)):
+        print(f"{name:8}{result['fetched'] / mib:>8.1f} MiB{result['peak'] / mib:>8.1f} MiB"
+              f"{result['seconds'] * 1000:>7.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Per-request overhead of MetricsMiddleware.
+
+Drives ASGI apps with raw calls (no sockets, no HTTP parsing) with and
+without the middleware, so the difference is the cost of the instrumentation
+itself. Two targets are measured: a bare ASGI app that only sends a response,
+which isolates the middleware, and a trivial FastAPI route for scale.
+
+    python -m benchmarks.metrics_middleware --requests 20000
+"""
+import argparse
+import asyncio
+import time
+from fastapi import FastAPI, Response
+from app.utils.metrics import MetricsMiddleware
+
+
+class _Route:
+    path = "/items/{item_id}"
+
+
+async def bare_app(scope, receive, send):
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+def fastapi_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str):
+        return Response(content=b"{}", media_type="application/json")
+
+    if instrumented:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def drive(app, requests: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    def scope():
+        return {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": "GET", "scheme": "http", "path": "/items/42", "raw_path": b"/items/42",
+            "root_path": "", "query_string": b"", "headers": [],
+            "client": ("127.0.0.1", 1234), "server": ("127.0.0.1", 80),
+        }
+
+    # Warm up route matching, middleware stack construction and label children
+    for _ in range(1000):
+        await app(scope(), receive, send)
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(scope(), receive, send)
+    return (time.perf_counter() - started) / requests
+
+
+def compare(label: str, plain, instrumented, requests: int, repeat: int):
+    before = min(asyncio.run(drive(plain, requests)) for _ in range(repeat))
+    after = min(asyncio.run(drive(instrumented, requests)) for _ in range(repeat))
+    print(f"{label:<8} without: {before * 1e6:7.2f} us  with: {after * 1e6:7.2f} us"
+          f"  overhead: {(after - before) * 1e6:6.2f} us/request")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    compare("bare", bare_app, MetricsMiddleware(bare_app), args.requests, args.repeat)
+    compare("fastapi", fastapi_app(False), fastapi_app(True), args.requests, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Task search latency at different numbers of tasks per user.
+
+Measures the in-process fallback index (utils.search.InvertedIndex) by
+default. With --mongo the same corpus is also seeded into MONGODB_URL and
+searched through the text index, using a throwaway database.
+
+    python -m benchmarks.search --sizes 10000,100000,1000000
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime, timezone
+from bson import ObjectId
+from app.utils.search import InvertedIndex
+
+VOCABULARY = [f"word{i}" for i in range(5000)]
+
+
+def make_documents(user_id: ObjectId, count: int, rng: random.Random):
+    now = datetime.now(timezone.utc)
+    for _ in range(count):
+        yield {
+            "_id": ObjectId(),
+            "user_id": user_id,
+            "title": " ".join(rng.choices(VOCABULARY, k=4)),
+            "description": " ".join(rng.choices(VOCABULARY, k=8)),
+            "status": "pending",
+            "created_at": now,
+            "updated_at": None,
+            "version": 1,
+        }
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return {
+        "p50": statistics.median(samples),
+        "p95": samples[int(len(samples) * 0.95) - 1],
+        "p99": samples[int(len(samples) * 0.99) - 1],
+    }
+
+
+def report(label: str, size: int, samples):
+    stats = percentiles(samples)
+    print(f"{label:<7} {size:>9} tasks  "
+          + "  ".join(f"{name} {value * 1000:8.3f} ms" for name, value in stats.items()))
+
+
+def bench_memory(size: int, queries, limit: int):
+    rng = random.Random(size)
+    user_id = ObjectId()
+    index = InvertedIndex(max_users=1, ttl_seconds=float("inf"))
+
+    started = time.perf_counter()
+    index.load(user_id, make_documents(user_id, size, rng))
+    print(f"memory  {size:>9} tasks  build {time.perf_counter() - started:.2f} s")
+
+    samples = []
+    for query in queries:
+        started = time.perf_counter()
+        index.search(user_id, query, limit)
+        samples.append(time.perf_counter() - started)
+    report("memory", size, samples)
+
+
+async def bench_mongo(size: int, queries, limit: int):
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from app.config import settings
+    from app.models.task_model import Task
+
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    db = client[f"{settings.DATABASE_NAME}_search_benchmark"]
+    try:
+        await db.drop_collection(Task.collection_name)
+        collection = db[Task.collection_name]
+        await collection.create_indexes(Task.indexes)
+
+        rng = random.Random(size)
+        user_id = ObjectId()
+        batch = []
+        for document in make_documents(user_id, size, rng):
+            batch.append(document)
+            if len(batch) == 10000:
+                await collection.insert_many(batch, ordered=False)
+                batch = []
+        if batch:
+            await collection.insert_many(batch, ordered=False)
+
+        samples = []
+        for query in queries:
+            started = time.perf_counter()
+            await collection.aggregate([
+                {"$match": {"user_id": user_id, "$text": {"$search": query}}},
+                {"$project": {"title": 1, "score": {"$meta": "textScore"}}},
+                {"$sort": {"score": -1, "_id": 1}},
+                {"$limit": limit},
+            ]).to_list(length=None)
+            samples.append(time.perf_counter() - started)
+        report("mongo", size, samples)
+    finally:
+        await client.drop_database(db.name)
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--mongo", action="store_true", help="also benchmark the MongoDB text index")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    queries = [" ".join(rng.choices(VOCABULARY, k=rng.randint(1, 3))) for _ in range(args.queries)]
+
+    for size in (int(size) for size in args.sizes.split(",")):
+        bench_memory(size, queries, args.limit)
+        if args.mongo:
+            asyncio.run(bench_mongo(size, queries, args.limit))
+
+
+if __name__ == "__main__":
+    main()
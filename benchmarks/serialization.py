@@ -0,0 +1,92 @@
+"""Per-task cost of serializing a task list.
+
+Compares the previous route path (Task.from_dict -> hand-built dict ->
+response_model validation -> JSON encoding) with utils.serializers, which
+goes straight from the BSON document to JSON bytes.
+
+    python -m benchmarks.serialization --tasks 10000
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+from typing import List
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from app.models.task_model import Task, TaskInDB
+from app.utils.serializers import task_page_json
+
+
+def make_documents(count: int) -> List[dict]:
+    user_id = ObjectId()
+    return [
+        {
+            "_id": ObjectId(),
+            "title": f"Task {i}",
+            "description": "Finish the task management API project " * 3,
+            "status": "pending",
+            "user_id": user_id,
+            "created_at": datetime.now(timezone.utc),
+            "updated_at": None if i % 2 else datetime.now(timezone.utc),
+            "version": 1,
+        }
+        for i in range(count)
+    ]
+
+
+_page_adapter = TypeAdapter(List[TaskInDB])
+
+
+def previous_path(documents: List[dict]) -> bytes:
+    tasks = [Task.from_dict(document) for document in documents]
+    items = [
+        {
+            "_id": str(task.task_id),
+            "title": task.title,
+            "description": task.description,
+            "status": task.status,
+            "user_id": str(task.user_id),
+            "created_at": task.created_at,
+            "updated_at": task.updated_at,
+            "version": task.version
+        } for task in tasks
+    ]
+    # What FastAPI does with a response_model: validate, dump by alias, then encode
+    validated = _page_adapter.validate_python(items)
+    content = jsonable_encoder(_page_adapter.dump_python(validated, mode="json", by_alias=True))
+    return json.dumps({"items": content, "next_cursor": None}, separators=(",", ":")).encode()
+
+
+def fast_path(documents: List[dict]) -> bytes:
+    return task_page_json(documents, None)
+
+
+def measure(func, documents: List[dict], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(documents)
+        best = min(best, time.perf_counter() - started)
+    return best / len(documents)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    documents = make_documents(args.tasks)
+    assert json.loads(previous_path(documents)) == json.loads(fast_path(documents))
+
+    before = measure(previous_path, documents, args.repeat)
+    after = measure(fast_path, documents, args.repeat)
+    print(f"tasks:   {args.tasks}")
+    print(f"before:  {before * 1e6:8.2f} us/task")
+    print(f"after:   {after * 1e6:8.2f} us/task")
+    print(f"speedup: {before / after:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import os
+from typing import Optional
+
+# Settings are read when app modules are first imported, so these must be set before
+os.environ["STORAGE_BACKEND"] = "memory"
+os.environ["PASSWORD_BCRYPT_ROUNDS"] = "4"
+
+import pytest  # noqa: E402
+from bson import ObjectId  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from app.main import app  # noqa: E402
+from app.repositories.storage import storage  # noqa: E402
+
+PASSWORD = "correct-horse"
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def client():
+    storage.clear()
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def login(client: TestClient, email: str) -> dict:
+    response = client.post("/api/v1/auth/login", data={"username": email, "password": PASSWORD})
+    assert response.status_code == 200
+    return response.json()
+
+
+def register(client: TestClient, email: Optional[str] = None) -> dict:
+    """Register and log in a new user, returns the login response"""
+    email = email or f"user-{ObjectId()}@example.com"
+    response = client.post("/api/v1/auth/register", json={"email": email, "username": "user", "password": PASSWORD})
+    assert response.status_code == 201
+    return login(client, email)
+
+
+@pytest.fixture
+def auth_headers(client):
+    return {"Authorization": f"Bearer {register(client)['access_token']}"}
@@ -0,0 +1,76 @@
+"""Minimal in-process server speaking enough of the Redis protocol for RedisResponseCache.
+
+Supports GET, MGET, SET (NX, PX), INCR and INCRBY; other commands answer OK.
+"""
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"redis://{host}:{port}/0"
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        entry = self.store.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.store[key]
+            return None
+        return value
+
+    def _execute(self, command: bytes, args: List[bytes]) -> bytes:
+        if command == b"GET":
+            return _bulk(self._get(args[0]))
+        if command == b"MGET":
+            return b"*%d\r\n" % len(args) + b"".join(_bulk(self._get(key)) for key in args)
+        if command == b"SET":
+            key, value, options = args[0], args[1], [option.upper() for option in args[2:]]
+            if b"NX" in options and self._get(key) is not None:
+                return _bulk(None)
+            expires_at = None
+            if b"PX" in options:
+                expires_at = time.monotonic() + int(options[options.index(b"PX") + 1]) / 1000
+            self.store[key] = (value, expires_at)
+            return b"+OK\r\n"
+        if command in (b"INCR", b"INCRBY"):
+            value = int(self._get(args[0]) or 0) + (int(args[1]) if command == b"INCRBY" else 1)
+            self.store[args[0]] = (b"%d" % value, None)
+            return b":%d\r\n" % value
+        return b"+OK\r\n"
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                header = await reader.readline()
+                if not header:
+                    break
+                arguments = []
+                for _ in range(int(header[1:])):
+                    size = int((await reader.readline())[1:])
+                    arguments.append((await reader.readexactly(size + 2))[:-2])
+                writer.write(self._execute(arguments[0].upper(), arguments[1:]))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def _bulk(value: Optional[bytes]) -> bytes:
+    return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
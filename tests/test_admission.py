@@ -0,0 +1,136 @@
+import asyncio
+import httpx
+import pytest
+from app.config import settings
+from app.utils import admission
+from app.utils.admission import AdaptiveLimiter, AdmissionMiddleware, route_class
+
+TASKS_URL = f"{settings.API_V1_PREFIX}/tasks/"
+
+
+def limiter(limit=1, queue_timeout=0.0, latency_target=None, max_queue=10):
+    return AdaptiveLimiter(
+        "test", initial_limit=limit, min_limit=1, max_limit=4, queue_timeout=queue_timeout,
+        latency_target=latency_target, max_queue=max_queue, backoff=0.5
+    )
+
+
+@pytest.mark.parametrize("method, path, query_string, accept, expected", [
+    ("POST", f"{settings.API_V1_PREFIX}/auth/login", b"", b"", "auth"),
+    ("GET", TASKS_URL, b"", b"", "task_read"),
+    ("GET", f"{TASKS_URL}stats", b"stream=true", b"", "task_read"),
+    ("GET", TASKS_URL, b"limit=5&stream=true", b"", "task_stream"),
+    ("GET", TASKS_URL, b"stream=false", b"application/x-ndjson", "task_stream"),
+    ("GET", TASKS_URL, b"stream=0", b"application/json", "task_read"),
+    ("PUT", f"{TASKS_URL}abc", b"", b"", "task_write"),
+    ("GET", f"{settings.API_V1_PREFIX}/tasks/events", b"", b"", None),
+    ("GET", "/metrics", b"", b"", None),
+])
+def test_route_class(method, path, query_string, accept, expected):
+    assert route_class(method, path, query_string, accept) == expected
+
+
+@pytest.mark.anyio
+async def test_sheds_when_full_without_a_queue():
+    fixed = limiter(limit=1)
+
+    assert await fixed.acquire()
+    assert not await fixed.acquire()
+    fixed.release(0.0)
+    assert await fixed.acquire()
+    assert (fixed.admitted, fixed.shed) == (2, 1)
+
+
+@pytest.mark.anyio
+async def test_queued_request_takes_the_freed_slot():
+    queued = limiter(limit=1, queue_timeout=1.0)
+    assert await queued.acquire()
+
+    waiter = asyncio.ensure_future(queued.acquire())
+    await asyncio.sleep(0)
+    assert queued.queued == 1
+    queued.release(0.0)
+
+    assert await waiter
+    assert (queued.in_flight, queued.queued) == (1, 0)
+
+
+@pytest.mark.anyio
+async def test_queued_request_is_shed_after_the_timeout():
+    queued = limiter(limit=1, queue_timeout=0.01)
+    assert await queued.acquire()
+
+    assert not await queued.acquire()
+    assert (queued.in_flight, queued.queued, queued.shed) == (1, 0, 1)
+
+
+@pytest.mark.anyio
+async def test_full_queue_sheds_immediately():
+    queued = limiter(limit=1, queue_timeout=1.0, max_queue=1)
+    assert await queued.acquire()
+    waiter = asyncio.ensure_future(queued.acquire())
+    await asyncio.sleep(0)
+
+    assert not await queued.acquire()
+
+    queued.release(0.0)
+    assert await waiter
+
+
+@pytest.mark.anyio
+async def test_limit_adapts_to_latency():
+    adaptive = limiter(limit=2, latency_target=0.1)
+
+    # Fast requests grow a limit that is in use
+    for _ in range(8):
+        assert await adaptive.acquire()
+        adaptive.release(0.01)
+    assert adaptive.limit > 2
+
+    grown = adaptive.limit
+    assert await adaptive.acquire()
+    adaptive.release(1.0)
+    assert adaptive.limit == grown * 0.5
+    # At most one decrease per latency target
+    assert await adaptive.acquire()
+    adaptive.release(1.0, failed=True)
+    assert adaptive.limit == grown * 0.5
+
+
+@pytest.mark.anyio
+async def test_fixed_limit_does_not_adapt():
+    fixed = limiter(limit=2)
+
+    assert await fixed.acquire()
+    fixed.release(10.0, failed=True)
+
+    assert fixed.limit == 2
+
+
+@pytest.mark.anyio
+async def test_middleware_sheds_with_503_and_retry_after(monkeypatch):
+    monkeypatch.setitem(admission.limiters, "task_read", limiter(limit=1))
+    release = asyncio.Event()
+
+    async def app(scope, receive, send):
+        if scope["path"] == TASKS_URL:
+            await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    transport = httpx.ASGITransport(app=AdmissionMiddleware(app))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        admitted = asyncio.ensure_future(http.get(TASKS_URL))
+        while admission.limiters["task_read"].in_flight == 0:
+            await asyncio.sleep(0)
+
+        shed = await http.get(TASKS_URL)
+        # Requests outside the class are not held up
+        unlimited = await http.get("/metrics")
+        release.set()
+
+        assert shed.status_code == 503
+        assert shed.headers["Retry-After"] == str(settings.ADMISSION_RETRY_AFTER_SECONDS)
+        assert unlimited.status_code == 200
+        assert (await admitted).status_code == 200
+    assert admission.limiters["task_read"].in_flight == 0
@@ -0,0 +1,91 @@
+import asyncio
+import pytest
+from app.utils.batching import BatchedInsertError, InsertBatcher
+
+pytestmark = pytest.mark.anyio
+
+
+class Collection:
+    """insert_many stand-in recording every batch, rejecting titles starting with "bad" """
+
+    def __init__(self, error=None):
+        self.batches = []
+        self.error = error
+
+    async def insert_many(self, documents):
+        self.batches.append([document["title"] for document in documents])
+        if self.error:
+            raise self.error
+        return {index: "duplicate key" for index, document in enumerate(documents)
+                if document["title"].startswith("bad")}
+
+
+async def test_full_batch_is_written_without_waiting_for_the_window():
+    collection = Collection()
+    batcher = InsertBatcher(collection.insert_many, max_size=3, window_seconds=60)
+
+    await asyncio.wait_for(
+        asyncio.gather(*(batcher.insert({"title": f"t{index}"}) for index in range(3))), timeout=1
+    )
+
+    assert collection.batches == [["t0", "t1", "t2"]]
+    assert batcher.stats()["batches"] == 1
+
+
+async def test_partial_batch_is_written_when_the_window_expires():
+    collection = Collection()
+    batcher = InsertBatcher(collection.insert_many, max_size=100, window_seconds=0.02)
+
+    first = asyncio.ensure_future(batcher.insert({"title": "first"}))
+    await asyncio.sleep(0)
+    second = asyncio.ensure_future(batcher.insert({"title": "second"}))
+    await asyncio.sleep(0.005)
+    assert collection.batches == [] and batcher.pending == 2
+
+    await asyncio.gather(first, second)
+
+    assert collection.batches == [["first", "second"]]
+
+
+async def test_each_caller_gets_its_own_error():
+    collection = Collection()
+    batcher = InsertBatcher(collection.insert_many, max_size=3, window_seconds=60)
+
+    results = await asyncio.gather(
+        batcher.insert({"title": "ok"}),
+        batcher.insert({"title": "bad one"}),
+        batcher.insert({"title": "bad two"}),
+        return_exceptions=True,
+    )
+
+    assert results[0] is None
+    assert [str(error) for error in results[1:]] == ["duplicate key", "duplicate key"]
+    assert all(isinstance(error, BatchedInsertError) for error in results[1:])
+    assert batcher.stats()["failed"] == 2
+
+
+async def test_failed_batch_fails_every_caller():
+    cause = ConnectionError("connection reset")
+    batcher = InsertBatcher(Collection(error=cause).insert_many, max_size=2, window_seconds=60)
+
+    results = await asyncio.gather(
+        batcher.insert({"title": "a"}), batcher.insert({"title": "b"}), return_exceptions=True
+    )
+
+    for error in results:
+        assert isinstance(error, BatchedInsertError)
+        assert error.__cause__ is cause
+    assert batcher.stats()["failed"] == 2
+
+
+async def test_close_writes_pending_documents():
+    collection = Collection()
+    batcher = InsertBatcher(collection.insert_many, max_size=100, window_seconds=60)
+    inserts = [asyncio.ensure_future(batcher.insert({"title": f"t{index}"})) for index in range(2)]
+    await asyncio.sleep(0)
+
+    await batcher.close()
+
+    assert collection.batches == [["t0", "t1"]]
+    assert all(insert.done() and insert.exception() is None for insert in inserts)
+    assert batcher.pending == 0
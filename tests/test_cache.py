@@ -0,0 +1,103 @@
+import asyncio
+import pytest
+from app.utils.cache import TTLCache
+
+pytestmark = pytest.mark.anyio
+
+
+class Loader:
+    """Counts calls, each one waits for `release` before returning `value`"""
+
+    def __init__(self, value="value"):
+        self.value = value
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        return self.value
+
+
+async def test_concurrent_misses_share_one_load():
+    cache = TTLCache(max_size=10, ttl_seconds=60)
+    loader = Loader()
+
+    waiting = [asyncio.ensure_future(cache.get_or_load("key", loader)) for _ in range(5)]
+    await asyncio.sleep(0)
+    loader.release.set()
+
+    assert await asyncio.gather(*waiting) == ["value"] * 5
+    assert loader.calls == 1
+    assert await cache.get_or_load("key", loader) == "value"
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 5
+
+
+async def test_cancelled_caller_does_not_cancel_the_shared_load():
+    cache = TTLCache(max_size=10, ttl_seconds=60)
+    loader = Loader()
+    cancelled = asyncio.ensure_future(cache.get_or_load("key", loader))
+    waiting = asyncio.ensure_future(cache.get_or_load("key", loader))
+    await asyncio.sleep(0)
+
+    cancelled.cancel()
+    loader.release.set()
+
+    assert await waiting == "value"
+    assert cache.get("key") == "value"
+
+
+async def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(max_size=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+
+    cache.set("c", 3)
+
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+    assert cache.stats()["size"] == 2
+
+
+async def test_entries_expire():
+    cache = TTLCache(max_size=10, ttl_seconds=0.02)
+    cache.set("long", 1)
+    # A per-entry time-to-live can only shorten the cache-wide one
+    cache.set("short", 2, ttl_seconds=0.001)
+    cache.set("capped", 3, ttl_seconds=60)
+    await asyncio.sleep(0.005)
+    assert (cache.get("long"), cache.get("short"), cache.get("capped")) == (1, None, 3)
+
+    await asyncio.sleep(0.02)
+
+    assert (cache.get("long"), cache.get("capped")) == (None, None)
+    assert cache.stats()["size"] == 0
+
+
+async def test_none_is_not_cached():
+    cache = TTLCache(max_size=10, ttl_seconds=60)
+    loader = Loader(value=None)
+    loader.release.set()
+
+    await cache.get_or_load("key", loader)
+    await cache.get_or_load("key", loader)
+
+    assert loader.calls == 2
+
+
+async def test_invalidate_during_a_load_keeps_its_result_out_of_the_cache():
+    cache = TTLCache(max_size=10, ttl_seconds=60)
+    stale = Loader(value="stale")
+    loading = asyncio.ensure_future(cache.get_or_load("key", stale))
+    await asyncio.sleep(0)
+
+    cache.invalidate("key")
+    stale.release.set()
+
+    # The caller that started the load still gets its result...
+    assert await loading == "stale"
+    # ...but the next lookup loads again
+    fresh = Loader(value="fresh")
+    fresh.release.set()
+    assert await cache.get_or_load("key", fresh) == "fresh"
+    assert cache.get("key") == "fresh"
@@ -0,0 +1,68 @@
+import pytest
+
+TASKS_URL = "/api/v1/tasks/"
+
+
+@pytest.fixture
+def task(client, auth_headers):
+    response = client.post(TASKS_URL, json={"title": "write tests"}, headers=auth_headers)
+    assert response.status_code == 201
+    return response
+
+
+def test_update_with_current_version_succeeds(client, auth_headers, task):
+    headers = {**auth_headers, "If-Match": task.headers["ETag"]}
+
+    response = client.put(f"{TASKS_URL}{task.json()['_id']}", json={"status": "completed"}, headers=headers)
+
+    assert response.status_code == 200
+    assert response.json()["version"] == task.json()["version"] + 1
+    assert response.headers["ETag"] != task.headers["ETag"]
+
+
+@pytest.mark.parametrize("if_match", ["{version}", 'W/"{etag}"'])
+def test_if_match_accepts_bare_versions_and_weak_etags(client, auth_headers, task, if_match):
+    value = if_match.format(version=task.json()["version"], etag=task.headers["ETag"].strip('"'))
+    headers = {**auth_headers, "If-Match": value}
+
+    response = client.put(f"{TASKS_URL}{task.json()['_id']}", json={"title": "renamed"}, headers=headers)
+
+    assert response.status_code == 200
+
+
+def test_update_with_stale_version_fails(client, auth_headers, task):
+    url = f"{TASKS_URL}{task.json()['_id']}"
+    headers = {**auth_headers, "If-Match": task.headers["ETag"]}
+    assert client.put(url, json={"title": "first"}, headers=headers).status_code == 200
+
+    response = client.put(url, json={"title": "second"}, headers=headers)
+
+    assert response.status_code == 412
+    assert client.get(url, headers=auth_headers).json()["title"] == "first"
+
+
+def test_malformed_if_match_fails(client, auth_headers, task):
+    headers = {**auth_headers, "If-Match": '"not-a-version"'}
+
+    response = client.put(f"{TASKS_URL}{task.json()['_id']}", json={"title": "renamed"}, headers=headers)
+
+    assert response.status_code == 412
+
+
+@pytest.mark.parametrize("extra_headers", [{}, {"If-Match": "*"}])
+def test_unconditional_update_ignores_version(client, auth_headers, task, extra_headers):
+    url = f"{TASKS_URL}{task.json()['_id']}"
+    client.put(url, json={"title": "first"}, headers=auth_headers)
+
+    response = client.put(url, json={"title": "second"}, headers={**auth_headers, **extra_headers})
+
+    assert response.status_code == 200
+    assert response.json()["version"] == task.json()["version"] + 2
+
+
+def test_conditional_update_of_missing_task_is_not_found(client, auth_headers):
+    headers = {**auth_headers, "If-Match": "1"}
+
+    response = client.put(f"{TASKS_URL}{'0' * 24}", json={"title": "renamed"}, headers=headers)
+
+    assert response.status_code == 404
@@ -0,0 +1,109 @@
+import pytest
+from conftest import register
+import app.routes.tasks as task_routes
+import app.services.task_service as task_service
+from app.utils.response_cache import MemoryResponseCache, NullResponseCache
+
+TASKS_URL = "/api/v1/tasks/"
+
+
+@pytest.fixture(params=["uncached", "cached"], autouse=True)
+def response_cache(request, monkeypatch):
+    """Run every test without and with the response cache, whose hits must answer the same"""
+    if request.param == "cached":
+        cache = MemoryResponseCache(max_bytes=1 << 20, max_entry_bytes=1 << 16, max_users=100, ttl_seconds=60)
+    else:
+        cache = NullResponseCache()
+    monkeypatch.setattr(task_routes, "response_cache", cache)
+    monkeypatch.setattr(task_service, "response_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def task(client, auth_headers):
+    return client.post(TASKS_URL, json={"title": "write tests"}, headers=auth_headers).json()
+
+
+def test_task_not_modified(client, auth_headers, task):
+    url = f"{TASKS_URL}{task['_id']}"
+    etag = client.get(url, headers=auth_headers).headers["ETag"]
+
+    for if_none_match in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        response = client.get(url, headers={**auth_headers, "If-None-Match": if_none_match})
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+        assert response.content == b""
+
+
+def test_task_etag_changes_on_update(client, auth_headers, task):
+    url = f"{TASKS_URL}{task['_id']}"
+    etag = client.get(url, headers=auth_headers).headers["ETag"]
+    client.put(url, json={"title": "renamed"}, headers=auth_headers)
+
+    response = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.json()["title"] == "renamed"
+    assert response.headers["ETag"] != etag
+
+
+def test_list_not_modified_until_a_write(client, auth_headers, task):
+    etag = client.get(TASKS_URL, headers=auth_headers).headers["ETag"]
+    conditional = {**auth_headers, "If-None-Match": etag}
+
+    assert client.get(TASKS_URL, headers=conditional).status_code == 304
+
+    client.post(TASKS_URL, json={"title": "another"}, headers=auth_headers)
+    response = client.get(TASKS_URL, headers=conditional)
+
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == 2
+    assert response.headers["ETag"] != etag
+
+
+@pytest.mark.parametrize("write", ["update", "delete", "bulk_update", "bulk_delete"])
+def test_list_etag_changes_on_every_kind_of_write(client, auth_headers, task, write):
+    etag = client.get(TASKS_URL, headers=auth_headers).headers["ETag"]
+    url = f"{TASKS_URL}{task['_id']}"
+
+    if write == "update":
+        client.put(url, json={"status": "completed"}, headers=auth_headers)
+    elif write == "delete":
+        client.delete(url, headers=auth_headers)
+    elif write == "bulk_update":
+        client.patch(f"{TASKS_URL}bulk", json={"tasks": [{"id": task["_id"], "title": "bulk"}]}, headers=auth_headers)
+    else:
+        client.request("DELETE", f"{TASKS_URL}bulk", json={"ids": [task["_id"]]}, headers=auth_headers)
+
+    response = client.get(TASKS_URL, headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 200
+
+
+def test_list_etag_depends_on_the_query(client, auth_headers, task):
+    etag = client.get(TASKS_URL, headers=auth_headers).headers["ETag"]
+
+    response = client.get(TASKS_URL, params={"status": "completed"}, headers={**auth_headers, "If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.json()["items"] == []
+
+
+def test_list_etags_are_per_user(client, auth_headers, task):
+    etag = client.get(TASKS_URL, headers=auth_headers).headers["ETag"]
+    other = {"Authorization": f"Bearer {register(client)['access_token']}"}
+
+    response = client.get(TASKS_URL, headers={**other, "If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.json()["items"] == []
+
+
+def test_repeated_reads_are_served_from_the_cache(client, auth_headers, task, response_cache):
+    if isinstance(response_cache, NullResponseCache):
+        pytest.skip("response cache disabled")
+
+    first = client.get(TASKS_URL, headers=auth_headers)
+    second = client.get(TASKS_URL, headers=auth_headers)
+
+    assert response_cache.hits == 1
+    assert (second.content, second.headers["ETag"]) == (first.content, first.headers["ETag"])
@@ -0,0 +1,100 @@
+import json
+import pytest
+from pymongo.errors import OperationFailure
+from app.routes.tasks import task_event_stream
+from app.utils.events import EventBroker, Subscription, TaskEvent, check_change_stream, task_events
+
+pytestmark = pytest.mark.anyio
+
+
+def broker(**options):
+    return EventBroker(**{"queue_size": 10, "replay_size": 10, "max_replay_users": 10, **options})
+
+
+async def drain(subscription):
+    events = []
+    while (event := await subscription.get(timeout=0)) is not None:
+        events.append(event)
+    return events
+
+
+async def test_full_subscription_drops_the_oldest_event():
+    subscription = Subscription("user", max_size=2)
+
+    for index in range(5):
+        subscription.push(TaskEvent(str(index), "created", "{}"))
+
+    assert subscription.dropped == 3
+    assert [event.id for event in await drain(subscription)] == ["3", "4"]
+
+
+async def test_last_event_id_replays_the_events_after_it():
+    events = broker()
+    for index in range(4):
+        events.publish("user", "created", f'{{"n": {index}}}')
+    first_id = events._replay["user"][0].id
+    subscription = events.subscribe("user", last_event_id=first_id)
+
+    assert [json.loads(event.data)["n"] for event in await drain(subscription)] == [1, 2, 3]
+
+
+async def test_unknown_last_event_id_resets():
+    events = broker(replay_size=2)
+    for index in range(3):
+        events.publish("user", "created", "{}")
+
+    subscription = events.subscribe("user", last_event_id="evicted-or-foreign")
+
+    (event,) = await drain(subscription)
+    assert (event.id, event.type) == ("evicted-or-foreign", "reset")
+
+
+async def test_events_fan_out_to_the_owners_subscriptions_only():
+    events = broker()
+    first, second, other = events.subscribe("user"), events.subscribe("user"), events.subscribe("other")
+
+    events.publish("user", "updated", "{}")
+
+    assert len(await drain(first)) == len(await drain(second)) == 1
+    assert await drain(other) == []
+
+
+async def test_stream_renders_events_and_unsubscribes_on_disconnect():
+    subscribers = task_events.subscriber_count
+    subscription = task_events.subscribe("stream-user")
+    stream = task_event_stream(subscription)
+    assert await stream.__anext__() == "retry: 3000\n\n"
+
+    task_events.publish("stream-user", "created", '{"title": "x"}', event_id="42")
+    assert await stream.__anext__() == 'id: 42\nevent: created\ndata: {"title": "x"}\n\n'
+    assert task_events.subscriber_count == subscribers + 1
+
+    # What the server does when the client goes away
+    await stream.aclose()
+
+    assert task_events.subscriber_count == subscribers
+
+
+async def test_stream_reports_overflow():
+    subscription = Subscription("user", max_size=1)
+    stream = task_event_stream(subscription)
+    await stream.__anext__()
+
+    subscription.push(TaskEvent("1", "created", "{}"))
+    subscription.push(TaskEvent("2", "created", "{}"))
+
+    assert await stream.__anext__() == 'event: overflow\ndata: {"dropped": 1}\n\n'
+    assert (await stream.__anext__()).startswith("id: 2\n")
+    await stream.aclose()
+
+
+class UnsupportedCollection:
+    name = "tasks"
+
+    def watch(self, **options):
+        raise OperationFailure("BSON field '$changeStream.fullDocumentBeforeChange' is an unknown field.")
+
+
+async def test_change_stream_check_fails_startup_on_an_unsupported_server():
+    with pytest.raises(RuntimeError, match="MongoDB 6.0"):
+        await check_change_stream(UnsupportedCollection())
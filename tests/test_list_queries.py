@@ -0,0 +1,87 @@
+from datetime import datetime, timezone
+import pytest
+from bson import ObjectId
+from app.models.task_model import Task
+from app.repositories.storage import storage
+
+TASKS_URL = "/api/v1/tasks/"
+DAY = [datetime(2024, 1, day, tzinfo=timezone.utc) for day in range(1, 5)]
+
+
+@pytest.fixture
+def tasks(client, auth_headers):
+    """One task per (day, status) for days 1 to 3, day 3's completed task updated on day 4"""
+    # The list route does not expose the user id, creating a task does
+    probe = client.post(TASKS_URL, json={"title": "probe"}, headers=auth_headers).json()
+    client.delete(f"{TASKS_URL}{probe['_id']}", headers=auth_headers)
+    owner = probe["user_id"]
+    for day in DAY[:3]:
+        for task_status in ("pending", "completed"):
+            updated_at = DAY[3] if (day, task_status) == (DAY[2], "completed") else day
+            task = Task(title=f"{task_status} {day.day}", description="long text", status=task_status,
+                        user_id=ObjectId(owner), created_at=day, updated_at=updated_at)
+            client.portal.call(storage.tasks.insert, task.to_dict())
+
+
+def titles(client, headers, **params):
+    response = client.get(TASKS_URL, params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return [item["title"] for item in response.json()["items"]]
+
+
+def test_status_filter(client, auth_headers, tasks):
+    assert titles(client, auth_headers, status="completed") == ["completed 1", "completed 2", "completed 3"]
+    assert titles(client, auth_headers, status="completed", sort="-created_at") == [
+        "completed 3", "completed 2", "completed 1"
+    ]
+    assert titles(client, auth_headers, status="in-progress") == []
+
+
+def test_created_range_filter(client, auth_headers, tasks):
+    # Both bounds are exclusive
+    page = titles(client, auth_headers, created_after=DAY[0].isoformat(), created_before=DAY[2].isoformat())
+
+    assert page == ["pending 2", "completed 2"]
+    assert titles(client, auth_headers, created_after=DAY[1].isoformat(), status="pending") == ["pending 3"]
+
+
+def test_updated_since_filter(client, auth_headers, tasks):
+    page = titles(client, auth_headers, updated_since=DAY[2].isoformat(), sort="-updated_at")
+
+    assert page == ["completed 3", "pending 3"]
+
+
+@pytest.mark.parametrize("params", [
+    {"sort": "updated_at"},
+    {"sort": "updated_at", "updated_since": DAY[0].isoformat(), "status": "pending"},
+    {"sort": "-updated_at", "updated_since": DAY[0].isoformat(), "status": "completed"},
+    {"sort": "title"},
+    {"fields": "title,secret"},
+], ids=["no-updated-since", "status-updated-at", "status-desc-updated-at", "unknown-sort", "unknown-field"])
+def test_queries_without_a_backing_index_are_rejected(client, auth_headers, tasks, params):
+    response = client.get(TASKS_URL, params=params, headers=auth_headers)
+
+    assert response.status_code == 400
+
+
+def test_pages_leave_out_the_description(client, auth_headers, tasks):
+    item = client.get(TASKS_URL, headers=auth_headers).json()["items"][0]
+
+    assert "description" not in item
+    assert {"_id", "title", "status", "user_id", "created_at", "updated_at", "version"} <= set(item)
+
+
+def test_sparse_fields(client, auth_headers, tasks):
+    items = client.get(TASKS_URL, params={"fields": "title,description"}, headers=auth_headers).json()["items"]
+
+    # _id is always there, the sort key is fetched for the cursor but not returned
+    assert set(items[0]) == {"_id", "title", "description"}
+    assert items[0]["description"] == "long text"
+
+
+def test_streams_include_every_field_by_default(client, auth_headers, tasks):
+    response = client.get(TASKS_URL, params={"stream": "true", "status": "pending"}, headers=auth_headers)
+
+    lines = response.text.splitlines()
+    assert len(lines) == 3
+    assert '"description":"long text"' in lines[0]
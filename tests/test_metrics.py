@@ -0,0 +1,51 @@
+import asyncio
+from bisect import bisect_left
+import pytest
+from prometheus_client import REGISTRY, Histogram
+from app.utils.metrics import REQUEST_SECONDS_BUCKETS, RequestMetrics, _add_observations, _Tally
+
+
+def samples(histogram):
+    return [(sample.name, sample.labels, sample.value)
+            for metric in histogram.collect() for sample in metric.samples if not sample.name.endswith("_created")]
+
+
+def test_bulk_observations_match_observe():
+    values = [0.0, 0.0005, 0.001, 0.003, 0.0999, 0.1, 2, 7.5, 10, 11, 60]
+    observed = Histogram("observed", "observed", buckets=REQUEST_SECONDS_BUCKETS, registry=None)
+    flushed = Histogram("observed", "observed", buckets=REQUEST_SECONDS_BUCKETS, registry=None)
+
+    tally = _Tally()
+    for value in values:
+        observed.observe(value)
+        tally.seconds_sum += value
+        tally.seconds_buckets[bisect_left(REQUEST_SECONDS_BUCKETS, value)] += 1
+    _add_observations(flushed, tally.seconds_sum, tally.seconds_buckets)
+
+    assert samples(flushed) == samples(observed)
+
+
+def test_metrics_endpoint_reports_requests(client):
+    for _ in range(3):
+        client.get("/healthz")
+
+    body = client.get("/metrics").text
+
+    assert 'http_requests_total{method="GET",route="/healthz",status="200"} 3.0' in body
+    assert 'http_request_duration_seconds_count{method="GET",route="/healthz",status="200"} 3.0' in body
+
+
+@pytest.mark.anyio
+async def test_request_outliving_the_flush_interval_is_flushed():
+    metrics = RequestMetrics(flush_interval=0.02, flush_periodically=True)
+    labels = {"method": "GET", "route": "/long", "status": "200"}
+    before = REGISTRY.get_sample_value("http_requests_total", labels) or 0
+
+    metrics.started()
+    # The flush scheduled by started() runs while the request is still in flight
+    await asyncio.sleep(0.05)
+    metrics.finished("GET", "/long", 200, 0.05, 10)
+    await asyncio.sleep(0.05)
+
+    assert REGISTRY.get_sample_value("http_requests_total", labels) == before + 1
+    assert REGISTRY.get_sample_value("http_requests_in_flight") == 0
@@ -0,0 +1,79 @@
+from datetime import datetime, timezone
+import pytest
+from bson import ObjectId
+from app.models.task_model import Task
+from app.repositories.storage import storage
+from app.utils.pagination import decode_cursor, encode_cursor
+
+TASKS_URL = "/api/v1/tasks/"
+
+
+def user_id(client, headers) -> str:
+    # The list route does not expose it, creating a task does
+    return client.post(TASKS_URL, json={"title": "probe"}, headers=headers).json()["user_id"]
+
+
+def insert_tasks(client, owner: str, count: int, created_at: datetime):
+    for index in range(count):
+        task = Task(title=f"task {index}", user_id=ObjectId(owner), created_at=created_at, updated_at=created_at)
+        client.portal.call(storage.tasks.insert, task.to_dict())
+
+
+def list_all(client, headers, **params):
+    ids, after = [], None
+    while True:
+        query = {**params, **({"after": after} if after else {})}
+        response = client.get(TASKS_URL, params=query, headers=headers)
+        assert response.status_code == 200
+        page = response.json()
+        ids.extend(item["_id"] for item in page["items"])
+        after = page["next_cursor"]
+        if after is None:
+            return ids
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 123000, tzinfo=timezone.utc)
+    object_id = ObjectId()
+
+    assert decode_cursor(encode_cursor(created_at, object_id)) == (created_at, object_id)
+    assert decode_cursor(encode_cursor(0.75, object_id)) == (0.75, object_id)
+
+
+# A search cursor carries a relevance score instead of a date
+@pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor(1.0, ObjectId())])
+def test_invalid_cursor_is_rejected(client, auth_headers, cursor):
+    response = client.get(TASKS_URL, params={"after": cursor}, headers=auth_headers)
+
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("sort", ["created_at", "-created_at"])
+def test_pages_are_stable_when_sort_values_tie(client, auth_headers, sort):
+    owner = user_id(client, auth_headers)
+    tied = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    insert_tasks(client, owner, 7, tied)
+
+    ids = list_all(client, auth_headers, limit=3, sort=sort)
+
+    assert len(ids) == 8
+    assert len(set(ids)) == 8
+    # Ties are broken by _id in the direction of the sort, the probe task is the newest
+    descending = sort.startswith("-")
+    tied_ids = ids[1:] if descending else ids[:-1]
+    assert tied_ids == sorted(tied_ids, reverse=descending)
+    assert ids == list_all(client, auth_headers, limit=5, sort=sort)
+    assert ids == list_all(client, auth_headers, limit=200, sort=sort)
+
+
+def test_paging_does_not_skip_or_repeat_after_inserts(client, auth_headers):
+    owner = user_id(client, auth_headers)
+    insert_tasks(client, owner, 5, datetime(2024, 1, 1, tzinfo=timezone.utc))
+
+    first = client.get(TASKS_URL, params={"limit": 3}, headers=auth_headers).json()
+    # Newer tasks land after the cursor's position in ascending order, not before it
+    insert_tasks(client, owner, 2, datetime(2024, 1, 2, tzinfo=timezone.utc))
+    rest = list_all(client, auth_headers, limit=3, after=first["next_cursor"])
+
+    ids = [item["_id"] for item in first["items"]] + rest
+    assert len(ids) == len(set(ids)) == 8
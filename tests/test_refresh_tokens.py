@@ -0,0 +1,51 @@
+from conftest import login, register
+
+REFRESH_URL = "/api/v1/auth/refresh"
+TASKS_URL = "/api/v1/tasks/"
+
+
+def refresh(client, refresh_token: str):
+    return client.post(REFRESH_URL, json={"refresh_token": refresh_token})
+
+
+def test_refresh_rotates_the_token(client):
+    tokens = register(client)
+
+    response = refresh(client, tokens["refresh_token"])
+
+    assert response.status_code == 200
+    rotated = response.json()
+    assert rotated["refresh_token"] != tokens["refresh_token"]
+    headers = {"Authorization": f"Bearer {rotated['access_token']}"}
+    assert client.get(TASKS_URL, headers=headers).status_code == 200
+    # The rotated token can be redeemed in turn
+    assert refresh(client, rotated["refresh_token"]).status_code == 200
+
+
+def test_reusing_a_rotated_token_revokes_its_family(client):
+    tokens = register(client)
+    rotated = refresh(client, tokens["refresh_token"]).json()
+
+    assert refresh(client, tokens["refresh_token"]).status_code == 401
+    # The legitimate holder of the newest token is logged out too
+    assert refresh(client, rotated["refresh_token"]).status_code == 401
+
+
+def test_revocation_is_limited_to_the_reused_family(client):
+    # Every login starts its own token family
+    tokens = register(client, "two-devices@example.com")
+    other_device = login(client, "two-devices@example.com")
+
+    refresh(client, tokens["refresh_token"])
+    refresh(client, tokens["refresh_token"])
+
+    assert refresh(client, other_device["refresh_token"]).status_code == 200
+
+
+def test_invalid_refresh_tokens_are_rejected(client):
+    tokens = register(client)
+
+    for token in ("garbage", tokens["access_token"], tokens["refresh_token"][:-2]):
+        response = refresh(client, token)
+        assert response.status_code == 401
+        assert response.headers["WWW-Authenticate"] == "Bearer"
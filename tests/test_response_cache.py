@@ -0,0 +1,78 @@
+import time
+import pytest
+from app.utils.response_cache import CachedResponse, RedisResponseCache
+from fake_redis import FakeRedis
+
+pytestmark = pytest.mark.anyio
+
+RESPONSE = CachedResponse('"etag"', b'{"items":[],"next_cursor":null}')
+
+
+@pytest.fixture
+async def redis_server():
+    server = FakeRedis()
+    await server.start()
+    yield server
+    await server.stop()
+
+
+@pytest.fixture
+async def redis_caches(redis_server):
+    caches = [RedisResponseCache(redis_server.url, max_entry_bytes=1 << 20, ttl_seconds=60) for _ in range(2)]
+    yield caches
+    for cache in caches:
+        await cache.close()
+
+
+async def test_missing_generation_is_seeded_from_the_clock(redis_caches):
+    first, second = redis_caches
+    before = time.time_ns()
+
+    generation, response = await first.get("user", "page")
+
+    assert response is None
+    assert before <= generation <= time.time_ns()
+    # The seed is stored, every instance reads the same generation
+    assert (await second.get("user", "page")) == (generation, None)
+
+
+async def test_seed_does_not_overwrite_an_existing_generation(redis_caches):
+    first, second = redis_caches
+    generation, _ = await first.get("user", "page")
+
+    await second.invalidate("user")
+
+    assert (await first.get("user", "page"))[0] == generation + 1
+
+
+async def test_invalidation_is_seen_by_every_instance(redis_caches):
+    first, second = redis_caches
+    generation, _ = await first.get("user", "page")
+    await first.set("user", "page", generation, RESPONSE)
+    assert (await second.get("user", "page")) == (generation, RESPONSE)
+
+    await second.invalidate("user")
+
+    assert (await first.get("user", "page")) == (generation + 1, None)
+    assert (await second.get("user", "page")) == (generation + 1, None)
+
+
+async def test_invalidation_is_per_user(redis_caches):
+    first, second = redis_caches
+    generation, _ = await first.get("user", "page")
+    await first.set("user", "page", generation, RESPONSE)
+
+    await second.invalidate("other")
+
+    assert (await first.get("user", "page")) == (generation, RESPONSE)
+
+
+async def test_unreachable_server_fails_open(redis_server):
+    url = redis_server.url
+    await redis_server.stop()
+    cache = RedisResponseCache(url, max_entry_bytes=1 << 20, ttl_seconds=60)
+
+    assert (await cache.get("user", "page")) == (None, None)
+    await cache.set("user", "page", 1, RESPONSE)
+    await cache.invalidate("user")
+    await cache.close()
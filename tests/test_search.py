@@ -0,0 +1,119 @@
+import asyncio
+import pytest
+from bson import ObjectId
+from app.utils.search import InvertedIndex
+
+TASKS_URL = "/api/v1/tasks/"
+SEARCH_URL = f"{TASKS_URL}search"
+
+
+def create(client, headers, title, description=None):
+    return client.post(TASKS_URL, json={"title": title, "description": description}, headers=headers).json()
+
+
+def search(client, headers, q, **params):
+    response = client.get(SEARCH_URL, params={"q": q, **params}, headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+def search_titles(client, headers, q):
+    return [item["title"] for item in search(client, headers, q)["items"]]
+
+
+def test_results_are_ranked_by_score(client, auth_headers):
+    create(client, auth_headers, "apple")
+    create(client, auth_headers, "apple apple pie", "apple crumble")
+    create(client, auth_headers, "banana")
+    create(client, auth_headers, "apple tart", "with apple")
+
+    items = search(client, auth_headers, "apple")["items"]
+
+    assert [item["title"] for item in items] == ["apple apple pie", "apple tart", "apple"]
+    assert [item["score"] for item in items] == sorted((item["score"] for item in items), reverse=True)
+
+
+def test_results_leave_out_the_description(client, auth_headers):
+    create(client, auth_headers, "apple", "a long description")
+
+    item = search(client, auth_headers, "description")["items"][0]
+
+    assert "description" not in item
+    assert {"_id", "title", "status", "score"} <= set(item)
+
+
+def test_cursor_pages_without_repeats(client, auth_headers):
+    # Equal scores, so pages split ties that only the _id orders
+    for index in range(7):
+        create(client, auth_headers, f"report {index}")
+    create(client, auth_headers, "report report")
+
+    ids, after = [], None
+    while True:
+        page = search(client, auth_headers, "report", limit=3, **({"after": after} if after else {}))
+        ids.extend(item["_id"] for item in page["items"])
+        after = page["next_cursor"]
+        if after is None:
+            break
+
+    assert len(ids) == len(set(ids)) == 8
+    assert ids == [item["_id"] for item in search(client, auth_headers, "report", limit=100)["items"]]
+
+
+def test_list_cursor_is_rejected(client, auth_headers):
+    for index in range(3):
+        create(client, auth_headers, f"task {index}")
+    list_cursor = client.get(TASKS_URL, params={"limit": 1}, headers=auth_headers).json()["next_cursor"]
+
+    response = client.get(SEARCH_URL, params={"q": "task", "after": list_cursor}, headers=auth_headers)
+
+    assert response.status_code == 400
+
+
+def test_writes_keep_the_index_current(client, auth_headers):
+    task = create(client, auth_headers, "quarterly report")
+    # The first search builds the in-process index, later writes update it in place
+    assert search_titles(client, auth_headers, "report") == ["quarterly report"]
+
+    created = create(client, auth_headers, "annual report")
+    assert sorted(search_titles(client, auth_headers, "report")) == ["annual report", "quarterly report"]
+
+    client.put(f"{TASKS_URL}{task['_id']}", json={"title": "quarterly summary"}, headers=auth_headers)
+    assert search_titles(client, auth_headers, "report") == ["annual report"]
+    assert search_titles(client, auth_headers, "summary") == ["quarterly summary"]
+
+    client.delete(f"{TASKS_URL}{created['_id']}", headers=auth_headers)
+    assert search_titles(client, auth_headers, "report") == []
+
+    client.patch(f"{TASKS_URL}bulk", json={"tasks": [{"id": task["_id"], "title": "bulk report"}]},
+                 headers=auth_headers)
+    assert search_titles(client, auth_headers, "report") == ["bulk report"]
+
+    client.request("DELETE", f"{TASKS_URL}bulk", json={"ids": [task["_id"]]}, headers=auth_headers)
+    assert search_titles(client, auth_headers, "report") == []
+
+
+@pytest.mark.anyio
+async def test_writes_during_a_build_are_not_lost():
+    index = InvertedIndex(max_users=10, ttl_seconds=60)
+    user_id = ObjectId()
+    stored = {"_id": ObjectId(), "user_id": user_id, "title": "old report"}
+    fetched = asyncio.Event()
+
+    async def fetch():
+        # The documents were read before the writes below
+        documents = [dict(stored)]
+        await fetched.wait()
+        return documents
+
+    build = asyncio.ensure_future(index.build(user_id, fetch))
+    await asyncio.sleep(0)
+    index.add({**stored, "title": "new summary"})
+    added = {"_id": ObjectId(), "user_id": user_id, "title": "another report"}
+    index.add(added)
+    index.remove(user_id, added["_id"])
+    fetched.set()
+    await build
+
+    assert [hit["title"] for hit in index.search(user_id, "summary", 10)] == ["new summary"]
+    assert index.search(user_id, "report", 10) == []
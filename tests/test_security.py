@@ -0,0 +1,62 @@
+import time
+from datetime import timedelta
+import pytest
+from fastapi import HTTPException
+from app.config import settings
+from app.utils.security import create_access_token, create_refresh_token, decode_access_token, token_cache
+
+
+@pytest.fixture(autouse=True)
+def empty_token_cache():
+    token_cache.clear()
+    yield
+    token_cache.clear()
+
+
+def test_decoded_claims_are_cached():
+    token = create_access_token({"sub": "user"})
+    misses = token_cache.misses
+
+    first = decode_access_token(token)
+
+    assert decode_access_token(token) is first
+    assert token_cache.misses == misses + 1
+
+
+def test_cached_claims_expire_with_the_token():
+    token = create_access_token({"sub": "user"}, expires_delta=timedelta(seconds=1))
+    assert decode_access_token(token)["sub"] == "user"
+
+    misses = token_cache.misses
+
+    time.sleep(1.1)
+
+    # Past its exp the token is verified again rather than served from the cache
+    # (jose itself only rejects it once the exp second has passed)
+    try:
+        decode_access_token(token)
+    except HTTPException as error:
+        assert error.status_code == 401
+    assert token_cache.misses == misses + 1
+
+
+def test_refresh_tokens_are_never_accepted_as_access_tokens():
+    decode_access_token(create_access_token({"sub": "user"}))
+    refresh_token, _ = create_refresh_token("user", "family", 0)
+
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            decode_access_token(refresh_token)
+    assert token_cache.stats()["size"] == 1
+
+
+def test_changing_the_secret_key_drops_cached_claims(monkeypatch):
+    token = create_access_token({"sub": "user"})
+    decode_access_token(token)
+
+    monkeypatch.setattr(settings, "SECRET_KEY", settings.SECRET_KEY + "-rotated")
+
+    with pytest.raises(HTTPException):
+        decode_access_token(token)
+    assert token_cache.stats()["size"] == 0
+    assert decode_access_token(create_access_token({"sub": "user"}))["sub"] == "user"
@@ -0,0 +1,164 @@
+import asyncio
+import pytest
+from app.services.task_service import TaskService
+
+TASKS_URL = "/api/v1/tasks/"
+MISSING_ID = "0" * 24
+
+
+@pytest.fixture
+def tasks(client, auth_headers):
+    """One task per status plus a second pending one"""
+    return [
+        client.post(TASKS_URL, json={"title": f"task {index}", "status": task_status}, headers=auth_headers).json()
+        for index, task_status in enumerate(["pending", "pending", "in-progress", "completed"])
+    ]
+
+
+def assert_stats(client, auth_headers, tasks, pending, in_progress, completed):
+    response = client.get(f"{TASKS_URL}stats", headers=auth_headers)
+    assert response.json() == {
+        "counts": {"pending": pending, "in-progress": in_progress, "completed": completed},
+        "total": pending + in_progress + completed,
+    }
+    # The incremental counters agree with a full recount
+    assert client.portal.call(TaskService.reconcile_stats, tasks[0]["user_id"]) == 0
+
+
+def test_stats_start_at_zero(client, auth_headers):
+    response = client.get(f"{TASKS_URL}stats", headers=auth_headers)
+
+    assert response.json() == {"counts": {"pending": 0, "in-progress": 0, "completed": 0}, "total": 0}
+
+
+def test_create(client, auth_headers, tasks):
+    assert_stats(client, auth_headers, tasks, pending=2, in_progress=1, completed=1)
+
+
+def test_update(client, auth_headers, tasks):
+    client.put(f"{TASKS_URL}{tasks[0]['_id']}", json={"status": "completed"}, headers=auth_headers)
+    # Neither a same-status nor a title-only update moves a counter
+    client.put(f"{TASKS_URL}{tasks[1]['_id']}", json={"status": "pending"}, headers=auth_headers)
+    client.put(f"{TASKS_URL}{tasks[2]['_id']}", json={"title": "renamed"}, headers=auth_headers)
+
+    assert_stats(client, auth_headers, tasks, pending=1, in_progress=1, completed=2)
+
+
+def test_delete(client, auth_headers, tasks):
+    client.delete(f"{TASKS_URL}{tasks[3]['_id']}", headers=auth_headers)
+    assert client.delete(f"{TASKS_URL}{tasks[3]['_id']}", headers=auth_headers).status_code == 404
+
+    assert_stats(client, auth_headers, tasks, pending=2, in_progress=1, completed=0)
+
+
+def test_bulk_create(client, auth_headers, tasks):
+    batch = {"tasks": [{"title": "a"}, {"title": "b", "status": "completed"}, {"title": "c", "status": "completed"}]}
+
+    response = client.post(f"{TASKS_URL}bulk", json=batch, headers=auth_headers)
+
+    assert response.json()["succeeded"] == 3
+    assert_stats(client, auth_headers, tasks, pending=3, in_progress=1, completed=3)
+
+
+def test_bulk_update(client, auth_headers, tasks):
+    batch = {"tasks": [
+        {"id": tasks[0]["_id"], "status": "in-progress"},
+        {"id": tasks[1]["_id"], "title": "renamed"},
+        {"id": tasks[2]["_id"], "status": "in-progress"},
+        {"id": tasks[3]["_id"], "status": "pending", "title": "reopened"},
+        {"id": MISSING_ID, "status": "completed"},
+    ]}
+
+    response = client.patch(f"{TASKS_URL}bulk", json=batch, headers=auth_headers)
+
+    assert (response.json()["succeeded"], response.json()["failed"]) == (4, 1)
+    assert_stats(client, auth_headers, tasks, pending=2, in_progress=2, completed=0)
+
+
+def test_bulk_delete(client, auth_headers, tasks):
+    ids = [tasks[0]["_id"], tasks[0]["_id"], tasks[3]["_id"], MISSING_ID]
+
+    client.request("DELETE", f"{TASKS_URL}bulk", json={"ids": ids}, headers=auth_headers)
+
+    assert_stats(client, auth_headers, tasks, pending=1, in_progress=1, completed=0)
+
+
+def test_concurrent_status_updates_of_one_task(client, auth_headers, tasks):
+    task = tasks[0]
+
+    async def race():
+        await asyncio.gather(*(
+            TaskService.update_task(task["_id"], task["user_id"], {"status": task_status})
+            for task_status in ["completed", "in-progress", "completed", "pending", "in-progress"] * 4
+        ))
+
+    client.portal.call(race)
+
+    final = client.get(f"{TASKS_URL}{task['_id']}", headers=auth_headers).json()["status"]
+    expected = {"pending": 1, "in-progress": 1, "completed": 1}
+    expected[final] += 1
+    assert_stats(client, auth_headers, tasks, expected["pending"], expected["in-progress"], expected["completed"])
+
+
+def test_bulk_update_matching_nothing_is_not_a_change(client, auth_headers, tasks):
+    owner = tasks[0]["user_id"]
+    list_version = client.portal.call(TaskService.get_list_version, owner)
+    batch = {"tasks": [{"id": MISSING_ID, "title": "renamed"}, {"id": MISSING_ID, "status": "completed"}]}
+
+    response = client.patch(f"{TASKS_URL}bulk", json=batch, headers=auth_headers)
+
+    assert response.json()["failed"] == 2
+    assert client.portal.call(TaskService.get_list_version, owner) == list_version
+
+
+def test_concurrent_bulk_writes(client, auth_headers, tasks):
+    owner = tasks[0]["user_id"]
+    created = client.post(f"{TASKS_URL}bulk", json={"tasks": [{"title": f"t{i}"} for i in range(40)]},
+                          headers=auth_headers).json()
+    ids = [item["id"] for item in created["items"]]
+
+    async def race():
+        await asyncio.gather(
+            TaskService.update_tasks(owner, [(task_id, {"status": "completed"}) for task_id in ids]),
+            TaskService.update_tasks(owner, [(task_id, {"status": "in-progress"}) for task_id in ids[::2]]),
+            TaskService.update_tasks(owner, [(task_id, {"status": "completed"}) for task_id in ids[1::4]]),
+            TaskService.delete_tasks(owner, ids[::5]),
+            *(TaskService.update_task(task_id, owner, {"status": "pending"}) for task_id in ids[::3]),
+        )
+
+    client.portal.call(race)
+
+    total = client.get(f"{TASKS_URL}stats", headers=auth_headers).json()["total"]
+    assert total == len(tasks) + 40 - len(ids[::5])
+    assert client.portal.call(TaskService.reconcile_stats, owner) == 0
+
+
+@pytest.mark.parametrize("write", [
+    lambda task: TaskService.create_task("new", task["user_id"]),
+    lambda task: TaskService.create_tasks(task["user_id"], [{"title": "new"}]),
+    lambda task: TaskService.update_task(task["_id"], task["user_id"], {"status": "completed"}),
+    lambda task: TaskService.delete_task(task["_id"], task["user_id"]),
+    lambda task: TaskService.update_tasks(task["user_id"], [(task["_id"], {"status": "completed"})]),
+    lambda task: TaskService.delete_tasks(task["user_id"], [task["_id"]]),
+], ids=["create", "bulk-create", "update", "delete", "bulk-update", "bulk-delete"])
+def test_cancelled_write_still_counts(client, auth_headers, tasks, monkeypatch, write):
+    record_change = TaskService._record_change
+
+    async def slow_record_change(*args):
+        await asyncio.sleep(0.05)
+        await record_change(*args)
+
+    monkeypatch.setattr(TaskService, "_record_change", slow_record_change)
+
+    async def cancel_mid_write():
+        # As when the client disconnects after the task was written but before its bookkeeping
+        request = asyncio.ensure_future(write(tasks[0]))
+        await asyncio.sleep(0.01)
+        request.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await request
+        await asyncio.sleep(0.1)
+
+    client.portal.call(cancel_mid_write)
+
+    assert client.portal.call(TaskService.reconcile_stats, tasks[0]["user_id"]) == 0